@@ -0,0 +1,65 @@
+#! /usr/bin/env python
+import logging
+import sys
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+from compare_patterns import dataset, match
+from ltid.toolkit.log_graph import LogGraph
+from ltid.toolkit.log_parser import LocationIndex
+from ltid.toolkit.trie_matcher import TrieMatcher
+from prefixspan import prefixspan
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+
+
+def main(argv: list[str]):
+    """time TrieMatcher against compare_patterns.match on one project"""
+    argument_parser = ArgumentParser()
+    argument_parser.add_argument("--path", type=Path, default=Path.cwd())
+    argument_parser.add_argument("--max_dataset_size", type=int, default=-1)
+    argument_parser.add_argument("--min_sequence_length", type=int, default=2)
+    argument_parser.add_argument("--max_sequence_length", type=int, default=16)
+    argument_parser.add_argument("--window_size_ms", type=int, default=16)
+    argument_parser.add_argument("--min_support", type=int, default=16)
+    argument_parser.add_argument("--max_distance", type=float, default=0)
+    config = argument_parser.parse_args(argv[1:])
+
+    project_path: Path = config.path
+    log_graph = LogGraph.load(project_path / "target" / "log_graph.bin")
+    index = LocationIndex.from_graph(log_graph)
+    trie = prefixspan([*dataset(config, project_path, index)], config.min_support)
+
+    start = time.perf_counter()
+    expected = sum(
+        1
+        for path in log_graph.paths
+        if len(path) >= 2 and match(trie, path, config.max_distance) is not None
+    )
+    beam_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matcher = TrieMatcher(trie)
+    index_elapsed = time.perf_counter() - start
+    actual = sum(
+        1
+        for _, length, distance in matcher.match_paths(log_graph, config.max_distance)
+        if length >= 2 and distance is not None
+    )
+    matcher_elapsed = time.perf_counter() - start
+
+    print(f"trie nodes: {len(matcher)}")
+    print(f"beam:    {beam_elapsed:.3f}s, matching_paths_count={expected}")
+    print(
+        f"matcher: {matcher_elapsed:.3f}s (index {index_elapsed:.3f}s),"
+        f" matching_paths_count={actual}"
+    )
+    if actual != expected:
+        logger.error("matchers disagree")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
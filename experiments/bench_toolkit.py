@@ -0,0 +1,416 @@
+#! /usr/bin/env python
+import json
+import logging
+import os
+import platform
+import random
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser, Namespace
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+from ltid.toolkit.log_graph import LogGraph
+from ltid.toolkit.log_parser import LocationIndex, parse_log
+from ltid.toolkit.query import IdClassifier
+from ltid.toolkit.track import DiffTracker, SourceParser, walk
+from ltid.toolkit.trie_matcher import TrieMatcher
+from ltid.toolkit.windows import Windows, sliding_windows
+from prefixspan import prefixspan
+from pygit2 import Signature, init_repository
+from pygit2.repository import Repository
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+
+LEVELS = ["TRACE", "DEBUG", "INFO", "WARN", "ERROR"]
+NAMES = ["id", "userId", "path", "count", "name", "blockId", "size", "key", "value"]
+FILE_SIZE = 64
+# options that change what is measured, a baseline is only comparable with
+# the same values
+WORKLOAD = [
+    "graph_size",
+    "graph_depth",
+    "log_mb",
+    "commits",
+    "files",
+    "seed",
+    "window_size_ms",
+    "min_sequence_length",
+    "max_sequence_length",
+    "min_support",
+    "max_distance",
+]
+
+# a benchmark prepares its inputs and returns the call to time, which returns
+# the number of items it processed
+type Timed = Callable[[], int]
+
+
+def main(argv: list[str]):
+    """time the toolkit hot paths on synthetic fixtures, against a baseline"""
+    argument_parser = ArgumentParser()
+    argument_parser.add_argument("--graph_size", type=int, default=20_000)
+    argument_parser.add_argument("--graph_depth", type=int, default=32)
+    argument_parser.add_argument("--log_mb", type=int, default=64)
+    argument_parser.add_argument("--commits", type=int, default=200)
+    argument_parser.add_argument("--files", type=int, default=16)
+    argument_parser.add_argument("--seed", type=int, default=0)
+    argument_parser.add_argument("--repeat", type=int, default=5)
+    argument_parser.add_argument("--window_size_ms", type=int, default=16)
+    argument_parser.add_argument("--min_sequence_length", type=int, default=2)
+    argument_parser.add_argument("--max_sequence_length", type=int, default=16)
+    argument_parser.add_argument("--min_support", type=int, default=16)
+    argument_parser.add_argument("--max_distance", type=float, default=0)
+    argument_parser.add_argument("--only", nargs="+", choices=[*BENCHMARKS])
+    argument_parser.add_argument("--fixtures", type=Path, default=None)
+    argument_parser.add_argument("--output", type=Path, default=None)
+    argument_parser.add_argument("--baseline", type=Path, default=None)
+    argument_parser.add_argument("--tolerance", type=float, default=0.25)
+    argument_parser.add_argument("-v", "--verbose", action="store_true", default=False)
+    config = argument_parser.parse_args(argv[1:])
+
+    if config.verbose:
+        logger.setLevel(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as directory:
+        fixtures = Fixtures.create(config, config.fixtures or Path(directory))
+        results = run(config, fixtures, config.only or [*BENCHMARKS])
+
+    report = {
+        "machine": machine(),
+        "config": {name: getattr(config, name) for name in WORKLOAD},
+        "results": {name: result.summary() for name, result in results.items()},
+    }
+    if config.output is not None:
+        config.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(config.output, "w") as fp:
+            json.dump(report, fp, indent=2)
+
+    if config.baseline is None:
+        print_report(report, None, config.tolerance)
+        return
+    with open(config.baseline) as fp:
+        baseline = json.load(fp)
+    if baseline["machine"] != report["machine"]:
+        logger.warning("baseline was recorded on another machine")
+    if baseline["config"] != report["config"]:
+        logger.warning("baseline was recorded with another configuration")
+    regressions = print_report(report, baseline, config.tolerance)
+    sys.exit(regressions > 0)
+
+
+def machine() -> dict[str, str | int | None]:
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+    }
+
+
+def print_report(report: dict, baseline: dict | None, tolerance: float) -> int:
+    """print one line per benchmark and return the number of regressions"""
+    regressions = 0
+    for name, result in report["results"].items():
+        line = (
+            f"{name:<12} {result['best']:9.4f}s"
+            f" (median {result['median']:.4f}s) {result['rate']:14.0f} items/s"
+        )
+        reference = (baseline or {}).get("results", {}).get(name)
+        if reference is not None:
+            ratio = result["best"] / reference["best"]
+            line += f"  {ratio:6.2f}x baseline"
+            if ratio > 1 + tolerance:
+                line += "  REGRESSION"
+                regressions += 1
+        print(line)
+    return regressions
+
+
+@dataclass(slots=True)
+class Result:
+    items: int = 0
+    seconds: list[float] = field(default_factory=list)
+
+    def summary(self) -> dict[str, float | int]:
+        best = min(self.seconds)
+        return {
+            "items": self.items,
+            "best": best,
+            "median": statistics.median(self.seconds),
+            "rate": self.items / best if best > 0 else 0.0,
+        }
+
+
+def run(config: Namespace, fixtures: "Fixtures", names: list[str]) -> dict[str, Result]:
+    results = {}
+    for name in names:
+        timed = BENCHMARKS[name](config, fixtures)
+        result = Result()
+        for _ in range(config.repeat):
+            start = time.perf_counter()
+            result.items = timed()
+            result.seconds.append(time.perf_counter() - start)
+        logger.info(f"{name}: {min(result.seconds):.4f}s")
+        results[name] = result
+    return results
+
+
+@dataclass(slots=True)
+class Fixtures:
+    records: list[list[str]]
+    graph_path: Path
+    log_path: Path
+    repository_path: Path
+    names: list[str]
+
+    @classmethod
+    def create(cls, config: Namespace, directory: Path) -> "Fixtures":
+        """generate the fixtures under `directory`
+
+        Each fixture is seeded on its own and named after the options it
+        depends on, so the large ones can be kept across runs with
+        `--fixtures`.
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        seed = config.seed
+        graph = f"{seed}-{config.graph_size}-{config.graph_depth}"
+        records = synthetic_records(
+            random.Random(f"graph-{seed}"), config.graph_size, config.graph_depth
+        )
+        graph_path = directory / f"log_graph-{graph}.bin"
+        log_graph = LogGraph.from_records(records)
+        log_graph.save(graph_path)
+
+        log_path = directory / f"log-{graph}-{config.log_mb}-output.txt"
+        if not log_path.exists():
+            rng = random.Random(f"log-{seed}")
+            tmp = log_path.with_name(log_path.name + ".tmp")
+            write_synthetic_log(rng, log_graph, tmp, config.log_mb << 20)
+            os.replace(tmp, log_path)
+            logger.info(f"wrote {log_path}")
+
+        repository_path = (
+            directory / f"repository-{seed}-{config.commits}-{config.files}"
+        )
+        if not repository_path.exists():
+            rng = random.Random(f"repository-{seed}")
+            tmp = repository_path.with_name(repository_path.name + ".tmp")
+            shutil.rmtree(tmp, ignore_errors=True)
+            write_synthetic_repository(rng, tmp, config.commits, config.files)
+            os.replace(tmp, repository_path)
+            logger.info(f"wrote {repository_path}")
+
+        rng = random.Random(f"names-{seed}")
+        names = [
+            rng.choice(NAMES) + str(rng.randrange(1 << 12)) for _ in range(1 << 16)
+        ]
+        return cls(records, graph_path, log_path, repository_path, names)
+
+
+def synthetic_records(rng: random.Random, size: int, depth: int) -> list[list[str]]:
+    """extractor rows of a random dominator forest no deeper than `depth`
+
+    Half of the statements hang below the one before them, which gives long
+    chains, the others below any earlier statement or at the root.
+    """
+    depths: list[int] = []
+    records = []
+    for event_id in range(size):
+        idom = -1
+        if event_id > 0 and rng.random() < 0.95:
+            if rng.random() < 0.5:
+                idom = event_id - 1
+            else:
+                idom = rng.randrange(event_id)
+            if depths[idom] >= depth:
+                idom = -1
+        depths.append(1 if idom < 0 else depths[idom] + 1)
+        file_name = f"C{event_id // FILE_SIZE}.java"
+        template = f"event {event_id} with {{{rng.choice(NAMES)}}} and {{}}"
+        records.append(
+            [
+                str(idom),
+                str(event_id),
+                f"src/main/java/ltid/{file_name}",
+                "",
+                "",
+                "",
+                str(event_id % FILE_SIZE + 1),
+                rng.choice(LEVELS),
+                template,
+            ]
+        )
+    return records
+
+
+def write_synthetic_log(
+    rng: random.Random, log_graph: LogGraph, path: Path, size: int
+) -> None:
+    """Hadoop-format lines emitted along random root-to-leaf paths"""
+    roots = [*log_graph.roots]
+    now = datetime(2024, 1, 1)
+    written = 0
+    with open(path, "w") as fp:
+        while written < size:
+            lines = []
+            statement = rng.choice(roots)
+            while True:
+                now += timedelta(microseconds=rng.randrange(4000))
+                timestamp = now.strftime("%Y-%m-%d %H:%M:%S,%f")[:-3]
+                message = re.sub(
+                    r"\{\w*\}",
+                    lambda _: str(rng.randrange(1 << 16)),
+                    statement.template,
+                )
+                lines.append(
+                    f"{timestamp} {statement.level} [main] ltid.C"
+                    f" ({statement.file_name}:run({statement.line_number}))"
+                    f" - {message}\n"
+                )
+                children = statement.children
+                if not children:
+                    break
+                statement = rng.choice(children)
+            written += fp.write("".join(lines))
+
+
+def _java_source(class_name: str, statements: list[str]) -> str:
+    body = "".join(
+        f"        {statement}\n        work();\n" for statement in statements
+    )
+    return (
+        f"class {class_name} {{\n"
+        "    private static final Logger log = Logger.getLogger();\n"
+        "    void run(String path, int userId) {\n"
+        f"{body}"
+        "    }\n"
+        "}\n"
+    )
+
+
+def _log_statement(rng: random.Random) -> str:
+    level = rng.choice(LEVELS).lower()
+    if rng.random() < 0.5:
+        return f'log.{level}("handled {{}}", {rng.choice(NAMES)});'
+    return f'log.{level}("step {rng.randrange(1 << 16)}");'
+
+
+def write_synthetic_repository(
+    rng: random.Random, path: Path, commits: int, files: int
+) -> None:
+    """a git repository whose commits add, remove and edit log statements"""
+    repository = init_repository(str(path))
+    signature = Signature("ltid", "ltid@example.com", 1_700_000_000, 0)
+    sources = {f"C{i}": [_log_statement(rng) for _ in range(8)] for i in range(files)}
+    parents = []
+    for i in range(commits):
+        class_name = rng.choice([*sources])
+        statements = sources[class_name]
+        for _ in range(rng.randrange(1, 4)):
+            change = rng.random()
+            if change < 0.4 or len(statements) < 2:
+                position = rng.randrange(len(statements) + 1)
+                statements.insert(position, _log_statement(rng))
+            elif change < 0.7:
+                del statements[rng.randrange(len(statements))]
+            else:
+                statements[rng.randrange(len(statements))] = _log_statement(rng)
+        for name, body in sources.items():
+            (path / f"{name}.java").write_text(_java_source(name, body))
+        repository.index.add_all()
+        repository.index.write()
+        tree = repository.index.write_tree()
+        when = Signature(signature.name, signature.email, signature.time + i, 0)
+        parents = [repository.create_commit("HEAD", when, when, f"{i}", tree, parents)]
+
+
+def bench_graph_build(config: Namespace, fixtures: Fixtures) -> Timed:
+    return lambda: len(LogGraph.from_records(fixtures.records))
+
+
+def bench_graph_load(config: Namespace, fixtures: Fixtures) -> Timed:
+    # loading only maps the file, the dominator index is what costs
+    return lambda: len(LogGraph.load(fixtures.graph_path).dominator_index)
+
+
+def bench_paths(config: Namespace, fixtures: Fixtures) -> Timed:
+    log_graph = LogGraph.load(fixtures.graph_path)
+    return lambda: sum(1 for _ in log_graph.paths)
+
+
+def bench_parse_log(config: Namespace, fixtures: Fixtures) -> Timed:
+    index = LocationIndex.from_graph(LogGraph.load(fixtures.graph_path))
+    return lambda: len(parse_log(fixtures.log_path, index)[0])
+
+
+def _windows(config: Namespace, fixtures: Fixtures) -> Callable[[], Windows]:
+    index = LocationIndex.from_graph(LogGraph.load(fixtures.graph_path))
+    timestamps, event_ids = parse_log(fixtures.log_path, index)
+    order = np.argsort(timestamps, kind="stable")
+    return lambda: sliding_windows(
+        timestamps[order],
+        event_ids[order],
+        window_size=config.window_size_ms * 1_000_000,
+        min_length=config.min_sequence_length,
+        max_length=config.max_sequence_length,
+    )
+
+
+def bench_windows(config: Namespace, fixtures: Fixtures) -> Timed:
+    windows = _windows(config, fixtures)
+    return lambda: len(windows().tolist())
+
+
+def bench_trie_match(config: Namespace, fixtures: Fixtures) -> Timed:
+    trie = prefixspan(_windows(config, fixtures)().tolist(), config.min_support)
+    log_graph = LogGraph.load(fixtures.graph_path)
+
+    def timed() -> int:
+        matcher = TrieMatcher(trie)
+        return sum(1 for _ in matcher.match_paths(log_graph, config.max_distance))
+
+    return timed
+
+
+def bench_is_id(config: Namespace, fixtures: Fixtures) -> Timed:
+    # a new classifier each time, its cache would make repetitions free
+    return lambda: len(IdClassifier().classify(fixtures.names))
+
+
+def bench_track(config: Namespace, fixtures: Fixtures) -> Timed:
+    repository = Repository(str(fixtures.repository_path))
+    commits = [*walk(repository)]
+
+    def timed() -> int:
+        tracker = DiffTracker(repository, SourceParser("Java"))
+        for commit in commits:
+            tracker.track(commit)
+        return len(commits)
+
+    return timed
+
+
+BENCHMARKS: dict[str, Callable[[Namespace, Fixtures], Timed]] = {
+    "graph_build": bench_graph_build,
+    "graph_load": bench_graph_load,
+    "paths": bench_paths,
+    "parse_log": bench_parse_log,
+    "windows": bench_windows,
+    "trie_match": bench_trie_match,
+    "is_id": bench_is_id,
+    "track": bench_track,
+}
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -1,32 +1,27 @@
 #! /usr/bin/env python
 import json
 import logging
-import pickle
-import re
 import sys
-import traceback
 from argparse import ArgumentParser, Namespace
 from collections import deque
-from collections.abc import Callable, Iterator, Mapping, Sequence
-from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime, timedelta
-from itertools import islice
+from collections.abc import Iterator, Sequence
 from pathlib import Path
 from typing import cast
 
-import pandas as pd
-from ltid.toolkit.log_graph import Loc, LogGraph
+import numpy as np
+from ltid.toolkit.log_graph import LogGraph
+from ltid.toolkit.log_parser import LocationIndex, parse_log
 from ltid.toolkit.log_statement import LogStatement
+from ltid.toolkit.runner import ExperimentRunner, add_runner_arguments, print_results
+from ltid.toolkit.template_matcher import TemplateMatcher
+from ltid.toolkit.timing import span, trace, traced
+from ltid.toolkit.trie_matcher import TrieMatcher
+from ltid.toolkit.windows import sliding_windows
 from prefixspan import prefixspan
 
 logging.basicConfig()
 logger = logging.getLogger(__name__)
 
-LOG_FORMAT_HADOOP = re.compile(
-    r"^(?P<timestamp>[\d -:,]+) .*? \((?P<file_name>\w+.java):.+?\((?P<line_number>\d+)\)\) .*?$",
-    flags=re.MULTILINE,
-)
-
 
 def main(argv: list[str]):
     argument_parser = ArgumentParser()
@@ -37,8 +32,12 @@ def main(argv: list[str]):
     argument_parser.add_argument("--window_size_ms", type=int, default=16)
     argument_parser.add_argument("--min_support", type=int, default=16)
     argument_parser.add_argument("--max_distance", type=float, default=0)
+    argument_parser.add_argument(
+        "--log_matcher", choices=["location", "template"], default="location"
+    )
     argument_parser.add_argument("-v", "--verbose", action="store_true", default=False)
     argument_parser.add_argument("--vverbose", action="store_true", default=False)
+    add_runner_arguments(argument_parser)
     config = argument_parser.parse_args(argv[1:])
 
     if config.verbose:
@@ -46,90 +45,77 @@ def main(argv: list[str]):
     if config.vverbose:
         logger.setLevel(logging.DEBUG)
 
-    with ThreadPoolExecutor() as executor:
+    with ExperimentRunner.from_args(config) as runner:
         for path in cast(Path, config.path).iterdir():
-            executor.submit(write_config, path, config)
+            runner.submit(write_config, path, config)
+        failures = print_results(runner.results())
+    sys.exit(failures > 0)
 
 
-def with_exception[**T, S](f: Callable[T, S]):
-    def g(*args: T.args, **kwargs: T.kwargs):
-        try:
-            return f(*args, **kwargs)
-        except Exception as e:
-            traceback.print_exception(e)
+def write_config(project_path: Path, config: Namespace):
+    with trace(project=str(project_path), script="compare_patterns") as stages:
+        matching_paths = count_matching_paths(project_path, config)
+    stages.dump(project_path / "target" / "ltid_comparison_trace.json")
 
-    return g
+    data = {"matching_paths_count": matching_paths}
+    with open(project_path / "target" / "ltid_comparison.json", "w") as fp:
+        json.dump(data, fp)
+        return fp.name
 
 
-@with_exception
-def write_config(project_path: Path, config: Namespace):
-    with open(project_path / "target" / "log_graph.pkl", "rb") as fp:
-        log_graph: LogGraph = pickle.load(fp)
-    loc_to_id_map = {log.loc: log.event_id for log in log_graph}
+def count_matching_paths(project_path: Path, config: Namespace) -> int:
+    with span("load"):
+        log_graph = LogGraph.load(project_path / "target" / "log_graph.bin")
+        if config.log_matcher == "template":
+            index = TemplateMatcher.from_graph(log_graph)
+        else:
+            index = LocationIndex.from_graph(log_graph)
 
-    logger.info(f"loaded log_graph {log_graph._graph}")
+    logger.info(f"loaded log_graph with {len(log_graph)} statements")
 
-    sequences = [*dataset(config, project_path, loc_to_id_map)]
+    sequences = [*traced("dataset", dataset(config, project_path, index))]
 
-    trie = prefixspan(sequences, config.min_support)
+    with span("prefixspan") as stage:
+        trie = prefixspan(sequences, config.min_support)
+        stage.items = len(sequences)
     logger.info("built patterns")
 
-    matching_paths = 0
-    for path in log_graph.paths:
-        if len(path) < 2:
-            continue
-        m = match(trie, path, config.max_distance)
-        if m is None:
-            continue
-        matching_paths += 1
+    with span("match") as stage:
+        matcher = TrieMatcher(trie)
+        matching_paths = 0
+        stage.items = 0
+        for _, length, distance in matcher.match_paths(log_graph, config.max_distance):
+            stage.items += 1
+            if length >= 2 and distance is not None:
+                matching_paths += 1
+    return matching_paths
 
-    data = {"matching_paths_count": matching_paths}
-    with open(project_path / "target" / "ltid_comparison.json", "w") as fp:
-        json.dump(data, fp)
-        print(fp.name)
 
-
-def dataset(config, path, loc_to_id_map) -> Iterator[Sequence[int]]:
+def dataset(
+    config, path, index: LocationIndex | TemplateMatcher
+) -> Iterator[Sequence[int]]:
     logger.info(f"loading logs from {path}")
     for file in path.glob("**/*-output.txt"):
-        try:
-            timestamp, event_ids = zip(*parse_log(loc_to_id_map, file))
-        except ValueError as e:
-            logger.debug(f"in {file=}, no logs were parsed", exc_info=e)
+        with span("parse_log") as stage:
+            timestamps, event_ids = parse_log(file, index)
+            stage.items = len(timestamps)
+        if len(timestamps) == 0:
+            logger.debug(f"in {file=}, no logs were parsed")
             return
-        series = pd.Series(event_ids, index=timestamp).sort_index()
-        sequences = series.rolling(
-            timedelta(milliseconds=config.window_size_ms),
+        order = np.argsort(timestamps, kind="stable")
+        windows = sliding_windows(
+            timestamps[order],
+            event_ids[order],
+            window_size=config.window_size_ms * 1_000_000,
+            min_length=config.min_sequence_length,
+            max_length=config.max_sequence_length,
+            max_count=config.max_dataset_size if config.max_dataset_size > 0 else None,
         )
-        if config.max_dataset_size > 0:
-            sequences = islice(sequences, config.max_dataset_size)
-        for sequence in sequences:
-            if len(sequence) < config.min_sequence_length:
-                continue
-            yield sequence[: config.max_sequence_length].to_list()
+        yield from windows.tolist()
     logger.info(f"loaded logs from {path}")
 
 
-def parse_log(
-    loc_to_id_map: Mapping[Loc, int], log_file: Path
-) -> Iterator[tuple[datetime, int]]:
-    with log_file.open() as f:
-        for log in f:
-            try:
-                if not (match := re.match(LOG_FORMAT_HADOOP, log)):
-                    continue
-                if (
-                    loc := (match.group("file_name"), int(match.group("line_number")))
-                ) not in loc_to_id_map:
-                    logger.debug(f"unmatched log with {loc=}")
-                    continue
-                dt = datetime.strptime(match.group("timestamp"), "%Y-%m-%d %H:%M:%S,%f")
-                yield dt, loc_to_id_map[loc]
-            except Exception as e:
-                logger.debug(f"in {log_file=} failed to parse {log=}", exc_info=e)
-                continue
-
-
+# reference implementation of TrieMatcher, kept for experiments/bench_match.py
 def match(t: prefixspan, seq: list[LogStatement], d: int) -> int | None:
     k = 0
     for s in seq:
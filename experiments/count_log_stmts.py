@@ -1,36 +1,29 @@
 #! /usr/bin/env python
 import json
-import pickle
-import traceback
+import sys
 from argparse import ArgumentParser
-from collections.abc import Callable
-from concurrent.futures import ThreadPoolExecutor
 from dataclasses import asdict, dataclass
 from pathlib import Path
 from typing import cast
 
+import numpy as np
 from ltid.toolkit.log_graph import LogGraph
-from ltid.toolkit.query import is_id
+from ltid.toolkit.query import ID_HEURISTICS, IdClassifier
+from ltid.toolkit.runner import ExperimentRunner, add_runner_arguments, print_results
 
 
 def main():
     argparser = ArgumentParser()
     argparser.add_argument("--path", type=Path, default=Path.cwd())
+    argparser.add_argument("--id_heuristics", nargs="+", default=ID_HEURISTICS)
+    add_runner_arguments(argparser)
     args = argparser.parse_args()
 
-    with ThreadPoolExecutor() as executor:
+    with ExperimentRunner.from_args(args) as runner:
         for path in cast(Path, args.path).iterdir():
-            executor.submit(write_stats, path)
-
-
-def with_exception[**T, S](f: Callable[T, S]):
-    def g(*args: T.args, **kwargs: T.kwargs):
-        try:
-            return f(*args, **kwargs)
-        except Exception as e:
-            traceback.print_exception(e)
-
-    return g
+            runner.submit(write_stats, path, args.id_heuristics)
+        failures = print_results(runner.results())
+    sys.exit(failures > 0)
 
 
 @dataclass
@@ -40,30 +33,28 @@ class LTIDStats:
     stmt_w_injection_count: int
 
 
-@with_exception
-def write_stats(path: Path):
-    stats = get_stats(path)
+def write_stats(path: Path, id_heuristics: list[str] = ID_HEURISTICS):
+    stats = get_stats(path, IdClassifier(id_heuristics))
     with open(path / "target" / "ltid_log_stmts_count.json", "w") as fp:
         json.dump(asdict(stats), fp)
-        print(fp.name)
-
-
-def get_stats(path: Path) -> LTIDStats:
-    count = 0
-    count_w_id = 0
-    count_w_injection = 0
-
-    with open(path / "target" / "log_graph.pkl", "rb") as fp:
-        log_graph: LogGraph = pickle.load(fp)
-
-    for logtype in log_graph:
-        count += 1
-        if any(is_id(variable) for variable in logtype.variables):
-            count_w_id += 1
-        for dominator in logtype.dominators:
-            if any(is_id(variable) for variable in dominator.variables):
-                count_w_injection += 1
-    return LTIDStats(count, count_w_id, count_w_injection)
+        return fp.name
+
+
+def get_stats(path: Path, classifier: IdClassifier | None = None) -> LTIDStats:
+    if classifier is None:
+        classifier = IdClassifier()
+    log_graph = LogGraph.load(path / "target" / "log_graph.bin")
+
+    variables = [logtype.variables for logtype in log_graph]
+    found = classifier.classify(variable for names in variables for variable in names)
+    owners = np.repeat(np.arange(len(variables)), [len(names) for names in variables])
+    has_id = np.zeros(len(variables), dtype=bool)
+    has_id[owners[found]] = True
+    # every (statement, dominator with an id) pair counts as one injection
+    injections = log_graph.dominator_index.dominator_counts(has_id)
+    return LTIDStats(
+        len(log_graph), int(np.count_nonzero(has_id)), int(injections.sum())
+    )
 
 
 if __name__ == "__main__":
@@ -1,41 +1,97 @@
 import pickle
-import traceback
+import sys
 from argparse import ArgumentParser
-from collections.abc import Callable
-from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import cast
 
+from ltid.toolkit.extractor import RecordFormat, ShardBy
 from ltid.toolkit.log_graph import LogGraph
+from ltid.toolkit.runner import (
+    ExperimentRunner,
+    Stage,
+    add_runner_arguments,
+    print_results,
+    worker_extractor_pool,
+)
+from ltid.toolkit.timing import span, trace
 
 
 def main():
     argument_parser = ArgumentParser()
     argument_parser.add_argument("--path", type=Path, default=Path.cwd())
+    argument_parser.add_argument("--pickle", action="store_true", default=False)
+    argument_parser.add_argument(
+        "--format", choices=["csv", "binary"], default="binary"
+    )
+    argument_parser.add_argument("--extractor_workers", type=int, default=1)
+    argument_parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="extract this many parts of a project at once, each in its own JVM",
+    )
+    argument_parser.add_argument(
+        "--shard_by", choices=["module", "directory"], default="module"
+    )
+    argument_parser.add_argument(
+        "--launcher", choices=["file", "maven"], default="file"
+    )
+    argument_parser.add_argument(
+        "--extractor_heap", help="maximum heap of a shard's JVM, as in -Xmx"
+    )
+    add_runner_arguments(argument_parser)
     args = argument_parser.parse_args()
 
-    with ThreadPoolExecutor() as executor:
+    with ExperimentRunner.from_args(args) as runner:
         for path in cast(Path, args.path).iterdir():
-            executor.submit(write_log_graph, path)
+            runner.submit(
+                write_log_graph,
+                path,
+                args.format,
+                args.pickle,
+                args.extractor_workers,
+                args.shards,
+                args.shard_by,
+                args.launcher,
+                args.extractor_heap,
+                stage=Stage.JVM,
+            )
+        failures = print_results(runner.results())
+    sys.exit(failures > 0)
 
 
-def with_exception[**T, S](f: Callable[T, S]):
-    def g(*args: T.args, **kwargs: T.kwargs):
-        try:
-            return f(*args, **kwargs)
-        except Exception as e:
-            traceback.print_exception(e)
-
-    return g
-
-
-@with_exception
-def write_log_graph(path: Path):
-    log_graph = LogGraph.from_source(path)
-    (path / "target").mkdir(exist_ok=True)
-    with open(path / "target" / "log_graph.pkl", "wb") as fp:
-        pickle.dump(log_graph, fp)
-        print(fp.name)
+def write_log_graph(
+    path: Path,
+    format: RecordFormat,
+    export_pickle: bool = False,
+    extractor_workers: int = 1,
+    shards: int = 1,
+    shard_by: ShardBy = "module",
+    launcher: str = "file",
+    extractor_heap: str | None = None,
+):
+    with trace(project=str(path), script="make_log_graph") as stages:
+        # shards run in JVMs of their own, the worker's JVM serves one at a time
+        pool = None
+        if shards == 1 and extractor_heap is None:
+            pool = worker_extractor_pool(format, extractor_workers)
+        log_graph = LogGraph.from_source(
+            path,
+            launcher=launcher,
+            pool=pool,
+            format=format,
+            workers=extractor_workers,
+            shards=shards,
+            shard_by=shard_by,
+            heap=extractor_heap,
+        )
+        (path / "target").mkdir(exist_ok=True)
+        log_graph.save(path / "target" / "log_graph.bin")
+        if export_pickle:
+            with span("pickle"), open(path / "target" / "log_graph.pkl", "wb") as fp:
+                pickle.dump(log_graph, fp)
+    stages.dump(path / "target" / "log_graph_trace.json")
+    return path / "target" / "log_graph.bin"
 
 
 if __name__ == "__main__":
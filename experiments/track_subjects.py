@@ -0,0 +1,61 @@
+#! /usr/bin/env python
+import logging
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import cast
+
+from ltid.toolkit.timing import span, trace
+from ltid.toolkit.track import track_history
+from ltid.toolkit.track_dataset import DiffTrackWriter
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+
+
+def main(argv: list[str]):
+    argument_parser = ArgumentParser()
+    argument_parser.add_argument("--path", type=Path, default=Path.cwd())
+    argument_parser.add_argument("--workers", type=int, default=None)
+    argument_parser.add_argument("--batch_size", type=int, default=1 << 14)
+    argument_parser.add_argument("--cache", type=Path, default=None)
+    argument_parser.add_argument("-v", "--verbose", action="store_true", default=False)
+    config = argument_parser.parse_args(argv[1:])
+
+    if config.verbose:
+        logger.setLevel(logging.INFO)
+
+    for path in sorted(cast(Path, config.path).iterdir()):
+        print(write_history(path, config))
+
+
+def write_history(project_path: Path, config) -> Path:
+    """track the history of a subject into target/diff_tracks
+
+    Tracked rows are checkpointed, an interrupted run resumes where it
+    stopped and rewrites the dataset from the checkpoint.
+    """
+    target = project_path / "target"
+    target.mkdir(exist_ok=True)
+    logger.info(f"tracking {project_path}")
+    with (
+        trace(project=str(project_path), script="track_subjects") as stages,
+        span("track_history") as stage,
+        DiffTrackWriter(target / "diff_tracks", config.batch_size) as writer,
+    ):
+        writer.extend(
+            track_history(
+                project_path,
+                workers=config.workers,
+                checkpoint=target / "diff_tracks.jsonl",
+                cache_path=config.cache,
+            )
+        )
+        stage.items = len(writer)
+    stages.dump(target / "diff_tracks_trace.json")
+    logger.info(f"tracked {len(writer)} commits of {project_path}")
+    return target / "diff_tracks"
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -3,12 +3,16 @@ package ltid.log_graph;
 import java.util.EnumSet;
 import java.util.Iterator;
 import java.util.NoSuchElementException;
+import java.util.concurrent.CancellationException;
+import java.util.concurrent.ExecutionException;
+import java.util.concurrent.Future;
 
 import org.slf4j.Logger;
 import org.slf4j.LoggerFactory;
 
 import com.github.benmanes.caffeine.cache.Cache;
 import com.github.benmanes.caffeine.cache.Caffeine;
+import com.github.benmanes.caffeine.cache.stats.CacheStats;
 
 import fr.inria.controlflow.BranchKind;
 import fr.inria.controlflow.ControlFlowBuilder;
@@ -24,14 +28,60 @@ import spoon.reflect.declaration.CtExecutable;
 public class DominatorControlFlowGraph implements ForwardFlowGraph {
     Logger logger = LoggerFactory.getLogger(DominatorControlFlowGraph.class);
 
+    /**
+     * Graphs with their dominator tree, built once per executable and shared
+     * by all the log calls in it. At most {@code maximumSize} graphs are kept;
+     * keys are compared by identity, as spoon elements compare structurally.
+     */
     public static class Factory {
-        private Cache<CtExecutable<?>, DominatorControlFlowGraph> cache = Caffeine.newBuilder()
-                .weakKeys()
-                .softValues()
-                .build();
+        public static final long DEFAULT_MAXIMUM_SIZE = 1024;
+
+        private final Cache<CtExecutable<?>, DominatorControlFlowGraph> cache;
+
+        public Factory() {
+            this(DEFAULT_MAXIMUM_SIZE);
+        }
+
+        public Factory(long maximumSize) {
+            cache = Caffeine.newBuilder()
+                    .weakKeys()
+                    .maximumSize(maximumSize)
+                    .recordStats()
+                    .build();
+        }
 
         public DominatorControlFlowGraph get(CtExecutable<?> executable) {
-            return cache.get(executable, DominatorControlFlowGraph::of);
+            return get(executable, null);
+        }
+
+        /**
+         * @param built the graph of {@code executable} being built elsewhere,
+         *              used on a miss instead of building it again
+         */
+        public DominatorControlFlowGraph get(CtExecutable<?> executable, Future<DominatorControlFlowGraph> built) {
+            return cache.get(executable, key -> built != null ? join(built) : of(key).computeDominators());
+        }
+
+        /**
+         * Statistics of the cache, after running its pending evictions.
+         */
+        public CacheStats stats() {
+            cache.cleanUp();
+            return cache.stats();
+        }
+
+        private static DominatorControlFlowGraph join(Future<DominatorControlFlowGraph> built) {
+            try {
+                return built.get();
+            } catch (ExecutionException e) {
+                if (e.getCause() instanceof RuntimeException) {
+                    throw (RuntimeException) e.getCause();
+                }
+                throw new IllegalStateException(e.getCause());
+            } catch (InterruptedException e) {
+                Thread.currentThread().interrupt();
+                throw new CancellationException("interrupted");
+            }
         }
     }
 
@@ -70,10 +120,20 @@ public class DominatorControlFlowGraph implements ForwardFlowGraph {
         return graph.findNodeById(v).next().stream().mapToInt(ControlFlowNode::getId).toArray();
     }
 
-    CtElement idom(CtElement element) {
+    /**
+     * Compute the dominator tree now instead of on the first query, e.g. on a
+     * worker thread. Not thread-safe: the graph must then be handed over to
+     * the querying thread.
+     */
+    public DominatorControlFlowGraph computeDominators() {
         if (tree == null) {
             tree = DominatorTree.snca(this);
         }
+        return this;
+    }
+
+    CtElement idom(CtElement element) {
+        computeDominators();
 
         ControlFlowNode out;
 
@@ -13,37 +13,42 @@ import spoon.support.sniper.SniperJavaPrettyPrinter;
 public class Environment {
 
     static class Converter implements ITypeConverter<Environment> {
-        private static final Pattern pattern =
-                Pattern.compile("(?<scheme>[a-z][a-z0-9]*):(?<paths>.*)");
-
         @Override
         public Environment convert(String value) throws Exception {
-            var uri = pattern.matcher(value);
+            return Environment.of(value);
+        }
+    }
 
-            if (!uri.matches()) {
-                throw new IllegalArgumentException(String.format("invalid model uri %s", value));
-            }
+    private static final Pattern pattern =
+            Pattern.compile("(?<scheme>[a-z][a-z0-9]*):(?<paths>.*)");
 
-            switch (uri.group("scheme")) {
-                case "file": {
-                    var launcher = new Launcher();
-                    for (var path : uri.group("paths").split(";")) {
-                        launcher.addInputResource(path);
-                    }
-                    return new Environment(launcher);
-                }
-                case "maven": {
-                    var launcher = new MavenLauncher(uri.group("paths"), MavenLauncher.SOURCE_TYPE.APP_SOURCE, true);
-                    return new Environment(launcher);
-                }
-                default: {
-                    throw new IllegalArgumentException(String.format("invalid launcher %s", value));
+    public static Environment of(String value) {
+        var uri = pattern.matcher(value);
+
+        if (!uri.matches()) {
+            throw new IllegalArgumentException(String.format("invalid model uri %s", value));
+        }
+
+        switch (uri.group("scheme")) {
+            case "file": {
+                var launcher = new Launcher();
+                for (var path : uri.group("paths").split(";")) {
+                    launcher.addInputResource(path);
                 }
+                return new Environment(launcher);
+            }
+            case "maven": {
+                var launcher = new MavenLauncher(uri.group("paths"), MavenLauncher.SOURCE_TYPE.APP_SOURCE, true);
+                return new Environment(launcher);
+            }
+            default: {
+                throw new IllegalArgumentException(String.format("invalid launcher %s", value));
             }
         }
     }
 
     private final Launcher launcher;
+    private final Timings timings = new Timings();
 
     private Environment(Launcher launcher) {
         this.launcher = launcher;
@@ -61,7 +66,13 @@ public class Environment {
     }
 
     public CtModel model() {
-        return launcher.buildModel();
+        try (var stage = timings.start("model")) {
+            return launcher.buildModel();
+        }
+    }
+
+    public Timings timings() {
+        return timings;
     }
     
     public CtPackage rootPackage() {
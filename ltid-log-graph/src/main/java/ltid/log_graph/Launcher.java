@@ -8,6 +8,7 @@ import java.util.Optional;
 
 import ltid.log_graph.commands.Injections;
 import ltid.log_graph.commands.OutputGraph;
+import ltid.log_graph.commands.Serve;
 import picocli.CommandLine;
 import picocli.CommandLine.Command;
 import picocli.CommandLine.Model.CommandSpec;
@@ -20,6 +21,11 @@ public class Launcher {
         System.exit(new CommandLine(new Launcher()).execute(argv));
     }
 
+    // more than one worker reads the Spoon model from several threads, see
+    // LogEventFactory, which is not known to be safe
+    private static final String WORKERS = "threads building dominator trees (default: ${DEFAULT-VALUE}),"
+            + " more than one assumes the Spoon model can be read concurrently";
+
     @Spec
     CommandSpec spec;
 
@@ -27,6 +33,9 @@ public class Launcher {
             "--environment" }, defaultValue = "file:.", converter = Environment.Converter.class)
     Environment env;
 
+    @Option(names = { "-t", "--timings" }, description = "print the time taken by each stage on stderr")
+    boolean timings;
+
     public PrintWriter out() {
         return spec.commandLine().getOut();
     }
@@ -39,10 +48,31 @@ public class Launcher {
         } else {
             Injections.execute(out(), env, Optional.empty());
         }
+        printTimings();
     }
 
     @Command(name = "output", mixinStandardHelpOptions = true)
-    void output() throws IOException {
-        OutputGraph.run(out(), env);
+    void output(@Option(names = { "-f", "--format" }, defaultValue = "CSV") OutputGraph.Format format,
+            @Option(names = { "-w", "--workers" }, defaultValue = "1", description = WORKERS) int workers)
+            throws IOException {
+        if (format == OutputGraph.Format.CSV) {
+            OutputGraph.run(out(), env, workers);
+        } else {
+            OutputGraph.run(System.out, env, format, workers);
+        }
+        printTimings();
+    }
+
+    @Command(name = "serve", mixinStandardHelpOptions = true)
+    void serve(@Option(names = { "-f", "--format" }, defaultValue = "CSV") OutputGraph.Format format,
+            @Option(names = { "-w", "--workers" }, defaultValue = "1", description = WORKERS) int workers)
+            throws IOException {
+        Serve.run(System.in, System.out, format, workers);
+    }
+
+    private void printTimings() {
+        if (timings) {
+            env.timings().print(System.err);
+        }
     }
 }
@@ -0,0 +1,123 @@
+package ltid.log_graph;
+
+import java.io.IOException;
+import java.io.PrintStream;
+import java.lang.management.ManagementFactory;
+import java.lang.management.MemoryPoolMXBean;
+import java.lang.management.MemoryType;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.util.ArrayList;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Locale;
+import java.util.Map;
+
+/**
+ * Wall time, cpu time, item count and memory peaks of the stages of a run.
+ *
+ * A stage is opened with {@link #start(String)} and closed with
+ * try-with-resources. {@link #print(PrintStream)} writes one line per stage,
+ * {@code timing <stage> wall=<s> cpu=<s> rss=<bytes> heap=<bytes> items=<n>},
+ * where cpu counts every thread of the JVM, rss is the peak resident size of
+ * the process so far (0 where /proc is not available) and heap is the peak
+ * heap use during the stage. Counters recorded with
+ * {@link #count(String, long)} follow as {@code count <name> <n>}.
+ */
+public class Timings {
+    private static final Path STATUS = Path.of("/proc/self/status");
+
+    public class Stage implements AutoCloseable {
+        private final String name;
+        private final long startWall;
+        private final long startCpu;
+        private long wall;
+        private long cpu;
+        private long rss;
+        private long heap;
+        private long items;
+
+        private Stage(String name) {
+            this.name = name;
+            heapPools().forEach(MemoryPoolMXBean::resetPeakUsage);
+            this.startCpu = processCpuTime();
+            this.startWall = System.nanoTime();
+        }
+
+        public void add(long count) {
+            items += count;
+        }
+
+        public void increment() {
+            items++;
+        }
+
+        @Override
+        public void close() {
+            wall = System.nanoTime() - startWall;
+            cpu = processCpuTime() - startCpu;
+            heap = heapPools().stream().mapToLong(pool -> pool.getPeakUsage().getUsed()).sum();
+            rss = peakResidentSize();
+            synchronized (stages) {
+                stages.add(this);
+            }
+        }
+
+        @Override
+        public String toString() {
+            return String.format(Locale.ROOT, "timing %s wall=%.3f cpu=%.3f rss=%d heap=%d items=%d",
+                    name, wall / 1e9, cpu / 1e9, rss, heap, items);
+        }
+    }
+
+    private final List<Stage> stages = new ArrayList<>();
+    private final Map<String, Long> counts = new LinkedHashMap<>();
+
+    public Stage start(String name) {
+        return new Stage(name);
+    }
+
+    public void count(String name, long value) {
+        synchronized (counts) {
+            counts.merge(name, value, Long::sum);
+        }
+    }
+
+    public void print(PrintStream out) {
+        synchronized (stages) {
+            stages.forEach(out::println);
+        }
+        synchronized (counts) {
+            counts.forEach((name, value) -> out.println("count " + name + " " + value));
+        }
+        out.flush();
+    }
+
+    private static List<MemoryPoolMXBean> heapPools() {
+        return ManagementFactory.getMemoryPoolMXBeans().stream()
+                .filter(pool -> pool.getType() == MemoryType.HEAP)
+                .toList();
+    }
+
+    private static long processCpuTime() {
+        var os = ManagementFactory.getOperatingSystemMXBean();
+        if (os instanceof com.sun.management.OperatingSystemMXBean) {
+            return ((com.sun.management.OperatingSystemMXBean) os).getProcessCpuTime();
+        }
+        return ManagementFactory.getThreadMXBean().getCurrentThreadCpuTime();
+    }
+
+    private static long peakResidentSize() {
+        try {
+            for (var line : Files.readAllLines(STATUS)) {
+                if (line.startsWith("VmHWM:")) {
+                    var kibibytes = line.substring("VmHWM:".length()).replace("kB", "").trim();
+                    return Long.parseLong(kibibytes) * 1024;
+                }
+            }
+        } catch (IOException | NumberFormatException e) {
+            // not linux
+        }
+        return 0;
+    }
+}
@@ -1,7 +1,12 @@
 package ltid.log_graph.commands;
 
+import java.io.BufferedOutputStream;
+import java.io.DataOutputStream;
 import java.io.IOException;
+import java.io.OutputStream;
+import java.io.OutputStreamWriter;
 import java.io.Writer;
+import java.nio.charset.StandardCharsets;
 
 import com.opencsv.CSVWriter;
 
@@ -11,28 +16,99 @@ import ltid.log_graph.events.factory.LogEventFactory;
 
 public class OutputGraph {
 
+    public enum Format {
+        CSV, BINARY
+    }
+
     public static void run(Writer out, Environment env) throws IOException {
-        new OutputGraph(out, env).run();
+        run(out, env, 1);
+    }
+
+    public static void run(Writer out, Environment env, int workers) throws IOException {
+        new OutputGraph(env, workers).csv(out);
+    }
+
+    public static void run(OutputStream out, Environment env, Format format) throws IOException {
+        run(out, env, format, 1);
+    }
+
+    public static void run(OutputStream out, Environment env, Format format, int workers) throws IOException {
+        switch (format) {
+            case CSV: {
+                new OutputGraph(env, workers).csv(new OutputStreamWriter(out, StandardCharsets.UTF_8));
+                break;
+            }
+            case BINARY: {
+                new OutputGraph(env, workers).binary(out);
+                break;
+            }
+        }
     }
 
-    private final Writer out;
     private final Environment env;
+    private final int workers;
 
-    private OutputGraph(Writer out, Environment env) {
-        this.out = out;
+    private OutputGraph(Environment env, int workers) {
         this.env = env;
+        this.workers = workers;
     }
 
-    private void run() throws IOException {
-        try (CSVWriter writer = new CSVWriter(out)) {
-            new LogEventFactory().stream(env.rootPackage())
+    private void csv(Writer out) throws IOException {
+        var root = env.rootPackage();
+        try (var stage = env.timings().start("events");
+                var factory = new LogEventFactory(workers);
+                CSVWriter writer = new CSVWriter(out)) {
+            factory.stream(root)
                     .map(this::toRecord)
+                    .peek(record -> stage.increment())
                     .forEach(writer::writeNext);
+            count(factory);
         } catch (IOException e) {
-            
+
+        }
+    }
+
+    /**
+     * Write length-prefixed big-endian records: the dominator id, event id and
+     * line number as int32, then the path, package, class, method, level and
+     * template as an int32 byte length followed by utf-8 bytes.
+     */
+    private void binary(OutputStream stream) throws IOException {
+        var out = new DataOutputStream(new BufferedOutputStream(stream, 1 << 16));
+        var root = env.rootPackage();
+        try (var stage = env.timings().start("events"); var factory = new LogEventFactory(workers)) {
+            var events = factory.stream(root).iterator();
+            while (events.hasNext()) {
+                var logEvent = events.next();
+                out.writeInt(logEvent.dominator().map(d -> d.id()).orElse(-1));
+                out.writeInt(logEvent.id());
+                out.writeInt(logEvent.getPosition().getLine());
+                writeString(out, logEvent.getPosition().getFile().getPath().toString());
+                writeString(out, logEvent.getDeclaringType().getQualifiedName());
+                writeString(out, logEvent.getDeclaringType().getQualifiedName());
+                writeString(out, logEvent.getExecutable().map(e -> e.getSimpleName()).orElse("<init>"));
+                writeString(out, String.valueOf(logEvent.level()));
+                writeString(out, logEvent.template());
+                stage.increment();
+            }
+            out.flush();
+            count(factory);
         }
     }
 
+    private void count(LogEventFactory factory) {
+        var stats = factory.graphStats();
+        env.timings().count("dominator_cache_hits", stats.hitCount());
+        env.timings().count("dominator_cache_misses", stats.missCount());
+        env.timings().count("dominator_cache_evictions", stats.evictionCount());
+    }
+
+    private static void writeString(DataOutputStream out, String string) throws IOException {
+        var bytes = string.getBytes(StandardCharsets.UTF_8);
+        out.writeInt(bytes.length);
+        out.write(bytes);
+    }
+
     private String[] toRecord(LogEvent logEvent) {
         String dominator = String.valueOf(logEvent.dominator().map(d -> d.id()).orElse(-1));
         String logEventId = String.valueOf(logEvent.id());
@@ -0,0 +1,61 @@
+package ltid.log_graph.commands;
+
+import java.io.BufferedReader;
+import java.io.ByteArrayOutputStream;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.InputStreamReader;
+import java.io.OutputStream;
+import java.nio.charset.StandardCharsets;
+
+import org.slf4j.Logger;
+import org.slf4j.LoggerFactory;
+
+import ltid.log_graph.Environment;
+
+/**
+ * Serve {@code output} requests from a long-lived JVM.
+ *
+ * Each request is one line holding an environment uri, e.g. {@code file:/path}.
+ * Each response is a header line {@code <status> <length>} followed by
+ * {@code length} bytes of payload: the records in the served format on
+ * {@code OK}, the utf-8 error message on {@code ERR}.
+ */
+public class Serve {
+    private static final Logger logger = LoggerFactory.getLogger(Serve.class);
+
+    private Serve() {
+    }
+
+    public static void run(InputStream in, OutputStream out, OutputGraph.Format format) throws IOException {
+        run(in, out, format, 1);
+    }
+
+    public static void run(InputStream in, OutputStream out, OutputGraph.Format format, int workers)
+            throws IOException {
+        var reader = new BufferedReader(new InputStreamReader(in, StandardCharsets.UTF_8));
+        String request;
+        while ((request = reader.readLine()) != null) {
+            if (request.isBlank()) {
+                continue;
+            }
+
+            String status;
+            byte[] bytes;
+            try {
+                var buffer = new ByteArrayOutputStream();
+                OutputGraph.run(buffer, Environment.of(request), format, workers);
+                status = "OK";
+                bytes = buffer.toByteArray();
+            } catch (Exception e) {
+                logger.error("while serving {}", request, e);
+                status = "ERR";
+                bytes = String.valueOf(e).getBytes(StandardCharsets.UTF_8);
+            }
+
+            out.write(String.format("%s %d\n", status, bytes.length).getBytes(StandardCharsets.UTF_8));
+            out.write(bytes);
+            out.flush();
+        }
+    }
+}
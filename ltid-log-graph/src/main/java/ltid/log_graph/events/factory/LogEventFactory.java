@@ -3,8 +3,13 @@ package ltid.log_graph.events.factory;
 import java.util.ArrayList;
 import java.util.Collection;
 import java.util.Iterator;
+import java.util.IdentityHashMap;
 import java.util.List;
+import java.util.Map;
 import java.util.Optional;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import java.util.concurrent.Future;
 import java.util.regex.Pattern;
 import java.util.stream.Stream;
 import java.util.stream.StreamSupport;
@@ -12,8 +17,7 @@ import java.util.stream.StreamSupport;
 import org.slf4j.Logger;
 import org.slf4j.LoggerFactory;
 
-import com.github.benmanes.caffeine.cache.Cache;
-import com.github.benmanes.caffeine.cache.Caffeine;
+import com.github.benmanes.caffeine.cache.stats.CacheStats;
 
 import ltid.log_graph.Counter;
 import ltid.log_graph.DominatorControlFlowGraph;
@@ -26,29 +30,149 @@ import spoon.reflect.declaration.CtElement;
 import spoon.reflect.declaration.CtExecutable;
 import spoon.reflect.path.CtPath;
 
-public class LogEventFactory {
+public class LogEventFactory implements AutoCloseable {
     private static final Logger logger = LoggerFactory.getLogger(LogEventFactory.class);
     private static final Pattern LOG_FORMAT_PATTERN = Pattern.compile("(?<!\\\\)\\\\\\{\\\\\\}");
 
-    private DominatorControlFlowGraph.Factory graphFactory = new DominatorControlFlowGraph.Factory();
+    private final DominatorControlFlowGraph.Factory graphFactory;
 
-    private Cache<CtElement, Optional<LogEvent>> cache = Caffeine.newBuilder()
-            .weakKeys()
-            .softValues()
-            .build();
+    // events keep their id for the whole run, so they are never evicted;
+    // spoon elements compare structurally, hence the identity map
+    private final Map<CtElement, Optional<LogEvent>> events = new IdentityHashMap<>();
 
     private Iterator<Integer> counter = new Counter().iterator();
 
+    private final int workers;
+
+    // with workers, the executables holding candidate log calls in stream
+    // order, and the graphs being built ahead of the sequential pass
+    private final List<CtExecutable<?>> ahead = new ArrayList<>();
+    private final Map<CtExecutable<?>, Integer> positions = new IdentityHashMap<>();
+    private final Map<CtExecutable<?>, Future<DominatorControlFlowGraph>> pending = new IdentityHashMap<>();
+    private int passed = 0;
+    private int submitted = 0;
+    private ExecutorService executor;
+
+    public LogEventFactory() {
+        this(1);
+    }
+
+    public LogEventFactory(int workers) {
+        this(workers, DominatorControlFlowGraph.Factory.DEFAULT_MAXIMUM_SIZE);
+    }
+
+    /**
+     * With more than one worker, control flow graphs are built from the
+     * Spoon model on worker threads while the sequential pass reads the same
+     * model. Spoon documents no thread safety for its model; this relies on
+     * the model being fully built and only read during the pass, without
+     * Spoon filling lazy state (references, type resolution) concurrently.
+     * That has not been shown, so the launcher defaults to a single worker
+     * and more workers are opt-in.
+     *
+     * @param workers   number of threads computing control flow graphs and
+     *                  dominator trees, the events are the same for any number
+     * @param cacheSize number of dominator trees kept for reuse
+     */
+    public LogEventFactory(int workers, long cacheSize) {
+        this.workers = workers;
+        this.graphFactory = new DominatorControlFlowGraph.Factory(cacheSize);
+    }
+
+    /**
+     * Stream the log events under {@code root}. Ids continue across the
+     * streams of a factory; {@link #close()} it afterwards to stop its
+     * workers.
+     */
     public Stream<LogEvent> stream(CtElement root) {
-        var factory = new LogEventFactory();
+        prepare(root);
 
         var elements = root.asIterable().spliterator();
         return StreamSupport.stream(elements, false)
-                .flatMap(e -> factory.get(e).stream());
+                .flatMap(e -> get(e).stream());
+    }
+
+    /**
+     * Hit and miss counts of the dominator trees, one miss per tree built.
+     */
+    public CacheStats graphStats() {
+        return graphFactory.stats();
+    }
+
+    @Override
+    public void close() {
+        if (executor != null) {
+            executor.shutdownNow();
+        }
+    }
+
+    /**
+     * List the executables holding a candidate log call for the workers,
+     * which build their dominator trees a bounded window ahead of the
+     * sequential pass. Events and their ids are still created by that pass
+     * in the same order as without workers, so the output does not depend on
+     * their number.
+     */
+    private void prepare(CtElement root) {
+        if (workers <= 1) {
+            return;
+        }
+        for (CtElement element : root.asIterable()) {
+            if (isCandidate(element)) {
+                CtExecutable<?> executable = element.getParent(CtExecutable.class);
+                if (executable != null && !positions.containsKey(executable)) {
+                    positions.put(executable, ahead.size());
+                    ahead.add(executable);
+                }
+            }
+        }
+        if (executor != null) {
+            return;
+        }
+        executor = Executors.newFixedThreadPool(workers, runnable -> {
+            var thread = new Thread(runnable, "dominators");
+            thread.setDaemon(true);
+            return thread;
+        });
+    }
+
+    private DominatorControlFlowGraph graph(CtExecutable<?> executable) {
+        Integer position = positions.get(executable);
+        if (executor == null || position == null) {
+            return graphFactory.get(executable);
+        }
+        // executables passed over held no log after all
+        while (passed < position) {
+            var skipped = pending.remove(ahead.get(passed++));
+            if (skipped != null) {
+                skipped.cancel(true);
+            }
+        }
+        while (submitted < ahead.size() && submitted <= passed + 4 * workers) {
+            CtExecutable<?> next = ahead.get(submitted++);
+            pending.put(next, executor.submit(() -> DominatorControlFlowGraph.of(next).computeDominators()));
+        }
+        return graphFactory.get(executable, pending.remove(executable));
+    }
+
+    private static boolean isCandidate(CtElement element) {
+        if (!(element instanceof CtInvocation<?>)) {
+            return false;
+        }
+        CtExpression<?> target = ((CtInvocation<?>) element).getTarget();
+        return target != null && target.toStringDebug().toLowerCase().contains("log");
     }
 
     public Optional<LogEvent> get(CtElement element) {
-        return cache.get(element, this::trycreate);
+        if (!(element instanceof CtInvocation<?>)) {
+            return Optional.empty();
+        }
+        var event = events.get(element);
+        if (event == null) {
+            event = trycreate(element);
+            events.put(element, event);
+        }
+        return event;
     }
 
     /**
@@ -170,7 +294,7 @@ public class LogEventFactory {
             return Optional.empty();
         }
         // find youngest dominator that is an event
-        DominatorControlFlowGraph graph = graphFactory.get(executable);
+        DominatorControlFlowGraph graph = graph(executable);
         for (CtElement dominating_element : graph.dominators(element)) {
             Optional<LogEvent> dominator = get(dominating_element);
             if (dominator.isPresent()) {
@@ -1,20 +1,42 @@
 package anana2.sense.logid;
 
 import static org.junit.jupiter.api.Assertions.assertAll;
+import static org.junit.jupiter.api.Assertions.assertArrayEquals;
 import static org.junit.jupiter.api.Assertions.assertDoesNotThrow;
 import static org.junit.jupiter.api.Assertions.assertEquals;
+import static org.junit.jupiter.api.Assertions.assertNotEquals;
+import static org.junit.jupiter.api.Assertions.assertTrue;
 import static org.junit.jupiter.params.provider.Arguments.arguments;
+import java.io.ByteArrayInputStream;
+import java.io.ByteArrayOutputStream;
+import java.io.DataInputStream;
+import java.io.IOException;
+import java.io.OutputStreamWriter;
+import java.io.PrintStream;
 import java.io.PrintWriter;
 import java.io.StringWriter;
 import java.net.URISyntaxException;
+import java.nio.charset.StandardCharsets;
 import java.nio.file.Path;
+import java.util.Arrays;
+import java.util.List;
+import java.util.stream.Collectors;
 
+import org.junit.jupiter.api.Test;
 import org.junit.jupiter.params.ParameterizedTest;
 import org.junit.jupiter.params.provider.Arguments;
 import org.junit.jupiter.params.provider.MethodSource;
 
+import com.opencsv.CSVWriter;
+
+import ltid.log_graph.Environment;
 import ltid.log_graph.Launcher;
+import ltid.log_graph.commands.OutputGraph;
+import ltid.log_graph.commands.Serve;
+import ltid.log_graph.events.LogEvent;
+import ltid.log_graph.events.factory.LogEventFactory;
 import picocli.CommandLine;
+import spoon.reflect.declaration.CtElement;
 
 public class CLITests {
 
@@ -46,6 +68,136 @@ public class CLITests {
                         "\"\",\"0\",\"INFO\",\"Hello World!\"\n") };
     }
 
+    @ParameterizedTest
+    @MethodSource("output_cases")
+    void outputDoesNotDependOnWorkers(String env, String format) {
+        var expected = output(env, format, 1);
+        assertAll(
+                () -> assertNotEquals(0, expected.length),
+                () -> assertArrayEquals(expected, output(env, format, 4)));
+    }
+
+    static Arguments[] output_cases() {
+        var envs = new String[] {
+                file("WhileEmptyBody.java"),
+                file("JavaUtilLogging.java"),
+                file("MultilineLogging.java"),
+                file("LogWithID.java"),
+                maven("sample"),
+                file(""),
+        };
+        var cases = new Arguments[envs.length * 2];
+        for (int i = 0; i < envs.length; i++) {
+            cases[2 * i] = arguments(envs[i], "CSV");
+            cases[2 * i + 1] = arguments(envs[i], "BINARY");
+        }
+        return cases;
+    }
+
+    /**
+     * Bytes written by the {@code output} command, which writes CSV to the
+     * command line's writer and BINARY to {@link System#out}.
+     */
+    static byte[] output(String env, String format, int workers) {
+        var bytes = new ByteArrayOutputStream();
+        var stdout = System.out;
+        System.setOut(new PrintStream(bytes, true));
+        try {
+            var out = new PrintWriter(new OutputStreamWriter(bytes, StandardCharsets.UTF_8));
+            var err = new CommandLine(new Launcher())
+                    .setOut(out)
+                    .execute("-e", env, "output", "-f", format, "-w", String.valueOf(workers));
+            out.flush();
+            assertEquals(0, err);
+        } finally {
+            System.setOut(stdout);
+        }
+        return bytes.toByteArray();
+    }
+
+    @ParameterizedTest
+    @MethodSource("binary_cases")
+    void binaryDecodesToCsv(String env) throws IOException {
+        var in = new DataInputStream(new ByteArrayInputStream(output(env, "BINARY", 1)));
+        var csv = new StringWriter();
+        try (var writer = new CSVWriter(csv)) {
+            while (in.available() > 0) {
+                var dominator = in.readInt();
+                var id = in.readInt();
+                var line = in.readInt();
+                var strings = new String[6];
+                for (int i = 0; i < strings.length; i++) {
+                    strings[i] = new String(in.readNBytes(in.readInt()), StandardCharsets.UTF_8);
+                }
+                writer.writeNext(new String[] {
+                        String.valueOf(dominator),
+                        String.valueOf(id),
+                        strings[0],
+                        strings[1],
+                        strings[2],
+                        strings[3],
+                        String.valueOf(line),
+                        strings[4],
+                        strings[5],
+                });
+            }
+        }
+        assertEquals(new String(output(env, "CSV", 1), StandardCharsets.UTF_8), csv.toString());
+    }
+
+    static String[] binary_cases() {
+        return new String[] {
+                file("MultilineLogging.java"),
+                file("LogWithID.java"),
+                maven("sample"),
+        };
+    }
+
+    @Test
+    void smallDominatorCacheEvicts() {
+        var root = Environment.of(file("ManyMethods.java")).rootPackage();
+        try (var bounded = new LogEventFactory(1, 1); var factory = new LogEventFactory()) {
+            var events = events(bounded, root);
+            var stats = bounded.graphStats();
+            assertAll(
+                    () -> assertEquals(events(factory, root), events),
+                    () -> assertEquals(6, events.size()),
+                    () -> assertEquals(3, factory.graphStats().missCount()),
+                    () -> assertTrue(stats.evictionCount() > 0),
+                    () -> assertTrue(stats.missCount() - stats.evictionCount() <= 1));
+        }
+    }
+
+    static List<String> events(LogEventFactory factory, CtElement root) {
+        return factory.stream(root)
+                .map(e -> String.format("%d %d %s",
+                        e.dominator().map(LogEvent::id).orElse(-1), e.id(), e.template()))
+                .collect(Collectors.toList());
+    }
+
+    @Test
+    void serveAnswersEveryRequest() throws IOException {
+        var envs = new String[] { file("WhileEmptyBody.java"), file("LogWithID.java") };
+        var requests = String.format("%s\n\n%s\n", envs[0], envs[1]);
+        var out = new ByteArrayOutputStream();
+        Serve.run(new ByteArrayInputStream(requests.getBytes(StandardCharsets.UTF_8)), out,
+                OutputGraph.Format.CSV);
+
+        var responses = out.toByteArray();
+        int offset = 0;
+        for (var env : envs) {
+            int newline = offset;
+            while (responses[newline] != '\n') {
+                newline++;
+            }
+            var header = new String(responses, offset, newline - offset, StandardCharsets.UTF_8).split(" ");
+            assertEquals("OK", header[0]);
+            offset = newline + 1 + Integer.parseInt(header[1]);
+            assertArrayEquals(output(env, "CSV", 1), Arrays.copyOfRange(responses, newline + 1, offset));
+        }
+        assertEquals(responses.length, offset);
+    }
+
     public static String path(String resource) {
         try {
             var uri = CLITests.class
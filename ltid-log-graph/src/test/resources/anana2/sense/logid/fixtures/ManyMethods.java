@@ -0,0 +1,26 @@
+import java.util.logging.Logger;
+
+public class ManyMethods {
+    private static Logger logger = Logger.getLogger(ManyMethods.class.getName());
+
+    void first(boolean again) {
+        logger.info("first");
+        if (again) {
+            logger.info("first again");
+        }
+    }
+
+    void second(boolean again) {
+        logger.info("second");
+        if (again) {
+            logger.info("second again");
+        }
+    }
+
+    void third(boolean again) {
+        logger.info("third");
+        if (again) {
+            logger.info("third again");
+        }
+    }
+}
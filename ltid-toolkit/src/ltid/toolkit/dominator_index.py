@@ -0,0 +1,121 @@
+from typing import TYPE_CHECKING
+
+import numpy as np
+import numpy.typing as npt
+
+if TYPE_CHECKING:
+    from ltid.toolkit.log_graph import LogGraph
+
+__all__ = ["DominatorIndex"]
+
+type IntArray = npt.NDArray[np.int32]
+type BoolArray = npt.NDArray[np.bool_]
+
+
+class DominatorIndex:
+    """ancestor queries over the dominator tree of a `LogGraph`
+
+    Rows are numbered in depth-first preorder, so the statements dominated by
+    row `a` are exactly the rows whose `_enter` lies in
+    `(_enter[a], _enter[a] + _sizes[a])`. `_jumps[k][a]` is the `2**k`-th
+    dominator of `a` (roots point to themselves) for lowest common dominators.
+    Everything is built level by level with numpy, without walking paths.
+    """
+
+    _idoms: IntArray
+    _levels: list[IntArray]
+    _depths: IntArray
+    _sizes: IntArray
+    _enter: IntArray
+    _jumps: list[IntArray]
+
+    def __init__(self, log_graph: "LogGraph"):
+        n = len(log_graph)
+        self._idoms = log_graph._idoms
+        self._levels = [*log_graph._rows_by_depth()]
+
+        self._depths = np.zeros(n, dtype=np.int32)
+        for depth, rows in enumerate(self._levels, start=1):
+            self._depths[rows] = depth
+
+        # subtree sizes, bottom-up
+        self._sizes = np.ones(n, dtype=np.int32)
+        for rows in reversed(self._levels[1:]):
+            np.add.at(self._sizes, self._idoms[rows], self._sizes[rows])
+
+        # preorder numbers, top-down; the rows of a level are grouped by
+        # parent in child order, so siblings are numbered after the sizes
+        # of the siblings before them
+        self._enter = np.zeros(n, dtype=np.int32)
+        for i, rows in enumerate(self._levels):
+            sizes = self._sizes[rows]
+            before = np.cumsum(sizes) - sizes
+            if i == 0:
+                self._enter[rows] = before
+                continue
+            parents = self._idoms[rows]
+            first = np.flatnonzero(np.r_[True, parents[1:] != parents[:-1]])
+            group = np.repeat(first, np.diff(np.r_[first, len(rows)]))
+            self._enter[rows] = self._enter[parents] + 1 + before - before[group]
+
+        up = np.where(self._idoms < 0, np.arange(n, dtype=np.int32), self._idoms)
+        self._jumps = [up.astype(np.int32)]
+        for _ in range(1, max(1, len(self._levels) - 1).bit_length()):
+            up = self._jumps[-1]
+            self._jumps.append(up[up])
+
+    def __len__(self) -> int:
+        return len(self._depths)
+
+    @property
+    def depths(self) -> IntArray:
+        """length of the path from a root to each row, 1 for roots"""
+        return self._depths
+
+    def depth(self, row: int) -> int:
+        return int(self._depths[row])
+
+    def dominates(self, a: int, b: int) -> bool:
+        """whether row `a` strictly dominates row `b`"""
+        enter = int(self._enter[a])
+        return enter < int(self._enter[b]) < enter + int(self._sizes[a])
+
+    def _dominates_or_is(self, a: int, b: int) -> bool:
+        return a == b or self.dominates(a, b)
+
+    def common_dominator(self, a: int, b: int) -> int | None:
+        """lowest row dominating or equal to both `a` and `b`, None across trees"""
+        if self._dominates_or_is(a, b):
+            return a
+        if self._dominates_or_is(b, a):
+            return b
+        for jumps in reversed(self._jumps):
+            up = int(jumps[a])
+            if not self._dominates_or_is(up, b):
+                a = up
+        a = int(self._idoms[a])
+        if a < 0:
+            return None
+        return a
+
+    def _top_down(self, mask: BoolArray) -> tuple[IntArray, IntArray]:
+        nearest = np.full(len(self), -1, dtype=np.int32)
+        counts = np.zeros(len(self), dtype=np.int32)
+        for rows in self._levels[1:]:
+            parents = self._idoms[rows]
+            flagged = mask[parents]
+            nearest[rows] = np.where(flagged, parents, nearest[parents])
+            counts[rows] = counts[parents] + flagged
+        return nearest, counts
+
+    def nearest_dominators(self, mask: BoolArray) -> IntArray:
+        """closest strict dominator of each row with `mask` set, -1 if none"""
+        return self._top_down(np.asarray(mask, dtype=bool))[0]
+
+    def dominator_counts(self, mask: BoolArray) -> IntArray:
+        """number of strict dominators of each row with `mask` set"""
+        return self._top_down(np.asarray(mask, dtype=bool))[1]
+
+    def any_dominator(self, mask: BoolArray) -> BoolArray:
+        """whether some strict dominator of each row has `mask` set"""
+        return self.nearest_dominators(mask) >= 0
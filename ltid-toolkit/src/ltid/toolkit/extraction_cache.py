@@ -0,0 +1,272 @@
+import csv
+import hashlib
+import json
+import os
+from collections.abc import Callable, Iterator, Sequence
+from pathlib import Path
+from typing import Any
+
+from ltid.toolkit.extractor import ExtractorPool, RecordFormat, extract_log_statements
+from ltid.toolkit.java_constants import constant_sources, declared_constants, used_names
+
+__all__ = ["ExtractionCache"]
+
+
+class ExtractionCache:
+    """per-file cache of extracted rows, keyed by source content hash
+
+    Rows are stored with file-local ids. Every file owns a block of event ids
+    recorded in the manifest, so the ids of unchanged files are stable across
+    rebuilds and only files with new content are handed to the extractor.
+
+    The extractor then builds a model of those files only, while templates
+    depend on declarations in other files. The `final String` constants they
+    inline are tracked by name, see `_stale`: files using a changed constant
+    are extracted again, with the files declaring the constants they use.
+    Other declarations, such as the types of format arguments, are not
+    tracked and may resolve differently than in a full model; `verify`
+    compares the cache with a full extraction.
+    """
+
+    _MANIFEST_VERSION = 2
+    # upper bound on the length of the `file:` environment of one extractor run
+    _ENVIRONMENT_SIZE = 1 << 17
+
+    _cache_dir: Path
+    _pool: ExtractorPool | None
+    _format: RecordFormat
+    _workers: int
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        pool: ExtractorPool | None = None,
+        format: RecordFormat = "csv",
+        workers: int = 1,
+    ):
+        self._cache_dir = cache_dir
+        self._pool = pool
+        self._format = format
+        self._workers = workers
+
+    @property
+    def _manifest_path(self) -> Path:
+        return self._cache_dir / "manifest.json"
+
+    def _rows_path(self, digest: str) -> Path:
+        return self._cache_dir / "rows" / f"{digest}.csv"
+
+    def _read_manifest(self) -> dict[str, Any]:
+        try:
+            with open(self._manifest_path) as fp:
+                manifest = json.load(fp)
+            if manifest.get("version") == self._MANIFEST_VERSION:
+                return manifest
+        except FileNotFoundError:
+            pass
+        return {"version": self._MANIFEST_VERSION, "next_id": 0, "files": {}}
+
+    def _write_manifest(self, manifest: dict[str, Any]) -> None:
+        tmp = self._manifest_path.with_name(self._manifest_path.name + ".tmp")
+        with open(tmp, "w") as fp:
+            json.dump(manifest, fp)
+        os.replace(tmp, self._manifest_path)
+
+    def extract(self, target_path: Path) -> Iterator[list[str]]:
+        if not target_path.exists():
+            raise ValueError(f"{target_path=} does not exist")
+        root = target_path.resolve()
+        manifest = self._read_manifest()
+        previous: dict[str, dict[str, Any]] = manifest["files"]
+        files: dict[str, dict[str, Any]] = {}
+        changed: list[str] = []
+        sources: dict[str, bytes] = {}
+        for file in sorted(root.rglob("*.java")):
+            name = file.relative_to(root).as_posix()
+            stat = file.stat()
+            entry = dict(previous.get(name, {}))
+            if (
+                entry.get("mtime_ns") != stat.st_mtime_ns
+                or entry.get("size") != stat.st_size
+            ):
+                sources[name] = file.read_bytes()
+                digest = hashlib.sha256(sources[name]).hexdigest()
+                if entry.get("digest") != digest:
+                    changed.append(name)
+                entry.update(
+                    digest=digest, mtime_ns=stat.st_mtime_ns, size=stat.st_size
+                )
+            elif (
+                entry.get("count", 0) > 0
+                and not self._rows_path(entry["digest"]).exists()
+            ):
+                changed.append(name)
+            files[name] = entry
+
+        def source(name: str) -> bytes:
+            if name not in sources:
+                sources[name] = (root / name).read_bytes()
+            return sources[name]
+
+        stale, declarers = self._stale(previous, files, changed, source)
+        if stale:
+            (self._cache_dir / "rows").mkdir(parents=True, exist_ok=True)
+            if len(stale) == len(files):
+                extracted = self._extract(root, [root])
+            else:
+                # the files declaring the constants they use resolve them
+                context: set[str] = set()
+                for name in stale:
+                    context |= constant_sources(source(name), declarers)
+                extracted = self._extract(
+                    root,
+                    [root / name for name in sorted(stale)],
+                    [root / name for name in sorted(context - stale)],
+                )
+            for name in sorted(stale):
+                rows = extracted.get(name, [])
+                files[name]["count"] = len(rows)
+                if rows:
+                    with open(self._rows_path(files[name]["digest"]), "w") as fp:
+                        csv.writer(fp, quoting=csv.QUOTE_ALL).writerows(rows)
+
+        # allocate id blocks, a file keeps its block while its rows fit in it
+        for entry in files.values():
+            count = entry.get("count", 0)
+            if "base" not in entry or count > entry["capacity"]:
+                entry["base"] = manifest["next_id"]
+                entry["capacity"] = -(-count // 16) * 16
+                manifest["next_id"] += entry["capacity"]
+
+        manifest["files"] = files
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+        self._write_manifest(manifest)
+
+        for name, entry in files.items():
+            if entry.get("count", 0) == 0:
+                continue
+            base = entry["base"]
+            with open(self._rows_path(entry["digest"])) as fp:
+                for idom, local, _, *columns in csv.reader(fp, quoting=csv.QUOTE_ALL):
+                    idom = int(idom)
+                    yield [
+                        str(base + idom if idom >= 0 else -1),
+                        str(base + int(local)),
+                        str(root / name),
+                        *columns,
+                    ]
+
+    @staticmethod
+    def _stale(
+        previous: dict[str, dict[str, Any]],
+        files: dict[str, dict[str, Any]],
+        changed: list[str],
+        source: Callable[[str], bytes],
+    ) -> tuple[set[str], dict[str, list[str]]]:
+        """changed files and the unchanged ones whose templates may change
+
+        Templates inline the value of `final String` constants, which may be
+        declared in another file. Every file records the constants it
+        declares and those of other files it uses, by name; a file using a
+        constant declared, changed or removed in a changed file is stale too.
+        Updates `constants` and `uses` of the files in `files`, and returns
+        the files declaring each constant.
+        """
+        for name in changed:
+            files[name]["constants"] = sorted(declared_constants(source(name)))
+        touched: set[str] = set()
+        for name in [*changed, *previous.keys() - files.keys()]:
+            touched.update(previous.get(name, {}).get("constants", []))
+            touched.update(files.get(name, {}).get("constants", []))
+        declarers: dict[str, list[str]] = {}
+        for name, entry in files.items():
+            for constant in entry["constants"]:
+                declarers.setdefault(constant, []).append(name)
+        declared = declarers.keys()
+        added = declared - {c for e in previous.values() for c in e["constants"]}
+
+        stale = set(changed)
+        for name, entry in files.items():
+            if name in stale:
+                continue
+            if touched.intersection(entry["uses"]) or (
+                added and used_names(source(name), added)
+            ):
+                stale.add(name)
+        for name in stale:
+            own = set(files[name]["constants"])
+            files[name]["uses"] = sorted(
+                constant
+                for constant in used_names(source(name), declared)
+                if constant not in own or len(declarers[constant]) > 1
+            )
+        return stale, declarers
+
+    def verify(self, target_path: Path) -> list[str]:
+        """files whose cached rows differ from those of a full extraction
+
+        Brings the cache up to date first. Rows are compared with their
+        file-local ids, so a difference in dominators is found as well.
+        """
+        for _ in self.extract(target_path):
+            pass
+        root = target_path.resolve()
+        full = self._extract(root, [root])
+        files = self._read_manifest()["files"]
+        different = []
+        for name, entry in files.items():
+            cached: list[list[str]] = []
+            if entry.get("count", 0) > 0:
+                with open(self._rows_path(entry["digest"])) as fp:
+                    cached = [*csv.reader(fp, quoting=csv.QUOTE_ALL)]
+            expected = [[*map(str, row)] for row in full.get(name, [])]
+            if cached != expected:
+                different.append(name)
+        return different
+
+    def _extract(
+        self, root: Path, paths: list[Path], context: Sequence[Path] = ()
+    ) -> dict[str, list[list[str]]]:
+        """run the extractor over `paths` and group rows by file with local ids
+
+        The `context` files are part of the model of every run, without
+        being extracted themselves.
+        """
+        reserved = sum(len(str(path)) + 1 for path in context)
+        if reserved > self._ENVIRONMENT_SIZE // 2:
+            # too many to repeat in every run, a full model resolves them all
+            paths, context, reserved = [root], (), 0
+        batches: list[list[Path]] = [[]]
+        size = reserved
+        for path in paths:
+            if batches[-1] and size + len(str(path)) + 1 > self._ENVIRONMENT_SIZE:
+                batches.append([])
+                size = reserved
+            batches[-1].append(path)
+            size += len(str(path)) + 1
+
+        grouped: dict[str, list[list[str]]] = {}
+        for batch in batches:
+            # ids are only unique within one extractor run
+            owners: dict[int, tuple[str, int]] = {}
+            records: dict[str, list[list[Any]]] = {}
+            for record in extract_log_statements(
+                [*batch, *context],
+                pool=self._pool,
+                format=self._format,
+                workers=self._workers,
+            ):
+                name = Path(os.path.relpath(Path(record[2]).resolve(), root)).as_posix()
+                rows = records.setdefault(name, [])
+                owners[int(record[1])] = (name, len(rows))
+                rows.append(record)
+            for name, rows in records.items():
+                local_rows: list[list[str]] = []
+                for local, (idom, _, _, *columns) in enumerate(rows):
+                    owner = owners.get(int(idom))
+                    local_idom = (
+                        owner[1] if owner is not None and owner[0] == name else -1
+                    )
+                    local_rows.append([str(local_idom), str(local), "", *columns])
+                grouped[name] = local_rows
+        return grouped
@@ -0,0 +1,601 @@
+import csv
+import io
+import re
+import struct
+import threading
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from importlib import resources
+from pathlib import Path
+from subprocess import PIPE, Popen, TimeoutExpired
+from typing import Any, BinaryIO, Literal
+
+from ltid.toolkit.java_constants import constant_sources, declared_constants
+from ltid.toolkit.timing import Span, Trace, current_trace, span, traced
+
+__all__ = [
+    "ExtractorPool",
+    "LTIDLogGraphExecutionError",
+    "RecordFormat",
+    "ShardBy",
+    "extract_log_statements",
+    "extract_shards",
+    "maven_modules",
+    "read_binary_records",
+    "shard_paths",
+]
+
+type RecordFormat = Literal["csv", "binary"]
+type ShardBy = Literal["module", "directory"]
+
+
+LTID_LOG_GRAPH_CLASSPATH = (
+    resources.files((__package__ or "__main__").split(".")[0]) / "include" / "*"
+)
+
+
+def _environment(path: Path | Sequence[Path], launcher: str) -> str:
+    paths = [path] if isinstance(path, Path) else list(path)
+    for path in paths:
+        if not path.exists():
+            raise ValueError(f"{path=} does not exist")
+    return f"{launcher}:{';'.join(map(str, paths))}"
+
+
+_BINARY_INTS = struct.Struct(">iii")
+_BINARY_LENGTH = struct.Struct(">i")
+_BINARY_STRINGS = 6
+
+
+def _unpack_binary_record(
+    buffer: bytearray, offset: int
+) -> tuple[list[Any], int] | None:
+    """unpack the record at `offset`, or None if the buffer ends before it does"""
+    if offset + _BINARY_INTS.size > len(buffer):
+        return None
+    idom_id, event_id, line_number = _BINARY_INTS.unpack_from(buffer, offset)
+    offset += _BINARY_INTS.size
+    strings: list[str] = []
+    for _ in range(_BINARY_STRINGS):
+        if offset + _BINARY_LENGTH.size > len(buffer):
+            return None
+        (length,) = _BINARY_LENGTH.unpack_from(buffer, offset)
+        offset += _BINARY_LENGTH.size
+        if offset + length > len(buffer):
+            return None
+        strings.append(buffer[offset : offset + length].decode("utf-8"))
+        offset += length
+    path, package_name, class_name, method_name, level, template = strings
+    record = [
+        idom_id,
+        event_id,
+        path,
+        package_name,
+        class_name,
+        method_name,
+        line_number,
+        level,
+        template,
+    ]
+    return record, offset
+
+
+def read_binary_records(
+    stream: BinaryIO, chunk_size: int = 1 << 20
+) -> Iterator[list[Any]]:
+    """read records written by `output --format BINARY`, ids stay integers"""
+    buffer = bytearray()
+    while chunk := stream.read(chunk_size):
+        buffer += chunk
+        offset = 0
+        while (unpacked := _unpack_binary_record(buffer, offset)) is not None:
+            record, offset = unpacked
+            yield record
+        del buffer[:offset]
+    if buffer:
+        raise ValueError(f"truncated binary record stream, {len(buffer)} bytes left")
+
+
+def _read_records(stream: BinaryIO, format: RecordFormat) -> Iterator[list[Any]]:
+    if format == "binary":
+        return read_binary_records(stream)
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    return csv.reader(text, quoting=csv.QUOTE_ALL)
+
+
+# a stage line printed by `Launcher --timings`
+_JAVA_TIMING = re.compile(
+    rb"^timing (\S+) wall=(\S+) cpu=(\S+) rss=(\d+) heap=\d+ items=(\d+)$"
+)
+
+
+def _record_java_timings(trace: Trace, stderr: Sequence[bytes]) -> None:
+    """add the stages reported by the extractor to `trace` as `java.` spans
+
+    The stages ran one after the other and ended about now.
+    """
+    spans = []
+    for line in stderr:
+        if match := _JAVA_TIMING.match(line.strip()):
+            name, wall, cpu, rss, items = match.groups()
+            spans.append(
+                Span(
+                    f"java.{name.decode()}",
+                    wall=float(wall),
+                    cpu=float(cpu),
+                    max_rss=int(rss),
+                    items=int(items),
+                )
+            )
+    end = trace.elapsed
+    for java_span in reversed(spans):
+        java_span.start = end - java_span.wall
+        end = java_span.start
+    for java_span in spans:
+        trace.record(java_span)
+
+
+def extract_log_statements(
+    path: Path | Sequence[Path],
+    launcher: str = "file",
+    pool: "ExtractorPool | None" = None,
+    format: RecordFormat = "csv",
+    workers: int = 1,
+    heap: str | None = None,
+) -> Iterator[list[Any]]:
+    """stream extractor records; with `pool` its format and workers are used
+
+    The extractor builds dominator trees on `workers` threads. Ids are still
+    assigned in one sequential pass, the records do not depend on `workers`.
+    More than one worker assumes the Spoon model can be read concurrently,
+    which is not established, so it stays opt-in.
+    `heap` bounds the heap of the extractor JVM, as in `-Xmx`; it cannot be
+    set for the JVMs of a pool. In a trace, the time spent waiting for
+    records is recorded and, without `pool`, so are the stages timed by the
+    extractor.
+    """
+    if workers < 1:
+        raise ValueError(f"{workers=} must be positive")
+    if heap is not None and pool is not None:
+        raise ValueError("the heap of pooled extractors cannot be set")
+    environment = _environment(path, launcher)
+    if pool is not None:
+        with span("ExtractorPool.request") as stage:
+            records = pool.request(environment)
+            stage.items = len(records)
+        yield from records
+        return
+    yield from _extract_process(environment, format, workers, heap)
+
+
+def _extract_process(
+    environment: str,
+    format: RecordFormat,
+    workers: int,
+    heap: str | None,
+    started: Callable[[Popen[bytes]], None] | None = None,
+) -> Iterator[list[Any]]:
+    """stream the records of a new extractor JVM, see `extract_log_statements`
+
+    `started` is called with the process once it runs. The JVM is killed if
+    the records are not read to the end, e.g. on a timeout or when the
+    generator is closed early.
+    """
+    trace = current_trace()
+    proc = Popen(
+        [
+            "java",
+            *([f"-Xmx{heap}"] if heap is not None else []),
+            "-cp",
+            str(LTID_LOG_GRAPH_CLASSPATH),
+            "ltid.log_graph.Launcher",
+            "--environment",
+            environment,
+            *(["--timings"] if trace is not None else []),
+            "output",
+            "--format",
+            format.upper(),
+            "--workers",
+            str(workers),
+        ],
+        stdout=PIPE,
+        stderr=PIPE,
+    )
+    assert proc.stdout is not None
+    assert proc.stderr is not None
+    try:
+        if started is not None:
+            started(proc)
+
+        yield from traced("extract_log_statements", _read_records(proc.stdout, format))
+
+        stderr = proc.stderr.readlines()
+        if proc.wait() != 0:
+            raise LTIDLogGraphExecutionError(
+                {
+                    "command": proc.args,
+                    "returncode": proc.returncode,
+                    "message": stderr,
+                    "classpath": LTID_LOG_GRAPH_CLASSPATH,
+                }
+            )
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        proc.stdout.close()
+        proc.stderr.close()
+    if trace is not None:
+        _record_java_timings(trace, stderr)
+
+
+def maven_modules(target_path: Path) -> list[Path]:
+    """directories under `target_path` with a `pom.xml` and main sources"""
+    return sorted(
+        pom.parent
+        for pom in target_path.rglob("pom.xml")
+        if (pom.parent / "src" / "main" / "java").is_dir()
+    )
+
+
+def _source_directories(root: Path, shards: int) -> list[tuple[int, Path]]:
+    """disjoint directories covering the java sources of `root`, with sizes
+
+    A directory holding more than a quarter of a shard's share of the sources
+    is replaced by its subdirectories, unless it holds sources itself, so
+    every source file is in exactly one of them.
+    """
+    sizes: dict[Path, int] = {}
+    direct: set[Path] = set()
+    for file in root.rglob("*.java"):
+        size = file.stat().st_size
+        direct.add(file.parent)
+        for directory in file.relative_to(root).parents:
+            sizes[root / directory] = sizes.get(root / directory, 0) + size
+    limit = sizes.get(root, 0) // (4 * shards)
+    units = []
+    stack = [root] if root in sizes else []
+    while stack:
+        directory = stack.pop()
+        size = sizes[directory]
+        if size <= limit or directory in direct:
+            units.append((size, directory))
+            continue
+        stack.extend(child for child in directory.iterdir() if child in sizes)
+    return units
+
+
+def shard_paths(
+    target_path: Path, launcher: str, by: ShardBy, shards: int
+) -> list[list[Path]]:
+    """split a source tree into the paths of separate extractor runs
+
+    By `module`, every Maven module found by `maven_modules` is a shard of
+    its own, so a `maven` environment sees one module with its dependencies
+    and a `file` environment sees the `src` directory of one module; sources
+    outside of every module's `src` are left out. By `directory`, for `file`
+    environments only, source directories are grouped into `shards` shards of
+    about the same size. Shards are ordered deterministically, which keeps
+    the merged ids stable across runs.
+
+    A shard is extracted from a model of its own sources, while templates
+    inline constants declared anywhere. `LogGraph.from_source` adds the files
+    declaring the constants a `file` shard uses, see `ExtractionCache`, and
+    drops their records; a `maven` shard only sees the sources of its module.
+    """
+    if not target_path.exists():
+        raise ValueError(f"{target_path=} does not exist")
+    if by == "module":
+        modules = maven_modules(target_path)
+        if not modules:
+            raise ValueError(f"no maven module with sources in {target_path}")
+        if launcher == "maven":
+            return [[module] for module in modules]
+        return [[module / "src"] for module in modules]
+    if launcher != "file":
+        raise ValueError(f"sharding by directory is not supported by {launcher=}")
+    # largest first into the smallest group
+    groups: list[tuple[int, list[Path]]] = [(0, []) for _ in range(shards)]
+    units = _source_directories(target_path, shards)
+    for size, directory in sorted(units, key=lambda unit: (-unit[0], unit[1])):
+        groups.sort(key=lambda group: group[0])
+        groups[0] = (groups[0][0] + size, [*groups[0][1], directory])
+    return sorted(sorted(paths) for _, paths in groups if paths)
+
+
+def _shard_contexts(
+    target_path: Path, shards: Sequence[Sequence[Path]]
+) -> list[list[Path]]:
+    """the files outside of each shard declaring constants it uses"""
+    declarers: dict[str, list[Path]] = {}
+    for file in sorted(target_path.rglob("*.java")):
+        for constant in declared_constants(file.read_bytes()):
+            declarers.setdefault(constant, []).append(file.resolve())
+    contexts = []
+    for paths in shards:
+        files: set[Path] = set()
+        for path in paths:
+            path = path.resolve()
+            files.update(path.rglob("*.java") if path.is_dir() else [path])
+        context: set[Path] = set()
+        for file in files:
+            context |= constant_sources(file.read_bytes(), declarers)
+        contexts.append(sorted(context - files))
+    return contexts
+
+
+def _merge_shards(shards: Iterable[Iterable[Sequence[Any]]]) -> Iterator[list[Any]]:
+    """records of separate extractor runs with globally unique ids"""
+    base = 0
+    for records in shards:
+        top = -1
+        for idom_id, event_id, *columns in records:
+            idom_id, event_id = int(idom_id), int(event_id)
+            top = max(top, event_id)
+            yield [idom_id + base if idom_id >= 0 else -1, event_id + base, *columns]
+        base += top + 1
+
+
+def _run_shards(
+    shards: Sequence[Sequence[Path]],
+    concurrency: int,
+    contexts: Sequence[Sequence[Path]] | None,
+    launcher: str,
+    pool: "ExtractorPool | None",
+    format: RecordFormat,
+    workers: int,
+    heap: str | None,
+) -> Iterator[list[Any]]:
+    """run one extractor per shard, `concurrency` at once, and merge them
+
+    The files of `contexts` are added to the model of their shard, their own
+    records are dropped. If the merge is left early, shards that have not
+    started are cancelled and the JVMs of running ones are killed. Pooled
+    JVMs finish their current request, killing them would break the pool.
+    """
+    if workers < 1:
+        raise ValueError(f"{workers=} must be positive")
+    if heap is not None and pool is not None:
+        raise ValueError("the heap of pooled extractors cannot be set")
+    if contexts is None:
+        contexts = [[] for _ in shards]
+    environments = [
+        _environment([*paths, *context], launcher)
+        for paths, context in zip(shards, contexts, strict=True)
+    ]
+    processes: set[Popen[bytes]] = set()
+    lock = threading.Lock()
+    stopped = False
+
+    def started(proc: Popen[bytes]) -> None:
+        with lock:
+            processes.add(proc)
+            if stopped:
+                proc.kill()
+
+    def extract(environment: str, context: Sequence[Path]) -> list[list[Any]]:
+        if pool is not None:
+            records = pool.request(environment)
+        else:
+            try:
+                records = [
+                    *_extract_process(environment, format, workers, heap, started)
+                ]
+            finally:
+                with lock:
+                    processes.difference_update(
+                        proc for proc in [*processes] if proc.poll() is not None
+                    )
+        if not context:
+            return records
+        excluded = set(context)
+        return [
+            record for record in records if Path(record[2]).resolve() not in excluded
+        ]
+
+    with span("extract_shards") as stage, ThreadPoolExecutor(concurrency) as executor:
+        stage.items = len(shards)
+        try:
+            yield from _merge_shards(executor.map(extract, environments, contexts))
+        except BaseException:
+            with lock:
+                stopped = True
+                for proc in processes:
+                    proc.kill()
+            executor.shutdown(cancel_futures=True)
+            raise
+
+
+def extract_shards(
+    target_path: Path,
+    shards: int,
+    launcher: str = "file",
+    shard_by: ShardBy = "module",
+    pool: "ExtractorPool | None" = None,
+    format: RecordFormat = "csv",
+    workers: int = 1,
+    heap: str | None = None,
+) -> Iterator[list[Any]]:
+    """extract the parts of `shard_paths`, `shards` at once, with unique ids
+
+    With the `file` launcher, each part is extracted with the files outside
+    of it declaring constants it uses.
+    """
+    paths = shard_paths(target_path, launcher, shard_by, shards)
+    return _run_shards(
+        paths,
+        shards,
+        contexts=_shard_contexts(target_path, paths) if launcher == "file" else None,
+        launcher=launcher,
+        pool=pool,
+        format=format,
+        workers=workers,
+        heap=heap,
+    )
+
+
+class LTIDLogGraphExecutionError(Exception):
+    pass
+
+
+class _Extractor:
+    """one JVM running `Launcher serve`"""
+
+    _proc: Popen[bytes]
+    _stderr: deque[str]
+    _format: RecordFormat
+
+    def __init__(self, format: RecordFormat, workers: int = 1):
+        self._format = format
+        self._proc = Popen(
+            [
+                "java",
+                "-cp",
+                str(LTID_LOG_GRAPH_CLASSPATH),
+                "ltid.log_graph.Launcher",
+                "serve",
+                "--format",
+                format.upper(),
+                "--workers",
+                str(workers),
+            ],
+            stdin=PIPE,
+            stdout=PIPE,
+            stderr=PIPE,
+        )
+        # keep draining stderr so the JVM never blocks on a full pipe
+        self._stderr = deque(maxlen=64)
+        threading.Thread(target=self._drain, daemon=True).start()
+
+    def _drain(self) -> None:
+        assert self._proc.stderr is not None
+        for line in self._proc.stderr:
+            self._stderr.append(line.decode("utf-8", errors="replace"))
+
+    def _error(self, environment: str, message: Any) -> LTIDLogGraphExecutionError:
+        return LTIDLogGraphExecutionError(
+            {
+                "command": self._proc.args,
+                "environment": environment,
+                "returncode": self._proc.poll(),
+                "message": message,
+                "classpath": LTID_LOG_GRAPH_CLASSPATH,
+            }
+        )
+
+    def request(self, environment: str) -> list[list[Any]]:
+        assert self._proc.stdin is not None
+        assert self._proc.stdout is not None
+        try:
+            self._proc.stdin.write(environment.encode("utf-8") + b"\n")
+            self._proc.stdin.flush()
+        except BrokenPipeError:
+            raise self._error(environment, [*self._stderr])
+        header = self._proc.stdout.readline()
+        if not header:
+            raise self._error(environment, [*self._stderr])
+        status, length = header.split()
+        payload = self._proc.stdout.read(int(length))
+        if status != b"OK":
+            raise self._error(environment, payload.decode("utf-8", errors="replace"))
+        return [*_read_records(io.BytesIO(payload), self._format)]
+
+    @property
+    def alive(self) -> bool:
+        return self._proc.poll() is None
+
+    def close(self) -> None:
+        if self._proc.stdin is not None:
+            self._proc.stdin.close()
+        try:
+            self._proc.wait(timeout=10)
+        except TimeoutExpired:
+            self._proc.kill()
+            self._proc.wait()
+
+
+class ExtractorPool:
+    """pool of long-lived extractor JVMs shared by many extractions
+
+    JVMs are started lazily, at most `size` of them, and reused across
+    requests so startup, class loading and JIT warm-up are paid once. The
+    pool is thread-safe; callers block while every JVM is busy. Each JVM
+    builds dominator trees on `workers` threads.
+    """
+
+    _size: int
+    _format: RecordFormat
+    _workers: int
+    _idle: list[_Extractor]
+    _started: int
+    _condition: threading.Condition
+
+    def __init__(self, size: int = 1, format: RecordFormat = "csv", workers: int = 1):
+        if size < 1:
+            raise ValueError(f"{size=} must be positive")
+        if workers < 1:
+            raise ValueError(f"{workers=} must be positive")
+        self._size = size
+        self._format = format
+        self._workers = workers
+        self._idle = []
+        self._started = 0
+        self._condition = threading.Condition()
+
+    def _acquire(self) -> _Extractor:
+        with self._condition:
+            while not self._idle and self._started >= self._size:
+                self._condition.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._started += 1
+        try:
+            return _Extractor(self._format, self._workers)
+        except BaseException:
+            self._discard()
+            raise
+
+    def _release(self, extractor: _Extractor) -> None:
+        with self._condition:
+            self._idle.append(extractor)
+            self._condition.notify()
+
+    def _discard(self) -> None:
+        with self._condition:
+            self._started -= 1
+            self._condition.notify()
+
+    def request(self, environment: str) -> list[list[Any]]:
+        extractor = self._acquire()
+        try:
+            records = extractor.request(environment)
+        except BaseException:
+            # the stream may be out of sync, never reuse this JVM
+            extractor.close()
+            self._discard()
+            raise
+        if extractor.alive:
+            self._release(extractor)
+        else:
+            extractor.close()
+            self._discard()
+        return records
+
+    def extract(
+        self, path: Path | Sequence[Path], launcher: str = "file"
+    ) -> list[list[Any]]:
+        return self.request(_environment(path, launcher))
+
+    def close(self) -> None:
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._started -= len(idle)
+        for extractor in idle:
+            extractor.close()
+
+    def __enter__(self) -> "ExtractorPool":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
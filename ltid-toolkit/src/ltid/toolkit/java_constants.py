@@ -0,0 +1,41 @@
+import re
+from collections.abc import Iterable, Mapping, Sequence
+from pathlib import Path
+
+__all__ = ["constant_sources", "declared_constants", "used_names"]
+
+# `final String` fields initialized with a literal, whose value templates inline
+_CONSTANT = re.compile(
+    rb"\bfinal\s+(?:static\s+)?(?:java\.lang\.)?String\s+(\w+)\s*=\s*\""
+)
+_IDENTIFIER = re.compile(rb"\b[A-Za-z_$][\w$]*")
+
+
+def declared_constants(source: bytes) -> set[str]:
+    return {name.decode() for name in _CONSTANT.findall(source)}
+
+
+def _identifiers(source: bytes) -> set[str]:
+    """the identifiers of `source`, and the words of its comments and strings"""
+    return {name.decode("utf-8", "replace") for name in _IDENTIFIER.findall(source)}
+
+
+def used_names(source: bytes, names: Iterable[str]) -> set[str]:
+    return _identifiers(source).intersection(names)
+
+
+def constant_sources[T: (str, Path)](
+    source: bytes, declarers: Mapping[str, Sequence[T]]
+) -> set[T]:
+    """the files declaring the constants `source` may use
+
+    A constant of another file is named through its class, by qualification,
+    a static import or inheritance, so only the declarers whose class
+    `source` names are kept, all of them if it names none.
+    """
+    identifiers = _identifiers(source)
+    found: set[T] = set()
+    for constant in identifiers.intersection(declarers):
+        named = [d for d in declarers[constant] if Path(d).stem in identifiers]
+        found.update(named or declarers[constant])
+    return found
@@ -1,30 +1,178 @@
-import csv
-from collections.abc import Callable, Generator, Iterable, Iterator
+import mmap
+import os
+import struct
+from collections.abc import Callable, Generator, Iterable, Iterator, Sequence
 from datetime import datetime
-from importlib import resources
 from pathlib import Path
-from subprocess import PIPE, Popen
+from typing import Any
 
-import networkx as nx
+import numpy as np
+import numpy.typing as npt
+from ltid.toolkit.dominator_index import DominatorIndex
+from ltid.toolkit.extraction_cache import ExtractionCache
+from ltid.toolkit.extractor import (
+    ExtractorPool,
+    RecordFormat,
+    ShardBy,
+    extract_log_statements,
+    extract_shards,
+)
+from ltid.toolkit.log_path import LogPath
 from ltid.toolkit.log_statement import LogStatement
+from ltid.toolkit.timing import span
 
-__all__ = ["LogGraph"]
+__all__ = [
+    "LogGraph",
+    "LogGraphFormatError",
+    "StringTable",
+]
 
 type Loc = tuple[str, int]
 type _LogParser = Callable[[Iterable[str]], Iterator[tuple[datetime, int]]]
+type IntArray = npt.NDArray[np.int32]
+
+
+class StringTable:
+    """interned utf-8 strings stored as a single blob and an offset array"""
+
+    __slots__ = ("_data", "_offsets")
+
+    _data: bytes | memoryview
+    _offsets: npt.NDArray[np.int64]
+
+    def __init__(self, data: bytes | memoryview, offsets: npt.NDArray[np.int64]):
+        self._data = data
+        self._offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings: Iterable[str]) -> "StringTable":
+        encoded = [string.encode("utf-8") for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(b"".join(encoded), offsets)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return str(self._data[self._offsets[i] : self._offsets[i + 1]], "utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __reduce__(self):
+        return StringTable, (bytes(self._data), np.array(self._offsets))
 
 
 class LogGraph:
-    _graph: nx.DiGraph
-    _loc: dict[Loc, int]
+    """dominator tree of log statements, stored as parallel arrays
+
+    Rows are sorted by event id. `_idoms` holds the row of the immediate
+    dominator (-1 for roots) and the children of row `i` are
+    `_children[_children_offsets[i]:_children_offsets[i + 1]]`. String
+    columns are codes into the shared `_strings` table.
+    """
+
+    _event_ids: IntArray
+    _idoms: IntArray
+    _line_numbers: IntArray
+    _file_names: IntArray
+    _levels: IntArray
+    _templates: IntArray
+    _children_offsets: IntArray
+    _children: IntArray
+    _strings: StringTable
+    _dominator_index: DominatorIndex | None
 
     def __init__(self):
-        self._graph = nx.DiGraph()
-        self._loc = dict()
+        empty = np.empty(0, dtype=np.int32)
+        self._event_ids = empty
+        self._idoms = empty
+        self._line_numbers = empty
+        self._file_names = empty
+        self._levels = empty
+        self._templates = empty
+        self._children_offsets = np.zeros(1, dtype=np.int32)
+        self._children = empty
+        self._strings = StringTable.from_strings([])
+        self._dominator_index = None
 
     @staticmethod
-    def from_source(target_path: Path, launcher: str = "file") -> "LogGraph":
-        log_graph = LogGraph()
+    def from_source(
+        target_path: Path,
+        launcher: str = "file",
+        cache_dir: Path | None = None,
+        pool: ExtractorPool | None = None,
+        format: RecordFormat = "csv",
+        workers: int = 1,
+        shards: int = 1,
+        shard_by: ShardBy = "module",
+        heap: str | None = None,
+    ) -> "LogGraph":
+        """extract the graph of a source tree
+
+        With `cache_dir`, extraction is incremental: only files whose content
+        changed since the last run are handed to the extractor. With `pool`,
+        extraction runs on warm JVMs instead of a new process. See
+        `extract_log_statements` for `workers` and `heap`.
+
+        With `shards` above 1, the tree is split as described in `shard_paths`
+        and up to `shards` extractors run at once, each building the model of
+        its part and of the files declaring constants it uses, within `heap`
+        if set. Their records are merged with ids
+        made globally unique; dominators never cross an executable, so no
+        edge is lost.
+        """
+        if shards < 1:
+            raise ValueError(f"{shards=} must be positive")
+        with span("LogGraph.from_source") as stage:
+            if shards > 1:
+                if cache_dir is not None:
+                    raise ValueError("incremental extraction is not sharded")
+                records = extract_shards(
+                    target_path,
+                    shards,
+                    launcher=launcher,
+                    shard_by=shard_by,
+                    pool=pool,
+                    format=format,
+                    workers=workers,
+                    heap=heap,
+                )
+            elif cache_dir is None:
+                records = extract_log_statements(
+                    target_path,
+                    launcher=launcher,
+                    pool=pool,
+                    format=format,
+                    workers=workers,
+                    heap=heap,
+                )
+            elif heap is not None:
+                raise ValueError("incremental extraction does not take a heap")
+            elif launcher == "file":
+                records = ExtractionCache(
+                    cache_dir, pool=pool, format=format, workers=workers
+                ).extract(target_path)
+            else:
+                raise ValueError(
+                    f"incremental extraction is not supported by {launcher=}"
+                )
+            log_graph = LogGraph.from_records(records)
+            stage.items = len(log_graph)
+        return log_graph
+
+    @staticmethod
+    def from_records(records: Iterable[Sequence[Any]]) -> "LogGraph":
+        """build a graph from rows in the extractor output format"""
+        strings: dict[str, int] = {}
+        event_ids: list[int] = []
+        idom_ids: list[int] = []
+        line_numbers: list[int] = []
+        file_names: list[int] = []
+        levels: list[int] = []
+        templates: list[int] = []
         for (
             idom_id,
             event_id,
@@ -35,93 +183,256 @@ class LogGraph:
             line_number,
             level,
             template,
-        ) in extract_log_statements(target_path, launcher=launcher):
-            event_id = int(event_id)
-            idom_id = int(idom_id)
-            if idom_id < 0:
-                idom_id = None
-            log_graph._graph.add_node(
-                event_id,
-                file_name=Path(path).name,
-                line_number=int(line_number),
-                level=level.upper(),
-                template=template,
+        ) in records:
+            event_ids.append(int(event_id))
+            idom_ids.append(int(idom_id))
+            line_numbers.append(int(line_number))
+            file_names.append(strings.setdefault(Path(path).name, len(strings)))
+            levels.append(strings.setdefault(level.upper(), len(strings)))
+            templates.append(strings.setdefault(template, len(strings)))
+
+        log_graph = LogGraph()
+        log_graph._set_columns(
+            np.array(event_ids, dtype=np.int32),
+            np.array(idom_ids, dtype=np.int32),
+            np.array(line_numbers, dtype=np.int32),
+            np.array(file_names, dtype=np.int32),
+            np.array(levels, dtype=np.int32),
+            np.array(templates, dtype=np.int32),
+            StringTable.from_strings(strings),
+        )
+        return log_graph
+
+    def _set_columns(
+        self,
+        event_ids: IntArray,
+        idom_ids: IntArray,
+        line_numbers: IntArray,
+        file_names: IntArray,
+        levels: IntArray,
+        templates: IntArray,
+        strings: StringTable,
+    ) -> None:
+        order = np.argsort(event_ids, kind="stable")
+        self._event_ids = event_ids[order]
+        self._line_numbers = line_numbers[order]
+        self._file_names = file_names[order]
+        self._levels = levels[order]
+        self._templates = templates[order]
+        self._strings = strings
+        self._dominator_index = None
+
+        # resolve dominator event ids to rows, unknown dominators become roots
+        idom_ids = idom_ids[order]
+        n = len(self._event_ids)
+        rows = np.searchsorted(self._event_ids, idom_ids).astype(np.int32)
+        found = (idom_ids >= 0) & (rows < n)
+        found[found] = self._event_ids[rows[found]] == idom_ids[found]
+        self._idoms = np.where(found, rows, -1).astype(np.int32)
+
+        by_parent = np.argsort(self._idoms, kind="stable").astype(np.int32)
+        self._children = by_parent[np.count_nonzero(self._idoms < 0) :]
+        self._children_offsets = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(
+            np.bincount(self._idoms[found], minlength=n),
+            out=self._children_offsets[1:],
+        )
+
+    @span("LogGraph.save")
+    def save(self, path: Path) -> None:
+        """write the graph in the columnar binary format read by `load`"""
+        n = len(self._event_ids)
+        sections = [
+            self._event_ids.astype("<i4"),
+            self._idoms.astype("<i4"),
+            self._line_numbers.astype("<i4"),
+            self._file_names.astype("<i4"),
+            self._levels.astype("<i4"),
+            self._templates.astype("<i4"),
+            self._children_offsets.astype("<i4"),
+            self._children.astype("<i4"),
+            self._strings._offsets.astype("<i8"),
+            np.frombuffer(self._strings._data, dtype=np.uint8),
+        ]
+        header = _HEADER.pack(
+            _MAGIC,
+            _VERSION,
+            n,
+            len(self._children),
+            len(self._strings),
+            len(self._strings._data),
+        )
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as fp:
+            fp.write(header)
+            offset = len(header)
+            for section in sections:
+                padding = -offset % _ALIGNMENT
+                fp.write(bytes(padding))
+                fp.write(section.tobytes())
+                offset += padding + section.nbytes
+        os.replace(tmp, path)
+
+    @staticmethod
+    def load(path: Path) -> "LogGraph":
+        """memory-map a graph written by `save`, pages are shared across processes"""
+        with open(path, "rb") as fp:
+            if os.fstat(fp.fileno()).st_size < _HEADER.size:
+                raise LogGraphFormatError(f"{path=} is truncated")
+            buffer = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n, num_children, num_strings, data_size = _HEADER.unpack_from(
+            buffer
+        )
+        if magic != _MAGIC:
+            raise LogGraphFormatError(f"{path=} is not a log graph file")
+        if version != _VERSION:
+            raise LogGraphFormatError(
+                f"{path=} has format version {version}, expected {_VERSION}"
             )
-            if idom_id is not None:
-                log_graph._graph.add_edge(event_id, idom_id)
+        size = _file_size(n, num_children, num_strings, data_size)
+        if len(buffer) != size:
+            raise LogGraphFormatError(
+                f"{path=} has {len(buffer)} bytes, its header describes {size}"
+            )
+
+        offset = _HEADER.size
+
+        def section(dtype: str, count: int) -> npt.NDArray[Any]:
+            nonlocal offset
+            offset += -offset % _ALIGNMENT
+            array = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+            offset += array.nbytes
+            return array
+
+        log_graph = LogGraph()
+        log_graph._event_ids = section("<i4", n)
+        log_graph._idoms = section("<i4", n)
+        log_graph._line_numbers = section("<i4", n)
+        log_graph._file_names = section("<i4", n)
+        log_graph._levels = section("<i4", n)
+        log_graph._templates = section("<i4", n)
+        log_graph._children_offsets = section("<i4", n + 1)
+        log_graph._children = section("<i4", num_children)
+        string_offsets = section("<i8", num_strings + 1)
+        offset += -offset % _ALIGNMENT
+        log_graph._strings = StringTable(
+            memoryview(buffer)[offset : offset + data_size], string_offsets
+        )
         return log_graph
 
-    def get_statement(self, event_id: int):
-        return LogStatement(self._graph, event_id)
+    def _row(self, event_id: int) -> int:
+        row = int(np.searchsorted(self._event_ids, event_id))
+        if row >= len(self._event_ids) or self._event_ids[row] != event_id:
+            raise KeyError(event_id)
+        return row
+
+    def _children_of(self, row: int) -> IntArray:
+        return self._children[
+            self._children_offsets[row] : self._children_offsets[row + 1]
+        ]
+
+    def get_statement(self, event_id: int) -> LogStatement:
+        return LogStatement(self, self._row(event_id))
+
+    def __len__(self) -> int:
+        return len(self._event_ids)
 
     def __iter__(self) -> Generator[LogStatement]:
-        yield from map(self.get_statement, self._graph.nodes)
+        for row in range(len(self)):
+            yield LogStatement(self, row)
 
     @property
     def roots(self) -> Generator[LogStatement]:
-        for n, d in self._graph.out_degree():
-            if d > 0:
-                continue
-            yield self.get_statement(n)
+        for row in np.flatnonzero(self._idoms < 0):
+            yield LogStatement(self, int(row))
 
     @property
     def leafs(self) -> Iterator[LogStatement]:
-        for n, d in self._graph.in_degree():
-            if d > 0:
-                continue
-            yield self.get_statement(n)
+        for row in np.flatnonzero(np.diff(self._children_offsets) == 0):
+            yield LogStatement(self, int(row))
+
+    def _rows_by_depth(self) -> Iterator[IntArray]:
+        """rows grouped by depth, roots first, in breadth-first order"""
+        offsets = self._children_offsets
+        frontier = np.flatnonzero(self._idoms < 0).astype(np.int32)
+        while len(frontier) > 0:
+            yield frontier
+            starts = offsets[frontier].astype(np.int64)
+            counts = offsets[frontier + 1] - starts
+            total = int(counts.sum())
+            positions = np.repeat(starts - np.cumsum(counts) + counts, counts)
+            frontier = self._children[positions + np.arange(total)]
 
     @property
-    def paths(self) -> Generator[list[LogStatement]]:
-        def rec(node: int, path: list[LogStatement]) -> Generator[list[LogStatement]]:
-            path = path + [self.get_statement(node)]
-            if self._graph.in_degree(node) == 0:
-                yield path
-                return
-            for child in self._graph.predecessors(node):
-                yield from rec(child, path)
+    def dominator_index(self) -> DominatorIndex:
+        """ancestor index of the tree, built on first use"""
+        if self._dominator_index is None:
+            self._dominator_index = DominatorIndex(self)
+        return self._dominator_index
 
-        for root in self.roots:
-            yield from rec(root.event_id, [])
+    @property
+    def depths(self) -> IntArray:
+        """length of the path from a root to each row, 1 for roots"""
+        return self.dominator_index.depths
 
+    @property
+    def path_counts(self) -> npt.NDArray[np.int64]:
+        """number of root-to-leaf paths going through each row"""
+        counts = (np.diff(self._children_offsets) == 0).astype(np.int64)
+        for rows in reversed([*self._rows_by_depth()]):
+            parents = self._idoms[rows]
+            inner = parents >= 0
+            np.add.at(counts, parents[inner], counts[rows[inner]])
+        return counts
 
-LTID_LOG_GRAPH_CLASSPATH = (
-    resources.files((__package__ or "__main__").split(".")[0]) / "include" / "*"
-)
+    def path_count(self) -> int:
+        """number of root-to-leaf paths, without enumerating them"""
+        return int(np.count_nonzero(np.diff(self._children_offsets) == 0))
 
+    def path_length_histogram(self) -> npt.NDArray[np.int64]:
+        """`histogram[k]` is the number of root-to-leaf paths of length `k`"""
+        leafs = np.diff(self._children_offsets) == 0
+        return np.bincount(self.depths[leafs], minlength=1).astype(np.int64)
 
-def extract_log_statements(path: Path, launcher: str = "file") -> Iterator[list[str]]:
-    if not path.exists():
-        raise ValueError(f"{path=} does not exist")
-    proc = Popen(
-        [
-            "java",
-            "-cp",
-            str(LTID_LOG_GRAPH_CLASSPATH),
-            "ltid.log_graph.Launcher",
-            "--environment",
-            f"{launcher}:{path}",
-            "output",
-        ],
-        stdout=PIPE,
-        stderr=PIPE,
-        text=True,
-    )
-    assert proc.stdout is not None
-    assert proc.stderr is not None
-
-    yield from csv.reader(proc.stdout, quoting=csv.QUOTE_ALL)
-
-    if proc.wait() != 0:
-        raise LTIDLogGraphExecutionError(
-            {
-                "command": proc.args,
-                "returncode": proc.returncode,
-                "message": proc.stderr.readlines(),
-                "classpath": LTID_LOG_GRAPH_CLASSPATH,
-            }
-        )
+    def count_paths_longer_than(self, length: int) -> int:
+        leafs = np.diff(self._children_offsets) == 0
+        return int(np.count_nonzero(self.depths[leafs] > length))
+
+    @property
+    def paths(self) -> Iterator[LogPath]:
+        """root-to-leaf paths in depth-first order
+
+        Paths are handles sharing their prefixes through the dominator chain,
+        see `LogPath`, so no prefix is copied while walking the tree.
+        """
+        offsets = self._children_offsets
+        roots = np.flatnonzero(self._idoms < 0)
+        stack = [(int(row), 1) for row in roots[::-1]]
+        while stack:
+            row, length = stack.pop()
+            start, end = int(offsets[row]), int(offsets[row + 1])
+            if start == end:
+                yield LogPath(self, row, length)
+                continue
+            for child in self._children[start:end][::-1].tolist():
+                stack.append((child, length + 1))
+
+
+_MAGIC = b"LTIDLGRF"
+_VERSION = 1
+_ALIGNMENT = 8
+# magic, version, rows, children, strings, string data bytes
+_HEADER = struct.Struct("<8sIIIIQ")
+
+
+def _file_size(n: int, num_children: int, num_strings: int, data_size: int) -> int:
+    """bytes of a file written by `LogGraph.save` with these header counts"""
+    sections = [4 * n] * 6 + [4 * (n + 1), 4 * num_children, 8 * (num_strings + 1)]
+    offset = _HEADER.size
+    for nbytes in [*sections, data_size]:
+        offset += -offset % _ALIGNMENT + nbytes
+    return offset
 
 
-class LTIDLogGraphExecutionError(Exception):
+class LogGraphFormatError(Exception):
     pass
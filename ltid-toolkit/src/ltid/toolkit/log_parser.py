@@ -0,0 +1,188 @@
+import re
+from collections.abc import Iterator, Mapping, Sequence
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from ltid.toolkit.log_graph import Loc, LogGraph
+from ltid.toolkit.template_matcher import TemplateMatcher
+
+__all__ = [
+    "LOG_FORMAT_HADOOP",
+    "LOG_FORMAT_HADOOP_MESSAGE",
+    "LocationIndex",
+    "parse_log",
+    "parse_log_chunks",
+    "parse_log_messages",
+    "read_chunks",
+]
+
+LOG_FORMAT_HADOOP = re.compile(
+    rb"^(?P<timestamp>[\d -:,]+) .*? \((?P<file_name>\w+.java):.+?\((?P<line_number>\d+)\)\) .*?$",
+    flags=re.MULTILINE,
+)
+# same lines as LOG_FORMAT_HADOOP, for matching messages against templates
+LOG_FORMAT_HADOOP_MESSAGE = re.compile(
+    rb"^(?P<timestamp>[\d -:,]+) .*? - (?P<message>.*?)\r?$",
+    flags=re.MULTILINE,
+)
+TIMESTAMP_FORMAT_HADOOP = "%Y-%m-%d %H:%M:%S,%f"
+
+
+class LocationIndex:
+    """vectorized lookup of event ids by source location
+
+    Locations are packed as `file_code << 32 | line_number` into a sorted
+    int64 array so a whole chunk of logs is resolved with one searchsorted.
+    """
+
+    _files: dict[bytes, int]
+    _keys: npt.NDArray[np.int64]
+    _event_ids: npt.NDArray[np.int32]
+
+    def __init__(self, locations: Mapping[Loc, int]):
+        self._files = {}
+        keys = np.empty(len(locations), dtype=np.int64)
+        event_ids = np.empty(len(locations), dtype=np.int32)
+        for i, ((file_name, line_number), event_id) in enumerate(locations.items()):
+            code = self._files.setdefault(file_name.encode(), len(self._files))
+            keys[i] = code << 32 | line_number
+            event_ids[i] = event_id
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._event_ids = event_ids[order]
+
+    @classmethod
+    def from_graph(cls, log_graph: LogGraph) -> "LocationIndex":
+        return cls({log.loc: log.event_id for log in log_graph})
+
+    def lookup(
+        self, file_names: Sequence[bytes], line_numbers: npt.NDArray[np.int64]
+    ) -> npt.NDArray[np.int32]:
+        """event ids of the given locations, -1 where the location is unknown"""
+        event_ids = np.full(len(line_numbers), -1, dtype=np.int32)
+        if len(self._keys) == 0 or len(line_numbers) == 0:
+            return event_ids
+        names, inverse = np.unique(np.asarray(file_names), return_inverse=True)
+        codes = np.array(
+            [self._files.get(bytes(name), -1) for name in names], dtype=np.int64
+        )[inverse]
+        keys = codes << 32 | line_numbers
+        rows = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+        found = (codes >= 0) & (self._keys[rows] == keys)
+        event_ids[found] = self._event_ids[rows[found]]
+        return event_ids
+
+
+def read_chunks(file: Path, chunk_size: int = 1 << 26) -> Iterator[bytes]:
+    """read a file in blocks of about `chunk_size` bytes, split on line ends"""
+    with open(file, "rb") as fp:
+        rest = b""
+        while chunk := fp.read(chunk_size):
+            chunk = rest + chunk
+            end = chunk.rfind(b"\n") + 1
+            rest = chunk[end:]
+            if end > 0:
+                yield chunk[:end]
+        if rest:
+            yield rest
+
+
+def parse_log_chunks(
+    file: Path,
+    index: LocationIndex,
+    pattern: re.Pattern[bytes] = LOG_FORMAT_HADOOP,
+    timestamp_format: str = TIMESTAMP_FORMAT_HADOOP,
+    chunk_size: int = 1 << 26,
+) -> Iterator[tuple[npt.NDArray[np.int64], npt.NDArray[np.int32]]]:
+    """yield (timestamps in int64 nanoseconds, event ids) for each chunk
+
+    Lines that do not match `pattern`, have an unparsable timestamp or an
+    unknown location are dropped. `pattern` must define the `timestamp`,
+    `file_name` and `line_number` groups.
+    """
+    groups = [
+        pattern.groupindex[name] - 1
+        for name in ("timestamp", "file_name", "line_number")
+    ]
+    for chunk in read_chunks(file, chunk_size):
+        found = pattern.findall(chunk)
+        if not found:
+            continue
+        columns = [*zip(*found)]
+        timestamps, file_names, line_numbers = (columns[group] for group in groups)
+        event_ids = index.lookup(file_names, np.array(line_numbers).astype(np.int64))
+        if (parsed := _known(timestamps, event_ids, timestamp_format)) is not None:
+            yield parsed
+
+
+def _known(
+    timestamps: Sequence[bytes],
+    event_ids: npt.NDArray[np.int32],
+    timestamp_format: str,
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int32]] | None:
+    """(nanoseconds, event ids) of the lines with an event and a valid timestamp"""
+    known = event_ids >= 0
+    if not known.any():
+        return None
+    parsed = pd.to_datetime(
+        np.array(timestamps)[known].astype(str),
+        format=timestamp_format,
+        errors="coerce",
+    )
+    valid = ~np.asarray(parsed.isna())
+    nanoseconds = np.asarray(parsed, dtype="datetime64[ns]").view(np.int64)
+    return nanoseconds[valid], event_ids[known][valid]
+
+
+def parse_log_messages(
+    file: Path,
+    matcher: TemplateMatcher,
+    pattern: re.Pattern[bytes] = LOG_FORMAT_HADOOP_MESSAGE,
+    timestamp_format: str = TIMESTAMP_FORMAT_HADOOP,
+    chunk_size: int = 1 << 26,
+) -> Iterator[tuple[npt.NDArray[np.int64], npt.NDArray[np.int32]]]:
+    """as `parse_log_chunks`, finding events by template instead of location
+
+    `pattern` must define the `timestamp` and `message` groups.
+    """
+    groups = [pattern.groupindex[name] - 1 for name in ("timestamp", "message")]
+    for chunk in read_chunks(file, chunk_size):
+        found = pattern.findall(chunk)
+        if not found:
+            continue
+        columns = [*zip(*found)]
+        timestamps, messages = (columns[group] for group in groups)
+        event_ids, _ = matcher.match_all(
+            message.decode(errors="replace") for message in messages
+        )
+        if (parsed := _known(timestamps, event_ids, timestamp_format)) is not None:
+            yield parsed
+
+
+def parse_log(
+    file: Path,
+    index: LocationIndex | TemplateMatcher,
+    pattern: re.Pattern[bytes] | None = None,
+    timestamp_format: str = TIMESTAMP_FORMAT_HADOOP,
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int32]]:
+    """parse a whole log file into (timestamps, event ids) arrays
+
+    Events are found by location with a `LocationIndex`, by message with a
+    `TemplateMatcher`.
+    """
+    if isinstance(index, TemplateMatcher):
+        chunks = parse_log_messages(
+            file, index, pattern or LOG_FORMAT_HADOOP_MESSAGE, timestamp_format
+        )
+    else:
+        chunks = parse_log_chunks(
+            file, index, pattern or LOG_FORMAT_HADOOP, timestamp_format
+        )
+    timestamps: list[npt.NDArray[np.int64]] = [np.empty(0, dtype=np.int64)]
+    event_ids: list[npt.NDArray[np.int32]] = [np.empty(0, dtype=np.int32)]
+    for chunk_timestamps, chunk_event_ids in chunks:
+        timestamps.append(chunk_timestamps)
+        event_ids.append(chunk_event_ids)
+    return np.concatenate(timestamps), np.concatenate(event_ids)
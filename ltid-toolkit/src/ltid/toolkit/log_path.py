@@ -0,0 +1,76 @@
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, overload
+
+from ltid.toolkit.log_statement import LogStatement
+
+if TYPE_CHECKING:
+    from ltid.toolkit.log_graph import LogGraph
+
+
+@dataclass(slots=True, frozen=True, eq=True)
+class LogPath(Sequence[LogStatement]):
+    """path from a root of the dominator tree down to `_row`
+
+    Only the last row is stored, the prefix is the dominator chain shared by
+    every path through it, so handles are O(1) to create and statements are
+    only materialized on access.
+    """
+
+    _graph: "LogGraph"
+    _row: int
+    _length: int
+
+    @property
+    def last(self) -> LogStatement:
+        return LogStatement(self._graph, self._row)
+
+    @property
+    def parent(self) -> "LogPath | None":
+        row = int(self._graph._idoms[self._row])
+        if row < 0:
+            return None
+        return LogPath(self._graph, row, self._length - 1)
+
+    @property
+    def rows(self) -> list[int]:
+        idoms = self._graph._idoms
+        rows = [0] * self._length
+        row = self._row
+        for i in range(self._length - 1, -1, -1):
+            rows[i] = row
+            row = int(idoms[row])
+        return rows
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[LogStatement]:
+        for row in self.rows:
+            yield LogStatement(self._graph, row)
+
+    def __reversed__(self) -> Iterator[LogStatement]:
+        idoms = self._graph._idoms
+        row = self._row
+        while row >= 0:
+            yield LogStatement(self._graph, row)
+            row = int(idoms[row])
+
+    @overload
+    def __getitem__(self, i: int) -> LogStatement: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> list[LogStatement]: ...
+
+    def __getitem__(self, i: int | slice) -> LogStatement | list[LogStatement]:
+        if isinstance(i, slice):
+            return [LogStatement(self._graph, row) for row in self.rows[i]]
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError(i)
+        idoms = self._graph._idoms
+        row = self._row
+        for _ in range(self._length - 1 - i):
+            row = int(idoms[row])
+        return LogStatement(self._graph, row)
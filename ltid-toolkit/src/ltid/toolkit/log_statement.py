@@ -1,38 +1,48 @@
-import networkx as nx
-
-
 import re
 from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ltid.toolkit.log_graph import LogGraph
 
 
 @dataclass(slots=True, frozen=True, eq=True)
 class LogStatement:
-    _graph: nx.DiGraph
-    event_id: int
+    _graph: "LogGraph"
+    _row: int
+
+    @property
+    def event_id(self) -> int:
+        return int(self._graph._event_ids[self._row])
 
     @property
     def idom(self) -> "LogStatement | None":
-        successors = self._graph.successors(self.event_id)
-        try:
-            return LogStatement(self._graph, next(successors))
-        except StopIteration:
+        row = int(self._graph._idoms[self._row])
+        if row < 0:
             return None
+        return LogStatement(self._graph, row)
+
+    @property
+    def children(self) -> list["LogStatement"]:
+        """statements immediately dominated by this one"""
+        rows = self._graph._children_of(self._row)
+        return [LogStatement(self._graph, row) for row in rows.tolist()]
 
     @property
     def level(self) -> str:
-        return self._graph.nodes[self.event_id]["level"]
+        return self._graph._strings[self._graph._levels[self._row]]
 
     @property
     def file_name(self) -> str:
-        return self._graph.nodes[self.event_id]["file_name"]
+        return self._graph._strings[self._graph._file_names[self._row]]
 
     @property
     def line_number(self) -> int:
-        return self._graph.nodes[self.event_id]["line_number"]
+        return int(self._graph._line_numbers[self._row])
 
     @property
     def template(self) -> str:
-        return self._graph.nodes[self.event_id]["template"]
+        return self._graph._strings[self._graph._templates[self._row]]
 
     @property
     def loc(self):
@@ -40,11 +50,27 @@ class LogStatement:
 
     @property
     def dominators(self):
-        node = self
-        while node.idom:
-            node = node.idom
-            yield node
+        idoms = self._graph._idoms
+        row = int(idoms[self._row])
+        while row >= 0:
+            yield LogStatement(self._graph, row)
+            row = int(idoms[row])
+
+    @property
+    def depth(self) -> int:
+        """number of statements from the root down to this one"""
+        return self._graph.dominator_index.depth(self._row)
+
+    def dominates(self, other: "LogStatement") -> bool:
+        return self._graph.dominator_index.dominates(self._row, other._row)
+
+    def common_dominator(self, other: "LogStatement") -> "LogStatement | None":
+        """lowest statement dominating both, either one included"""
+        row = self._graph.dominator_index.common_dominator(self._row, other._row)
+        if row is None:
+            return None
+        return LogStatement(self._graph, row)
 
     @property
     def variables(self):
-        return re.findall(r"\{(\w*)\}", self.template)
\ No newline at end of file
+        return re.findall(r"\{(\w*)\}", self.template)
@@ -1,6 +1,10 @@
 import re
+from collections.abc import Iterable
+from functools import lru_cache
 from importlib import resources
 
+import numpy as np
+import numpy.typing as npt
 from lxml import etree
 
 ns = {"src": "http://www.srcML.org/srcML/src"}
@@ -11,11 +15,94 @@ is_logging_statement = etree.RelaxNG(
     etree.parse(str(resources.files() / "logpattern.rng"), parser=None)
 )
 
+# version of the decision whether a span logs and with an id, made by
+# `is_logging_call`, `IdClassifier` and `DiffTracker.parselogs`; bump it on
+# any change to their results, `SpanCache` keys are salted with it
+DETECTOR_VERSION = 1
 
-def extract_log(root):
-    """find first logging statement"""
+_SRC = "{http://www.srcML.org/srcML/src}"
+LOG_LEVELS = frozenset(["log", "fatal", "error", "warning", "info", "debug", "trace"])
+# xsd patterns are anchored and their `.` excludes both line ends
+_LOG_NAME = re.compile(r"[^\n\r]*[Ll][Oo][Gg][^\n\r]*")
+_XML_SPACE = " \t\n\r"
+_XML_SPACES = re.compile(r"[ \t\n\r]+")
+
+
+def _content(element) -> tuple[list, str]:
+    """child elements and text of `element`, ignoring comments like RelaxNG"""
+    children = []
+    text = [element.text or ""]
+    for child in element:
+        if isinstance(child.tag, str):
+            children.append(child)
+        text.append(child.tail or "")
+    return children, "".join(text)
+
+
+def _token(text: str) -> str:
+    return _XML_SPACES.sub(" ", text).strip(" ")
+
+
+def _is_blank(text: str) -> bool:
+    return not text.strip(_XML_SPACE)
+
+
+def is_logging_call(call) -> bool:
+    """same as `is_logging_statement`, checked directly on the tree
+
+    Accepts a `call` without attributes made of exactly a `name` and an
+    `argument_list`; the name is a chain of names matching `*log*` joined by
+    `.` operators ending in one of `LOG_LEVELS`, and the argument list holds
+    at least one argument, each wrapping exactly one element.
+    """
+    if call.tag != _SRC + "call" or call.attrib:
+        return False
+    children, text = _content(call)
+    if len(children) != 2 or not _is_blank(text):
+        return False
+    name, arguments = children
+    if name.tag != _SRC + "name" or name.attrib:
+        return False
+    if arguments.tag != _SRC + "argument_list" or arguments.attrib:
+        return False
+
+    parts, text = _content(name)
+    if len(parts) % 2 == 0 or not _is_blank(text):
+        return False
+    for i, part in enumerate(parts):
+        inner, value = _content(part)
+        if inner or part.attrib:
+            return False
+        if i == len(parts) - 1:
+            valid = part.tag == _SRC + "name" and _token(value) in LOG_LEVELS
+        elif i % 2 == 0:
+            valid = part.tag == _SRC + "name" and _LOG_NAME.fullmatch(value)
+        else:
+            valid = part.tag == _SRC + "operator" and _token(value) == "."
+        if not valid:
+            return False
+
+    # argument_list is mixed, only its elements are constrained
+    elements, _ = _content(arguments)
+    if not elements:
+        return False
+    for argument in elements:
+        if argument.tag != _SRC + "argument" or argument.attrib:
+            return False
+        inner, text = _content(argument)
+        if len(inner) != 1 or not _is_blank(text):
+            return False
+    return True
+
+
+def extract_log(root, is_log=is_logging_call):
+    """find first logging statement
+
+    `is_log` decides which calls are logs, `is_logging_statement` validates
+    them against logpattern.rng instead.
+    """
     for call in root.iter(r"{*}call"):
-        if is_logging_statement(call):
+        if is_log(call):
             yield call
 
 
@@ -33,12 +120,59 @@ ID_HEURISTICS = [
 ]
 
 
+class IdClassifier:
+    """decide whether variable names look like identifiers
+
+    A name is an identifier if one of its words, as split by `_WORD`, ends
+    with a heuristic. All heuristics are compiled into one regex: a word
+    ends right before a character that is not lowercase, and a heuristic can
+    only start at an uppercase letter when that letter starts a word. Results
+    are cached per name in a bounded LRU, one per classifier.
+    """
+
+    _pattern: re.Pattern[str] | None
+
+    def __init__(self, heuristics: Iterable[str] = ID_HEURISTICS, cache_size=1 << 16):
+        alternatives = []
+        for heuristic in heuristics:
+            # words are lowercased letters, anything else can never be a suffix
+            if not re.fullmatch(r"[a-z]*", heuristic):
+                continue
+            if heuristic == "":
+                alternatives.append("[a-zA-Z]")
+            else:
+                first = heuristic[0]
+                alternatives.append(f"[{first}{first.upper()}]{heuristic[1:]}")
+        self._pattern = None
+        if alternatives:
+            self._pattern = re.compile(f"(?:{'|'.join(alternatives)})(?![a-z])")
+        self._cached = lru_cache(maxsize=cache_size)(self._classify)
+
+    def _classify(self, variable: str) -> bool:
+        return self._pattern is not None and self._pattern.search(variable) is not None
+
+    def __call__(self, variable: str) -> bool:
+        return self._cached(variable)
+
+    def classify(self, variables: Iterable[str]) -> npt.NDArray[np.bool_]:
+        """classify many names at once, each distinct name is matched once"""
+        names, inverse = np.unique(
+            np.asarray([*variables], dtype=str), return_inverse=True
+        )
+        found = np.fromiter(
+            (self._cached(str(name)) for name in names), dtype=bool, count=len(names)
+        )
+        return found[inverse.reshape(-1)]
+
+    def cache_info(self):
+        return self._cached.cache_info()
+
+
+_ID_CLASSIFIER = IdClassifier()
+
+
 def is_id(variable: str):
-    for word in _WORD.findall(variable):
-        for heuristic in ID_HEURISTICS:
-            if word.lower().endswith(heuristic):
-                return True
-    return False
+    return _ID_CLASSIFIER(variable)
 
 
 def extract_id(log):
@@ -0,0 +1,330 @@
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from argparse import ArgumentParser, Namespace
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from typing import Any
+
+from ltid.toolkit.extractor import ExtractorPool, RecordFormat
+
+__all__ = [
+    "ExperimentRunner",
+    "JobResult",
+    "JobTimeoutError",
+    "Stage",
+    "add_runner_arguments",
+    "available_memory",
+    "print_results",
+    "process_memory",
+    "worker_extractor_pool",
+]
+
+
+class Stage(Enum):
+    """kind of resource a job is bound by"""
+
+    CPU = "cpu"
+    JVM = "jvm"
+
+
+class JobTimeoutError(TimeoutError):
+    pass
+
+
+@dataclass(slots=True)
+class JobResult:
+    project: Path
+    stage: Stage
+    value: Any = None
+    error: str | None = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass(slots=True)
+class _Job:
+    func: Callable[..., Any]
+    project: Path
+    args: tuple[Any, ...]
+    stage: Stage
+    timeout: float | None = None
+
+
+def _on_alarm(*_) -> None:
+    raise JobTimeoutError()
+
+
+def _call(job: _Job) -> Any:
+    """call the job, raise JobTimeoutError when its timeout expires
+
+    SIGALRM is only delivered to the main thread, elsewhere the job runs on a
+    daemon thread that is left behind, not stopped, when it times out.
+    """
+    if job.timeout is None:
+        return job.func(job.project, *job.args)
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, job.timeout)
+        try:
+            return job.func(job.project, *job.args)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+    future: Future[Any] = Future()
+
+    def target() -> None:
+        try:
+            future.set_result(job.func(job.project, *job.args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=target, daemon=True).start()
+    if not wait([future], timeout=job.timeout).done:
+        raise JobTimeoutError()
+    return future.result()
+
+
+def _run(job: _Job) -> JobResult:
+    """run a job inside a worker process and capture its outcome"""
+    result = JobResult(job.project, job.stage)
+    start = time.perf_counter()
+    try:
+        result.value = _call(job)
+    except JobTimeoutError:
+        result.error = f"timed out after {job.timeout}s"
+    except Exception:
+        result.error = traceback.format_exc()
+    finally:
+        result.elapsed = time.perf_counter() - start
+    return result
+
+
+def available_memory() -> int | None:
+    """bytes of memory available to new processes, None if unknown"""
+    try:
+        with open("/proc/meminfo") as fp:
+            for line in fp:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def process_memory(pid: int) -> int:
+    """resident bytes of a process and its descendants, 0 if it is gone"""
+    total = 0
+    pids = [pid]
+    while pids:
+        pid = pids.pop()
+        try:
+            with open(f"/proc/{pid}/statm") as fp:
+                total += int(fp.read().split()[1]) * _PAGE_SIZE
+            with open(f"/proc/{pid}/task/{pid}/children") as fp:
+                pids.extend(map(int, fp.read().split()))
+        except (OSError, ValueError, IndexError):
+            continue
+    return total
+
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+_worker_pool: ExtractorPool | None = None
+
+
+def worker_extractor_pool(
+    format: RecordFormat = "binary", workers: int = 1
+) -> ExtractorPool:
+    """extractor JVM owned by the current worker process, reused across jobs
+
+    The JVM exits on its own when the worker exits and closes its stdin.
+    """
+    global _worker_pool
+    if _worker_pool is None:
+        _worker_pool = ExtractorPool(1, format=format, workers=workers)
+    return _worker_pool
+
+
+class ExperimentRunner:
+    """schedule per-project jobs on process pools, one pool per stage
+
+    `workers` bounds how many jobs of a stage run at once, `memory` is the
+    number of bytes a job of a stage needs before it is admitted, on top of
+    what the running jobs still need. A job is always admitted when nothing
+    else is running so the queue cannot stall.
+    """
+
+    _POLL_INTERVAL = 1.0
+
+    _workers: dict[Stage, int]
+    _executors: dict[Stage, ProcessPoolExecutor]
+    _memory: Mapping[Stage, int]
+    _timeout: float | None
+    _pending: deque[_Job]
+    _running: dict[Future[JobResult], tuple[_Job, ProcessPoolExecutor]]
+
+    def __init__(
+        self,
+        cpu_workers: int | None = None,
+        jvm_workers: int = 1,
+        memory: Mapping[Stage, int] | None = None,
+        timeout: float | None = None,
+    ):
+        self._workers = {
+            Stage.CPU: cpu_workers or os.cpu_count() or 1,
+            Stage.JVM: jvm_workers,
+        }
+        self._executors = {
+            stage: ProcessPoolExecutor(workers)
+            for stage, workers in self._workers.items()
+        }
+        self._memory = memory or {}
+        self._timeout = timeout
+        self._pending = deque()
+        self._running = {}
+
+    @classmethod
+    def from_args(cls, args: Namespace) -> "ExperimentRunner":
+        """create a runner from the options of `add_runner_arguments`"""
+        return cls(
+            cpu_workers=args.cpu_workers,
+            jvm_workers=args.jvm_workers,
+            memory={
+                Stage.CPU: int(args.cpu_memory_gb * 2**30),
+                Stage.JVM: int(args.jvm_memory_gb * 2**30),
+            },
+            timeout=args.timeout,
+        )
+
+    def submit(
+        self,
+        func: Callable[..., Any],
+        project: Path,
+        *args: Any,
+        stage: Stage = Stage.CPU,
+    ) -> None:
+        """queue `func(project, *args)`, it runs when `results` is consumed"""
+        self._pending.append(_Job(func, project, args, stage, self._timeout))
+
+    def _running_count(self, stage: Stage) -> int:
+        return sum(1 for job, _ in self._running.values() if job.stage == stage)
+
+    def _allocated(self, stage: Stage) -> int:
+        """resident bytes of the worker processes of a stage, their JVMs included"""
+        # ProcessPoolExecutor does not expose its workers otherwise
+        processes = self._executors[stage]._processes or {}
+        return sum(process_memory(pid) for pid in processes)
+
+    def _unallocated(self, stage: Stage) -> int:
+        """bytes reserved by the running jobs of a stage not allocated yet"""
+        reserved = sum(
+            self._memory.get(job.stage, 0)
+            for job, _ in self._running.values()
+            if job.stage == stage
+        )
+        if reserved == 0:
+            return 0
+        return max(0, reserved - self._allocated(stage))
+
+    def _admit(self) -> None:
+        """start pending jobs while workers and memory allow, in queue order
+
+        Memory is read once per pass. What the running jobs have allocated is
+        already missing from it, so only the rest of their requirement is
+        reserved, measured per stage from the resident size of its workers.
+        """
+        available = None
+        reserved = 0
+        if any(self._memory.values()):
+            available = available_memory()
+            reserved = sum(self._unallocated(stage) for stage in Stage)
+        for job in list(self._pending):
+            if self._running_count(job.stage) >= self._workers[job.stage]:
+                continue
+            required = self._memory.get(job.stage, 0)
+            if self._running and required > 0 and available is not None:
+                if available - reserved < required:
+                    return
+            reserved += required
+            self._pending.remove(job)
+            executor = self._executors[job.stage]
+            self._running[executor.submit(_run, job)] = (job, executor)
+
+    def results(self) -> Iterator[JobResult]:
+        """run queued jobs and yield their results as they complete"""
+        while self._pending or self._running:
+            self._admit()
+            done, _ = wait(
+                self._running, timeout=self._POLL_INTERVAL, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                job, executor = self._running.pop(future)
+                try:
+                    yield future.result()
+                except BrokenProcessPool:
+                    # a worker died, e.g. killed by the OOM killer, which breaks
+                    # every job of its pool; replace the pool for later jobs
+                    if self._executors[job.stage] is executor:
+                        executor.shutdown(wait=False)
+                        self._executors[job.stage] = ProcessPoolExecutor(
+                            self._workers[job.stage]
+                        )
+                    yield JobResult(
+                        job.project, job.stage, error=traceback.format_exc()
+                    )
+
+    def map(
+        self,
+        func: Callable[..., Any],
+        projects: Iterable[Path],
+        *args: Any,
+        stage: Stage = Stage.CPU,
+    ) -> list[JobResult]:
+        for project in projects:
+            self.submit(func, project, *args, stage=stage)
+        return [*self.results()]
+
+    def close(self) -> None:
+        for executor in self._executors.values():
+            executor.shutdown()
+
+    def __enter__(self) -> "ExperimentRunner":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+def add_runner_arguments(argument_parser: ArgumentParser) -> None:
+    argument_parser.add_argument("--cpu_workers", type=int, default=None)
+    argument_parser.add_argument("--jvm_workers", type=int, default=1)
+    argument_parser.add_argument("--cpu_memory_gb", type=float, default=0)
+    argument_parser.add_argument("--jvm_memory_gb", type=float, default=0)
+    argument_parser.add_argument("--timeout", type=float, default=None)
+
+
+def print_results(results: Iterable[JobResult]) -> int:
+    """print job values to stdout and errors to stderr, return the failure count"""
+    failures = 0
+    for result in results:
+        if result.ok:
+            print(result.value)
+        else:
+            failures += 1
+            print(
+                f"{result.project} ({result.elapsed:.1f}s): {result.error}",
+                file=sys.stderr,
+            )
+    return failures
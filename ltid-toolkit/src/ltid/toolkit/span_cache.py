@@ -0,0 +1,140 @@
+import hashlib
+import sqlite3
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from importlib import resources
+from pathlib import Path
+
+from ltid.toolkit.query import DETECTOR_VERSION, ID_HEURISTICS
+
+__all__ = ["CacheStats", "SpanCache"]
+
+# log classification of one span: has_id for each log statement found in it
+type SpanLogs = list[bool]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS spans (key BLOB PRIMARY KEY, logs TEXT NOT NULL)
+    WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS stats (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    hits INTEGER NOT NULL,
+    misses INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO stats VALUES (0, 0, 0);
+"""
+
+# sqlite's default limit on host parameters in one statement
+_MAX_PARAMETERS = 999
+
+
+@dataclass(slots=True)
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def _salt() -> bytes:
+    """fingerprint of everything a classification depends on besides the span
+
+    Changes to the log detector are only seen through `DETECTOR_VERSION`.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(DETECTOR_VERSION.to_bytes(4, "big"))
+    digest.update((resources.files() / "logpattern.rng").read_bytes())
+    digest.update("\0".join(ID_HEURISTICS).encode())
+    return digest.digest()
+
+
+class SpanCache:
+    """persistent classification of changed spans, keyed by their content
+
+    Keys hash the span with its whitespace collapsed, together with
+    `DETECTOR_VERSION`, the log pattern and the id heuristics, so one database
+    can be shared by every run and every subject. It is safe to open from
+    several processes at once.
+    """
+
+    _connection: sqlite3.Connection
+    _salt: bytes
+    stats: CacheStats
+
+    def __init__(self, path: Path, timeout: float = 60):
+        self._connection = sqlite3.connect(path, timeout=timeout)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+        self._connection.commit()
+        self._salt = _salt()
+        self.stats = CacheStats()
+
+    def key(self, content: str) -> bytes:
+        digest = hashlib.blake2b(self._salt, digest_size=16)
+        digest.update(" ".join(content.split()).encode())
+        return digest.digest()
+
+    def _lookup(self, keys: Sequence[bytes]) -> dict[bytes, SpanLogs]:
+        found = {}
+        for i in range(0, len(keys), _MAX_PARAMETERS):
+            chunk = keys[i : i + _MAX_PARAMETERS]
+            parameters = ",".join("?" * len(chunk))
+            rows = self._connection.execute(
+                f"SELECT key, logs FROM spans WHERE key IN ({parameters})", chunk
+            )
+            for key, logs in rows:
+                found[key] = [c == "1" for c in logs]
+        return found
+
+    def classify(
+        self,
+        contents: Sequence[str],
+        parse: Callable[[Sequence[str]], list[SpanLogs]],
+    ) -> list[SpanLogs]:
+        """classifications of `contents`, calling `parse` only for unseen spans"""
+        if not contents:
+            return []
+        keys = [self.key(content) for content in contents]
+        found = self._lookup([*dict.fromkeys(keys)])
+
+        missing = {}
+        for key, content in zip(keys, contents):
+            if key not in found:
+                missing.setdefault(key, content)
+        found.update(zip(missing, parse([*missing.values()])))
+
+        hits = len(keys) - len(missing)
+        self.stats.hits += hits
+        self.stats.misses += len(missing)
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO spans VALUES (?, ?)",
+                [
+                    (key, "".join("1" if has_id else "0" for has_id in found[key]))
+                    for key in missing
+                ],
+            )
+            self._connection.execute(
+                "UPDATE stats SET hits = hits + ?, misses = misses + ?",
+                (hits, len(missing)),
+            )
+        return [found[key] for key in keys]
+
+    def total_stats(self) -> CacheStats:
+        """hits and misses of every run that used this database"""
+        hits, misses = self._connection.execute(
+            "SELECT hits, misses FROM stats"
+        ).fetchone()
+        return CacheStats(hits, misses)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> "SpanCache":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
@@ -0,0 +1,173 @@
+import json
+import resource
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+__all__ = ["Span", "Trace", "current_trace", "span", "trace", "traced"]
+
+# ru_maxrss is in kibibytes on linux, in bytes on macos
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def _max_rss(who: int) -> int:
+    return resource.getrusage(who).ru_maxrss * _RSS_UNIT
+
+
+@dataclass(slots=True)
+class Span:
+    """one timed stage; peak sizes are those of the process so far, in bytes
+
+    `max_rss_children` covers the subprocesses already waited for, such as
+    the extractor JVM.
+    """
+
+    name: str
+    depth: int = 0
+    start: float = 0.0
+    wall: float = 0.0
+    cpu: float = 0.0
+    max_rss: int = 0
+    max_rss_children: int = 0
+    items: int | None = None
+
+    def add(self, items: int = 1) -> None:
+        self.items = (self.items or 0) + items
+
+    def _finish(self) -> None:
+        self.max_rss = _max_rss(resource.RUSAGE_SELF)
+        self.max_rss_children = _max_rss(resource.RUSAGE_CHILDREN)
+
+
+class Trace:
+    """spans recorded while this trace is current, see `trace`"""
+
+    spans: list[Span]
+    metadata: dict[str, Any]
+    _origin: float
+    _depth: int
+
+    def __init__(self, **metadata: Any):
+        self.spans = []
+        self.metadata = metadata
+        self._origin = time.perf_counter()
+        self._depth = 0
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[Span]:
+        span = Span(name, self._depth, time.perf_counter() - self._origin)
+        self.spans.append(span)
+        cpu = time.process_time()
+        self._depth += 1
+        try:
+            yield span
+        finally:
+            self._depth -= 1
+            span.wall = time.perf_counter() - self._origin - span.start
+            span.cpu = time.process_time() - cpu
+            span._finish()
+
+    def traced[T](self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        """yield from `iterable`, timing only the time spent producing items"""
+        span = Span(name, self._depth, time.perf_counter() - self._origin, items=0)
+        self.spans.append(span)
+        iterator = iter(iterable)
+        try:
+            while True:
+                wall = time.perf_counter()
+                cpu = time.process_time()
+                self._depth += 1
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    self._depth -= 1
+                    span.wall += time.perf_counter() - wall
+                    span.cpu += time.process_time() - cpu
+                span.items += 1
+                yield item
+        finally:
+            span._finish()
+
+    @property
+    def elapsed(self) -> float:
+        """seconds since the trace started, the clock of `Span.start`"""
+        return time.perf_counter() - self._origin
+
+    def record(self, span: Span) -> None:
+        """add a span measured elsewhere, such as in a subprocess"""
+        span.depth = self._depth
+        self.spans.append(span)
+
+    def summary(self) -> dict[str, dict[str, float | int]]:
+        """totals of the spans of each name, in order of first appearance"""
+        totals: dict[str, dict[str, float | int]] = {}
+        for span in self.spans:
+            total = totals.setdefault(
+                span.name,
+                {"count": 0, "wall": 0.0, "cpu": 0.0, "items": 0, "max_rss": 0},
+            )
+            total["count"] += 1
+            total["wall"] += span.wall
+            total["cpu"] += span.cpu
+            total["items"] += span.items or 0
+            total["max_rss"] = max(total["max_rss"], span.max_rss)
+        return totals
+
+    def dump(self, path: Path) -> None:
+        """write the metadata, summary and every span as one json document"""
+        with open(path, "w") as fp:
+            json.dump(
+                {
+                    "metadata": self.metadata,
+                    "summary": self.summary(),
+                    "spans": [asdict(span) for span in self.spans],
+                },
+                fp,
+            )
+
+
+_current: ContextVar[Trace | None] = ContextVar("trace", default=None)
+
+
+def current_trace() -> Trace | None:
+    return _current.get()
+
+
+@contextmanager
+def trace(**metadata: Any) -> Iterator[Trace]:
+    """make a new `Trace` current, spans opened meanwhile are recorded in it"""
+    trace = Trace(**metadata)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str) -> Iterator[Span]:
+    """time a stage in the current trace; also works as a decorator
+
+    Without a current trace nothing is measured and the span is discarded.
+    """
+    trace = _current.get()
+    if trace is None:
+        yield Span(name)
+        return
+    with trace.span(name) as span:
+        yield span
+
+
+def traced[T](name: str, iterable: Iterable[T]) -> Iterator[T]:
+    """as `Trace.traced` in the current trace, `iterable` itself without one"""
+    trace = _current.get()
+    if trace is None:
+        return iter(iterable)
+    return trace.traced(name, iterable)
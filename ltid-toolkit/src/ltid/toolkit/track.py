@@ -1,6 +1,11 @@
-import itertools
-from dataclasses import dataclass
+import json
+import re
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass
 from enum import Enum
+from pathlib import Path
 from typing import Iterator
 
 from lxml import etree
@@ -12,7 +17,9 @@ from pygit2.enums import DiffOption, SortMode
 from pygit2.repository import Repository
 from pylibsrcml.srcml import srcml_archive, srcml_unit
 
-from .query import extract_id, extract_log
+from .query import extract_log, is_id, ns
+from .span_cache import SpanCache
+from .timing import span
 
 WALK_ORDER = SortMode.REVERSE | SortMode.TOPOLOGICAL | SortMode.TIME
 
@@ -23,6 +30,12 @@ DIFF_FLAGS = (
     | DiffOption.MINIMAL
 )
 
+# every call accepted by logpattern.rng ends in one of these names; spans
+# without any of them cannot hold a log and are never handed to srcML
+_MAYBE_LOG = re.compile(r"\b(?:log|fatal|error|warning|info|debug|trace)\b")
+
+_unit_names = etree.XPath(".//src:name/text()", namespaces=ns)
+
 
 def walk(repository: Repository) -> Iterator[Commit]:
     for commit in repository.walk(repository.head.target, WALK_ORDER):
@@ -74,17 +87,45 @@ class SourceParser:
         srctree = unit.get_srcml()
         return etree.fromstring(srctree, parser=self._xmlparser)
 
+    def parsestrings(self, codes: Sequence[str]) -> list[etree._Element]:
+        """parse many snippets as the units of one archive, in order"""
+        if not codes:
+            return []
+        archive = self._archive.clone()
+        archive.disable_solitary_unit()
+        archive.write_open_memory()
+        for code in codes:
+            unit = srcml_unit(archive)
+            unit.parse_memory(code)
+            archive.write_unit(unit)
+        archive.close()
+
+        root = etree.fromstring(archive.srcML().encode(), parser=self._xmlparser)
+        units = root.findall("{*}unit")
+        if not units and len(codes) == 1:
+            return [root]
+        return units
+
 
 class DiffTracker:
     _repository: Repository
     _parser: SourceParser
+    _cache: SpanCache | None
 
-    def __init__(self, repository: Repository, parser: SourceParser):
+    def __init__(
+        self,
+        repository: Repository,
+        parser: SourceParser,
+        cache: SpanCache | None = None,
+    ):
         self._repository = repository
         self._parser = parser
+        self._cache = cache
 
+    @span("DiffTracker.track")
     def track(self, commit: Commit) -> DiffTrack:
         track = DiffTrack.fromcommit(commit)
+        spans: list[tuple[str, str]] = []
         for parent in commit.parents:
             diff = self._repository.diff(
                 commit.id, parent.id, flags=DIFF_FLAGS, context_lines=4
@@ -106,45 +147,169 @@ class DiffTracker:
                         if line.origin in " +<=>":
                             newlines.append(line)
 
-                    for change, has_id in itertools.chain(
-                        self.changedlogs(oldlines, "-"), self.changedlogs(newlines, "+")
-                    ):
-                        if change == "-":
-                            track.numold += 1
-                            if has_id:
-                                track.numoldid += 1
-                        if change == "+":
-                            track.numnew += 1
-                            if has_id:
-                                track.numnewid += 1
-                        if change == "~":
-                            track.numrev += 1
-                            if has_id:
-                                track.numrevid += 1
+                    spans.extend(changedspans(oldlines, "-"))
+                    spans.extend(changedspans(newlines, "+"))
+
+        for change, has_id in self.parsespans(spans):
+            if change == "-":
+                track.numold += 1
+                if has_id:
+                    track.numoldid += 1
+            if change == "+":
+                track.numnew += 1
+                if has_id:
+                    track.numnewid += 1
+            if change == "~":
+                track.numrev += 1
+                if has_id:
+                    track.numrevid += 1
         return track
 
     def changedlogs(self, lines, changetype):
         """find spans of changed logs"""
+        return self.parsespans(changedspans(lines, changetype))
+
+    def parsespans(self, spans: Sequence[tuple[str, str]]) -> list[tuple[str, bool]]:
+        """classify the logs of (content, changetype) spans with one srcML parse"""
+        spans = [span for span in spans if _MAYBE_LOG.search(span[0])]
+        contents = [content for content, _ in spans]
+        if self._cache is None:
+            classified = self.parselogs(contents)
+        else:
+            classified = self._cache.classify(contents, self.parselogs)
         out = []
-        i = 0
-        n = len(lines)
-        count = 0
-        content = ""
-        changes = ""
-        while i < n:
-            line = lines[i]
-            content += " " + line.content.strip()
-            changes += line.origin
-            count += line.content.count("(") - line.content.count(")")
-            if count == 0:
-                if changetype in changes:
-                    root = self._parser.parsestring(content)
-                    for stmt in extract_log(root):
-                        if any(c != changetype for c in changes):
-                            out.append(("~", len(list(extract_id(stmt))) != 0))
-                        else:
-                            out.append((changetype, len(list(extract_id(stmt))) != 0))
-                content = ""
-                changes = ""
-            i += 1
+        for (_, change), logs in zip(spans, classified):
+            out.extend((change, has_id) for has_id in logs)
         return out
+
+    def parselogs(self, contents: Sequence[str]) -> list[list[bool]]:
+        """for each span, whether each of its logs has an id
+
+        As with `extract_id` on a span parsed alone, ids are searched among
+        all the names of the span; the spans now share one document, so the
+        search is scoped to the span's unit.
+        """
+        out = []
+        for root in self._parser.parsestrings(contents):
+            has_id = any(is_id(name) for name in _unit_names(root))
+            out.append([has_id for _ in extract_log(root)])
+        return out
+
+
+def changedspans(lines, changetype) -> list[tuple[str, str]]:
+    """balanced-paren spans containing `changetype` lines, with their change
+
+    A span whose lines are not all `changetype` is a revision, `~`.
+    """
+    out = []
+    count = 0
+    content = ""
+    changes = ""
+    for line in lines:
+        content += " " + line.content.strip()
+        changes += line.origin
+        count += line.content.count("(") - line.content.count(")")
+        if count == 0:
+            if changetype in changes:
+                if any(c != changetype for c in changes):
+                    out.append((content, "~"))
+                else:
+                    out.append((content, changetype))
+            content = ""
+            changes = ""
+    return out
+
+
+_worker_tracker: DiffTracker | None = None
+
+
+def _init_worker(repository_path: str, language: str, cache_path: Path | None) -> None:
+    global _worker_tracker
+    _worker_tracker = DiffTracker(
+        Repository(repository_path),
+        SourceParser(language),
+        SpanCache(cache_path) if cache_path is not None else None,
+    )
+
+
+def _track_chunk(commit_ids: Sequence[str]) -> list[DiffTrack]:
+    assert _worker_tracker is not None
+    repository = _worker_tracker._repository
+    return [
+        _worker_tracker.track(repository.get(commit_id)) for commit_id in commit_ids
+    ]
+
+
+def iter_checkpoint(checkpoint: Path) -> Iterator[DiffTrack]:
+    """stream rows saved by `track_history`
+
+    Once exhausted, a partially written last line is cut off the file.
+    """
+    if not checkpoint.exists():
+        return
+    with open(checkpoint, "r+b") as fp:
+        valid = 0
+        for line in fp:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                track = DiffTrack(**json.loads(line))
+            except (ValueError, TypeError):
+                break
+            valid += len(line)
+            yield track
+        fp.truncate(valid)
+
+
+def read_checkpoint(checkpoint: Path) -> list[DiffTrack]:
+    """rows saved by `track_history`, dropping a partially written last line"""
+    return [*iter_checkpoint(checkpoint)]
+
+
+def track_history(
+    repository_path: Path,
+    language: str = "Java",
+    workers: int | None = None,
+    checkpoint: Path | None = None,
+    chunk_size: int = 64,
+    cache_path: Path | None = None,
+) -> Iterator[DiffTrack]:
+    """track every commit of `walk()` on a pool of worker processes
+
+    Commits are split into chunks of `chunk_size` consecutive commits, each
+    worker has its own repository and srcML archive. Rows are yielded in walk
+    order. With `checkpoint`, finished rows are appended to it as json lines
+    and a later call yields them again without tracking those commits. With
+    `cache_path`, workers share a `SpanCache` there.
+    """
+    tracked = set()
+    if checkpoint is not None:
+        for track in iter_checkpoint(checkpoint):
+            tracked.add(track.commit)
+            yield track
+
+    commit_ids = [
+        str(commit.id)
+        for commit in walk(Repository(str(repository_path)))
+        if str(commit.id) not in tracked
+    ]
+    chunks = [
+        commit_ids[i : i + chunk_size] for i in range(0, len(commit_ids), chunk_size)
+    ]
+
+    executor = ProcessPoolExecutor(
+        workers,
+        initializer=_init_worker,
+        initargs=(str(repository_path), language, cache_path),
+    )
+    with ExitStack() as stack:
+        # do not wait for hours of queued chunks if the consumer stops early
+        stack.callback(executor.shutdown, cancel_futures=True)
+        fp = None
+        if checkpoint is not None:
+            fp = stack.enter_context(open(checkpoint, "a"))
+        for tracks in executor.map(_track_chunk, chunks):
+            if fp is not None:
+                fp.writelines(json.dumps(asdict(track)) + "\n" for track in tracks)
+                fp.flush()
+            yield from tracks
@@ -0,0 +1,159 @@
+import json
+import os
+from collections.abc import Iterable
+from dataclasses import astuple, fields
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from ltid.toolkit.track import DiffTrack
+
+__all__ = ["DiffTrackFormatError", "DiffTrackWriter", "read_diff_tracks"]
+
+_MANIFEST = "manifest.json"
+_VERSION = 1
+_COLUMNS = [field.name for field in fields(DiffTrack)]
+
+
+class DiffTrackFormatError(Exception):
+    pass
+
+
+def _dtypes(commit_length: int) -> dict[str, np.dtype]:
+    dtypes = {name: np.dtype("<i4") for name in _COLUMNS}
+    dtypes["commit"] = np.dtype(f"S{commit_length}")
+    dtypes["timestamp"] = np.dtype("<i8")
+    return dtypes
+
+
+def _read_manifest(directory: Path) -> dict:
+    with open(directory / _MANIFEST) as fp:
+        manifest = json.load(fp)
+    if manifest.get("version") != _VERSION:
+        raise DiffTrackFormatError(
+            f"unsupported version {manifest.get('version')} in {directory}"
+        )
+    return manifest
+
+
+class DiffTrackWriter:
+    """append `DiffTrack` rows to a directory with one raw file per column
+
+    Rows are buffered and written `batch_size` at a time. The manifest is
+    replaced after each batch and its row count is authoritative: bytes past
+    it, left by an interrupted write, are cut off when the directory is
+    reopened for appending.
+    """
+
+    _directory: Path
+    _batch_size: int
+    _rows: int
+    _dtypes: dict[str, np.dtype] | None
+    _batch: list[DiffTrack]
+
+    def __init__(self, directory: Path, batch_size: int = 1 << 14, append=False):
+        self._directory = directory
+        self._batch_size = batch_size
+        self._batch = []
+        self._rows = 0
+        self._dtypes = None
+        directory.mkdir(parents=True, exist_ok=True)
+        if append and (directory / _MANIFEST).exists():
+            manifest = _read_manifest(directory)
+            self._rows = manifest["rows"]
+            self._dtypes = {
+                name: np.dtype(dtype) for name, dtype in manifest["dtypes"].items()
+            }
+            for name, dtype in self._dtypes.items():
+                with open(self._column_path(name), "ab") as fp:
+                    fp.truncate(self._rows * dtype.itemsize)
+        else:
+            for name in _COLUMNS:
+                self._column_path(name).unlink(missing_ok=True)
+            (directory / _MANIFEST).unlink(missing_ok=True)
+
+    def _column_path(self, name: str) -> Path:
+        return self._directory / f"{name}.bin"
+
+    def __len__(self) -> int:
+        return self._rows + len(self._batch)
+
+    def append(self, track: DiffTrack) -> None:
+        self._batch.append(track)
+        if len(self._batch) >= self._batch_size:
+            self.flush()
+
+    def extend(self, tracks: Iterable[DiffTrack]) -> None:
+        for track in tracks:
+            self.append(track)
+
+    def flush(self) -> None:
+        if not self._batch:
+            return
+        if self._dtypes is None:
+            self._dtypes = _dtypes(len(self._batch[0].commit))
+        columns = zip(*(astuple(track) for track in self._batch))
+        for name, values in zip(_COLUMNS, columns):
+            dtype = self._dtypes[name]
+            if name == "commit":
+                values = [value.encode() for value in values]
+                if any(len(value) > dtype.itemsize for value in values):
+                    raise DiffTrackFormatError(f"commit id longer than {dtype}")
+            with open(self._column_path(name), "ab") as fp:
+                np.asarray(values, dtype=dtype).tofile(fp)
+        self._rows += len(self._batch)
+        self._batch = []
+        self._write_manifest()
+
+    def _write_manifest(self) -> None:
+        assert self._dtypes is not None
+        manifest = {
+            "version": _VERSION,
+            "rows": self._rows,
+            "dtypes": {name: dtype.str for name, dtype in self._dtypes.items()},
+        }
+        temporary = self._directory / f"{_MANIFEST}.tmp"
+        with open(temporary, "w") as fp:
+            json.dump(manifest, fp)
+        os.replace(temporary, self._directory / _MANIFEST)
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> "DiffTrackWriter":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+def _read_column(
+    directory: Path, name: str, dtype: np.dtype, rows: int
+) -> npt.NDArray[np.generic]:
+    if rows == 0:
+        return np.empty(0, dtype=dtype)
+    values = np.fromfile(directory / f"{name}.bin", dtype=dtype, count=rows)
+    if len(values) != rows:
+        raise DiffTrackFormatError(f"column {name} of {directory} is truncated")
+    return values
+
+
+def read_diff_tracks(directory: Path) -> pd.DataFrame:
+    """load a `DiffTrackWriter` directory, one row per commit"""
+    if (directory / _MANIFEST).exists():
+        manifest = _read_manifest(directory)
+        rows = manifest["rows"]
+        dtypes = {name: np.dtype(dtype) for name, dtype in manifest["dtypes"].items()}
+    else:
+        rows, dtypes = 0, _dtypes(40)
+    columns = {}
+    for name, dtype in dtypes.items():
+        values = _read_column(directory, name, dtype, rows)
+        if name == "commit":
+            columns[name] = pd.array(np.char.decode(values, "ascii"), dtype="string")
+        elif name == "timestamp":
+            columns[name] = pd.to_datetime(values, unit="s", utc=True)
+        else:
+            columns[name] = values
+    return pd.DataFrame(columns)
@@ -0,0 +1,119 @@
+import math
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+import numpy as np
+from ltid.toolkit.log_graph import LogGraph
+from ltid.toolkit.log_statement import LogStatement
+
+__all__ = ["TrieMatcher"]
+
+type Trie = Iterable[tuple[int, Any]]
+
+
+class TrieMatcher:
+    """match log graph paths against a pattern trie without re-running beams
+
+    The trie is flattened once in preorder. For every (event id, depth) the
+    preorder numbers of matching nodes are kept sorted, and the descendants of
+    a node are the preorder interval `(node, end[node])`. Within one depth
+    preorder is also breadth-first order, so the first match that `beam` would
+    find below a node is one bisection per depth in reach.
+    """
+
+    _depths: list[int]
+    _ends: list[int]
+    _index: dict[tuple[int, int], list[int]]
+
+    def __init__(self, trie: Trie):
+        event_ids = [-1]
+        self._depths = [0]
+        self._ends = [0]
+        stack: list[tuple[int, Iterator[tuple[int, Any]]]] = [(0, iter(trie))]
+        while stack:
+            node, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                self._ends[node] = len(event_ids)
+                stack.pop()
+                continue
+            event_id, subtrie = child
+            event_ids.append(event_id)
+            self._depths.append(self._depths[node] + 1)
+            self._ends.append(0)
+            stack.append((len(event_ids) - 1, iter(subtrie)))
+
+        ids = np.array(event_ids[1:], dtype=np.int64)
+        depths = np.array(self._depths[1:], dtype=np.int64)
+        nodes = np.arange(1, len(event_ids), dtype=np.int64)
+        order = np.lexsort((nodes, depths, ids))
+        self._index = {}
+        for event_id, depth, node in zip(
+            ids[order].tolist(), depths[order].tolist(), nodes[order].tolist()
+        ):
+            self._index.setdefault((event_id, depth), []).append(node)
+
+    def __len__(self) -> int:
+        """number of trie nodes, excluding the root"""
+        return len(self._depths) - 1
+
+    def find(
+        self, node: int, event_id: int, max_distance: float
+    ) -> tuple[int, int] | None:
+        """first node below `node` with `event_id` in breadth-first order
+
+        Returns the node and the number of skipped levels, like the first hit
+        of `beam(node, max_distance)` in compare_patterns.
+        """
+        reach = max(0, math.ceil(max_distance))
+        depth = self._depths[node]
+        end = self._ends[node]
+        for skipped in range(reach + 1):
+            nodes = self._index.get((event_id, depth + 1 + skipped))
+            if nodes is None:
+                continue
+            i = bisect_left(nodes, node + 1)
+            if i < len(nodes) and nodes[i] < end:
+                return nodes[i], skipped
+        return None
+
+    def match(self, path: Iterable[LogStatement], max_distance: float) -> int | None:
+        """match a single path, same result as compare_patterns.match"""
+        node, k = 0, 0
+        for statement in path:
+            found = self.find(node, statement.event_id, max_distance - k)
+            if found is None:
+                return None
+            node, j = found
+            k = min(k, j)
+        return k
+
+    def match_paths(
+        self, log_graph: LogGraph, max_distance: float
+    ) -> Iterator[tuple[LogStatement, int, int | None]]:
+        """match every root-to-leaf path of `log_graph` in one traversal
+
+        Paths sharing a prefix share its matching work. Yields the leaf, the
+        path length and the match distance (None if the path does not match)
+        in the order of `LogGraph.paths`.
+        """
+        # (statement, trie node or None once the prefix failed, distance, length)
+        stack: list[tuple[LogStatement, int | None, int, int]] = [
+            (root, 0, 0, 1) for root in reversed([*log_graph.roots])
+        ]
+        while stack:
+            statement, node, k, length = stack.pop()
+            if node is not None:
+                found = self.find(node, statement.event_id, max_distance - k)
+                if found is None:
+                    node = None
+                else:
+                    node, j = found
+                    k = min(k, j)
+            children = statement.children
+            if not children:
+                yield statement, length, None if node is None else k
+                continue
+            for child in reversed(children):
+                stack.append((child, node, k, length + 1))
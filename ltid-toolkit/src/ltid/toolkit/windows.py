@@ -0,0 +1,72 @@
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+
+__all__ = ["Windows", "sliding_windows"]
+
+
+@dataclass(slots=True, frozen=True)
+class Windows:
+    """sequences stored CSR-style, sequence `i` is `values[starts[i]:ends[i]]`
+
+    Sequences are views into the shared `values` array, nothing is copied
+    until `tolist` is called.
+    """
+
+    values: npt.NDArray[np.int32]
+    starts: npt.NDArray[np.int64]
+    ends: npt.NDArray[np.int64]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, i: int) -> npt.NDArray[np.int32]:
+        return self.values[self.starts[i] : self.ends[i]]
+
+    def __iter__(self) -> Iterator[npt.NDArray[np.int32]]:
+        for start, end in zip(self.starts.tolist(), self.ends.tolist()):
+            yield self.values[start:end]
+
+    @property
+    def lengths(self) -> npt.NDArray[np.int64]:
+        return self.ends - self.starts
+
+    def tolist(self) -> list[list[int]]:
+        values = self.values.tolist()
+        return [
+            values[start:end]
+            for start, end in zip(self.starts.tolist(), self.ends.tolist())
+        ]
+
+
+def sliding_windows(
+    timestamps: npt.NDArray[np.int64],
+    event_ids: npt.NDArray[np.int32],
+    window_size: int,
+    min_length: int = 1,
+    max_length: int | None = None,
+    max_count: int | None = None,
+) -> Windows:
+    """time windows ending at each event, as pandas' `rolling(window_size)`
+
+    The window of event `i` holds the events `j <= i` with
+    `timestamps[j] > timestamps[i] - window_size`; `timestamps` must be sorted.
+    Only the first `max_count` windows are considered, windows shorter than
+    `min_length` are dropped and the rest are cut to their first `max_length`
+    events.
+    """
+    count = len(timestamps)
+    if max_count is not None:
+        count = min(count, max_count)
+    ends = np.arange(1, count + 1, dtype=np.int64)
+    starts = np.searchsorted(
+        timestamps, timestamps[:count] - window_size, side="right"
+    ).astype(np.int64)
+    keep = ends - starts >= min_length
+    starts = starts[keep]
+    ends = ends[keep]
+    if max_length is not None:
+        ends = np.minimum(ends, starts + max_length)
+    return Windows(event_ids, starts, ends)
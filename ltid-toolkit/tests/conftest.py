@@ -0,0 +1,45 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+try:
+    from pylibsrcml import srcml  # noqa: F401
+
+    SRCML = True
+except Exception:  # not installed, or installed without the srcML library
+    SRCML = False
+
+# enough of pylibsrcml to build a `SourceParser`, for sources without logs
+_SRCML_STUB = """
+class srcml_archive:
+    def __getattr__(self, name):
+        return lambda *args: None
+
+
+class srcml_unit:
+    def __init__(self, *args):
+        raise RuntimeError("srcML is not installed")
+"""
+
+
+@pytest.fixture
+def track(tmp_path_factory, monkeypatch):
+    """the track module, on a stub of pylibsrcml when srcML is missing
+
+    The stub is also put on PYTHONPATH for the worker processes.
+    """
+    if not SRCML:
+        monkeypatch.delitem(sys.modules, "pylibsrcml", raising=False)
+        monkeypatch.delitem(sys.modules, "pylibsrcml.srcml", raising=False)
+        stub = tmp_path_factory.mktemp("stub")
+        (stub / "pylibsrcml").mkdir()
+        (stub / "pylibsrcml" / "__init__.py").touch()
+        (stub / "pylibsrcml" / "srcml.py").write_text(_SRCML_STUB)
+        monkeypatch.syspath_prepend(str(stub))
+        path = os.environ.get("PYTHONPATH")
+        monkeypatch.setenv(
+            "PYTHONPATH", f"{stub}{os.pathsep}{path}" if path else str(stub)
+        )
+    return importlib.import_module("ltid.toolkit.track")
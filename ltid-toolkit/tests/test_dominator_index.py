@@ -0,0 +1,68 @@
+import random
+
+import numpy as np
+import pytest
+from ltid.toolkit.log_graph import LogGraph
+
+
+def random_graph(seed: int, n: int = 200) -> LogGraph:
+    """a random dominator forest, event ids shuffled against the tree order"""
+    r = random.Random(seed)
+    event_ids = r.sample(range(4 * n), n)
+    records = []
+    for i, event_id in enumerate(event_ids):
+        if i == 0 or r.random() < 0.1:
+            idom = -1
+        else:
+            # long chains, to need several jumps
+            idom = event_ids[i - 1 if r.random() < 0.5 else r.randrange(i)]
+        records.append([idom, event_id, "/A.java", "p", "A", "m", i, "INFO", "t"])
+    r.shuffle(records)
+    return LogGraph.from_records(records)
+
+
+def _chain(log_graph: LogGraph, row: int) -> list[int]:
+    """`row` and its dominators, walking the idoms"""
+    chain = []
+    while row >= 0:
+        chain.append(row)
+        row = int(log_graph._idoms[row])
+    return chain
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_idom_walk(seed):
+    log_graph = random_graph(seed)
+    index = log_graph.dominator_index
+    chains = [_chain(log_graph, row) for row in range(len(log_graph))]
+    assert index.depths.tolist() == [len(chain) for chain in chains]
+    for a in range(len(log_graph)):
+        for b in range(len(log_graph)):
+            assert index.dominates(a, b) == (a in chains[b][1:])
+            common = [row for row in chains[a] if row in chains[b]]
+            assert index.common_dominator(a, b) == (common[0] if common else None)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_masked_dominators_match_idom_walk(seed):
+    log_graph = random_graph(seed)
+    mask = np.random.default_rng(seed).random(len(log_graph)) < 0.3
+    index = log_graph.dominator_index
+    nearest = index.nearest_dominators(mask)
+    counts = index.dominator_counts(mask)
+    for row in range(len(log_graph)):
+        flagged = [d for d in _chain(log_graph, row)[1:] if mask[d]]
+        assert nearest[row] == (flagged[0] if flagged else -1)
+        assert counts[row] == len(flagged)
+    assert (index.any_dominator(mask) == (nearest >= 0)).all()
+
+
+def test_statements_use_the_index():
+    log_graph = random_graph(0, 50)
+    for a in log_graph:
+        for b in log_graph:
+            assert a.dominates(b) == (a in [*b.dominators])
+            common = a.common_dominator(b)
+            ancestors = [a, *a.dominators]
+            expected = next((d for d in [b, *b.dominators] if d in ancestors), None)
+            assert common == expected
@@ -0,0 +1,165 @@
+import csv
+import os
+import stat
+import sys
+from pathlib import Path
+
+import pytest
+from ltid.toolkit.extraction_cache import ExtractionCache
+from ltid.toolkit.log_graph import LogGraph
+
+# one record per `log(NAME)` line, with the value of the constant NAME as the
+# template when a file of the model declares it, like the template factory
+_JAVA = """#!{python}
+import csv, re, sys
+from pathlib import Path
+
+environment = sys.argv[sys.argv.index("--environment") + 1]
+with open({log!r}, "a") as fp:
+    print(environment, file=fp)
+files = []
+for path in map(Path, environment.removeprefix("file:").split(";")):
+    files.extend(sorted(path.rglob("*.java")) if path.is_dir() else [path])
+constants = {{}}
+for file in files:
+    for name, value in re.findall(r'final String (\\w+) = "([^"]*)"', file.read_text()):
+        constants[name] = value
+writer = csv.writer(sys.stdout, quoting=csv.QUOTE_ALL)
+event_id = 0
+for file in files:
+    for line, text in enumerate(file.read_text().splitlines(), 1):
+        for name in re.findall(r"log\\((\\w+)\\)", text):
+            template = constants.get(name, "{{" + name + "}}")
+            writer.writerow([-1, event_id, file, "p", "c", "m", line, "INFO", template])
+            event_id += 1
+"""
+
+
+@pytest.fixture
+def extractions(tmp_path, monkeypatch) -> Path:
+    """a fake extractor on PATH, returns the file listing its environments"""
+    log = tmp_path / "environments"
+    script = tmp_path / "bin" / "java"
+    script.parent.mkdir()
+    script.write_text(_JAVA.format(python=sys.executable, log=str(log)))
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{script.parent}{os.pathsep}{os.environ['PATH']}")
+    return log
+
+
+def _write(root: Path, files: dict[str, str]) -> None:
+    for name, text in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+        # a new mtime even on coarse clocks
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def _templates(cache: ExtractionCache, root: Path) -> dict[str, list[str]]:
+    templates: dict[str, list[str]] = {}
+    for row in cache.extract(root):
+        templates.setdefault(Path(row[2]).name, []).append(row[-1])
+    return templates
+
+
+def _extracted(log: Path) -> list[set[str]]:
+    """names of the files in each environment extracted so far"""
+    environments = log.read_text().splitlines()
+    log.unlink()
+    return [
+        {Path(path).name for path in environment.split(";")}
+        for environment in environments
+    ]
+
+
+@pytest.fixture
+def project(tmp_path) -> Path:
+    root = tmp_path / "project"
+    _write(
+        root,
+        {
+            "a/Keys.java": 'class Keys { static final String KEY = "a"; }',
+            "b/User.java": "class User { void m() {\nlog(KEY);\n} }",
+            "b/Other.java": 'class Other { final String OWN = "o";\nlog(OWN); }',
+        },
+    )
+    return root
+
+
+def test_changed_constant_extracts_its_users(extractions, project, tmp_path):
+    cache = ExtractionCache(tmp_path / "cache")
+    assert _templates(cache, project) == {"User.java": ["a"], "Other.java": ["o"]}
+    assert _extracted(extractions) == [{"project"}]
+
+    _write(project, {"a/Keys.java": 'class Keys { static final String KEY = "b"; }'})
+    assert _templates(cache, project) == {"User.java": ["b"], "Other.java": ["o"]}
+    assert _extracted(extractions) == [{"Keys.java", "User.java"}]
+
+
+def test_changed_file_is_extracted_with_its_constants(extractions, project, tmp_path):
+    cache = ExtractionCache(tmp_path / "cache")
+    _templates(cache, project)
+    _extracted(extractions)
+
+    _write(project, {"b/User.java": "class User { void m() {\nlog(KEY);log(KEY);\n} }"})
+    assert _templates(cache, project) == {
+        "User.java": ["a", "a"],
+        "Other.java": ["o"],
+    }
+    assert _extracted(extractions) == [{"Keys.java", "User.java"}]
+
+
+def test_new_constant_extracts_its_users(extractions, project, tmp_path):
+    cache = ExtractionCache(tmp_path / "cache")
+    _write(project, {"c/Lone.java": "class Lone {\nlog(LATER); }"})
+    assert _templates(cache, project)["Lone.java"] == ["{LATER}"]
+    _extracted(extractions)
+
+    _write(project, {"c/Later.java": 'class Later { final String LATER = "z"; }'})
+    assert _templates(cache, project)["Lone.java"] == ["z"]
+    assert _extracted(extractions) == [{"Later.java", "Lone.java"}]
+
+    (project / "c" / "Later.java").unlink()
+    assert _templates(cache, project)["Lone.java"] == ["{LATER}"]
+    assert _extracted(extractions) == [{"Lone.java"}]
+
+
+def test_verify(extractions, project, tmp_path):
+    cache = ExtractionCache(tmp_path / "cache")
+    _templates(cache, project)
+    _write(project, {"a/Keys.java": 'class Keys { static final String KEY = "b"; }'})
+    assert cache.verify(project) == []
+
+    # a stale row is found
+    rows = next((tmp_path / "cache" / "rows").glob("*.csv"))
+    with open(rows) as fp:
+        stale = [[*row[:-1], "stale"] for row in csv.reader(fp)]
+    with open(rows, "w") as fp:
+        csv.writer(fp, quoting=csv.QUOTE_ALL).writerows(stale)
+    assert len(cache.verify(project)) == 1
+
+
+def test_context_is_the_class_named(extractions, project, tmp_path):
+    cache = ExtractionCache(tmp_path / "cache")
+    _write(
+        project,
+        {
+            "c/Same.java": 'class Same { static final String KEY = "s"; }',
+            "c/Named.java": "class Named {\nlog(KEY); String k = Same.KEY; }",
+        },
+    )
+    _templates(cache, project)
+    _extracted(extractions)
+
+    _write(project, {"c/Named.java": "class Named {\nlog(KEY); Same.KEY; }"})
+    _templates(cache, project)
+    assert _extracted(extractions) == [{"Named.java", "Same.java"}]
+
+
+def test_directory_shards_see_the_constants_they_use(extractions, project):
+    log_graph = LogGraph.from_source(project, shards=2, shard_by="directory")
+    templates = sorted((s.file_name, s.template) for s in log_graph)
+    assert templates == [("Other.java", "o"), ("User.java", "a")]
+    assert sorted(map(sorted, _extracted(extractions))) == [["Keys.java", "b"], ["a"]]
@@ -0,0 +1,137 @@
+import csv
+import io
+import os
+import signal
+import stat
+import struct
+import time
+from pathlib import Path
+
+import pytest
+from ltid.toolkit.extractor import (
+    LTIDLogGraphExecutionError,
+    extract_log_statements,
+    read_binary_records,
+)
+from ltid.toolkit.log_graph import LogGraph
+
+# prints two records per environment, the second dominated by the first
+_JAVA = """#!/bin/sh
+echo $$ >> "{pids}"
+while [ $# -gt 0 ]; do
+    [ "$1" = --environment ] && environment="$2"
+    shift
+done
+case "$environment" in
+*fail*) sleep 0.5; exit 1 ;;
+*slow*) exec sleep 60 ;;
+esac
+printf '"-1","0","%s/A.java","p","A","m","1","INFO","first"\\n' "$environment"
+printf '"0","1","%s/A.java","p","A","m","2","INFO","second {{}}"\\n' "$environment"
+"""
+
+
+@pytest.fixture
+def java(tmp_path, monkeypatch) -> Path:
+    """a fake extractor on PATH, returns the file listing its process ids"""
+    pids = tmp_path / "pids"
+    script = tmp_path / "bin" / "java"
+    script.parent.mkdir()
+    script.write_text(_JAVA.format(pids=pids))
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{script.parent}{os.pathsep}{os.environ['PATH']}")
+    return pids
+
+
+def _running(pids: Path) -> list[int]:
+    running = []
+    for pid in map(int, pids.read_text().split()):
+        try:
+            with open(f"/proc/{pid}/stat") as fp:
+                if fp.read().split()[2] != "Z":
+                    running.append(pid)
+        except FileNotFoundError:
+            pass
+    return running
+
+
+def _project(root: Path, *modules: str) -> Path:
+    for module in modules:
+        sources = root / module / "src" / "main" / "java"
+        sources.mkdir(parents=True)
+        (root / module / "pom.xml").touch()
+        (sources / "A.java").write_text("class A {}")
+    return root
+
+
+def test_shards_have_unique_ids(java, tmp_path):
+    project = _project(tmp_path / "project", "a", "b", "c")
+    log_graph = LogGraph.from_source(project, shards=2)
+    assert len(log_graph) == 6
+    assert [*log_graph._event_ids] == [*range(6)]
+    # dominators stay within their shard
+    assert [*log_graph._idoms] == [-1, 0, -1, 2, -1, 4]
+
+
+class _Timeout(Exception):
+    pass
+
+
+def _raise_timeout(*_):
+    raise _Timeout()
+
+
+def test_timeout_kills_the_jvm(java, tmp_path):
+    project = _project(tmp_path / "slow", "a")
+    handler = signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, 0.5)
+    try:
+        with pytest.raises(_Timeout):
+            [*extract_log_statements(project)]
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, handler)
+    assert _running(java) == []
+
+
+def test_failed_shard_kills_the_others(java, tmp_path):
+    project = _project(tmp_path / "project", "a-fail", "b-slow")
+    start = time.perf_counter()
+    with pytest.raises(LTIDLogGraphExecutionError):
+        LogGraph.from_source(project, shards=2)
+    assert time.perf_counter() - start < 30
+    assert len(java.read_text().split()) == 2
+    assert _running(java) == []
+
+
+# the records of LogWithID.java, with a multi-byte and a multi-line template
+_CSV = (
+    '"-1","0","/A.java","LogWithID","LogWithID","m","12","INFO","first {Ida0}"\n'
+    '"0","1","/A.java","LogWithID","LogWithID","m","14","INFO","second {Idb0}"\n'
+    '"0","2","/A.java","LogWithID","LogWithID","m","16","INFO","thïrd\n{Idc0}"\n'
+)
+
+
+def _binary(records: list[list[str]]) -> bytes:
+    out = bytearray()
+    for idom, event, path, package, cls, method, line, level, template in records:
+        out += struct.pack(">iii", int(idom), int(event), int(line))
+        for string in (path, package, cls, method, level, template):
+            encoded = string.encode()
+            out += struct.pack(">i", len(encoded)) + encoded
+    return bytes(out)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 20])
+def test_binary_records_match_csv(chunk_size):
+    rows = [*csv.reader(io.StringIO(_CSV, newline=""))]
+    records = [*read_binary_records(io.BytesIO(_binary(rows)), chunk_size)]
+    assert records == [
+        [int(row[0]), int(row[1]), *row[2:6], int(row[6]), *row[7:]] for row in rows
+    ]
+
+
+def test_truncated_binary_records():
+    stream = io.BytesIO(_binary([*csv.reader(io.StringIO(_CSV, newline=""))])[:-1])
+    with pytest.raises(ValueError, match="truncated"):
+        [*read_binary_records(stream)]
@@ -0,0 +1,67 @@
+import random
+import re
+
+import pytest
+from ltid.toolkit.query import ID_HEURISTICS, IdClassifier
+
+
+def _is_id(variable: str, heuristics: list[str]) -> bool:
+    """the word-by-word loop the classifier replaces"""
+    for word in re.findall(r"[a-zA-Z][a-z]*", variable):
+        for heuristic in heuristics:
+            if word.lower().endswith(heuristic):
+                return True
+    return False
+
+
+def _names(seed: int) -> list[str]:
+    r = random.Random(seed)
+    pieces = ["id", "Id", "ID", "i", "d", "path", "Path", "host", "ip", "IP", "x"]
+    pieces += ["name", "url", "Uri", "address", "_", "0", "9", "é", "$", "a", "Z"]
+    return [
+        "".join(r.choice(pieces) for _ in range(r.randint(0, 5))) for _ in range(3000)
+    ]
+
+
+HEURISTICS = [
+    ID_HEURISTICS,
+    [],
+    ["id"],
+    ["d", "th"],
+    ["", "Id", "ip4"],
+    ["Id", "IP"],
+]
+
+
+@pytest.mark.parametrize("heuristics", HEURISTICS)
+@pytest.mark.parametrize("seed", range(3))
+def test_matches_word_loop(heuristics, seed):
+    names = _names(seed)
+    expected = [_is_id(name, heuristics) for name in names]
+    classifier = IdClassifier(heuristics, cache_size=64)
+    assert [classifier(name) for name in names] == expected
+    # again, partly from the cache
+    assert [classifier(name) for name in names] == expected
+    assert classifier.classify(names).tolist() == expected
+    assert IdClassifier(heuristics).classify(names).tolist() == expected
+
+
+def test_known_names():
+    classifier = IdClassifier()
+    assert classifier("userId")
+    assert classifier("host_name")
+    assert classifier("ipAddress")
+    assert not classifier("idle")
+    # words are split before capitals, "ID" is two words
+    assert not classifier("blockID")
+    assert not classifier("width")
+    assert not classifier("")
+    assert classifier.classify([]).tolist() == []
+
+
+def test_cache_is_bounded():
+    classifier = IdClassifier(cache_size=2)
+    for name in ["a", "b", "c", "c"]:
+        classifier(name)
+    info = classifier._cached.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 3, 2)
@@ -0,0 +1,139 @@
+import pickle
+import struct
+from pathlib import Path
+
+import pytest
+from ltid.toolkit.log_graph import LogGraph, LogGraphFormatError
+
+# a small dominator forest, out of event id order:
+#   0 -> 1 -> 3, 0 -> 2, and 7 alone
+_RECORDS = [
+    ["0", "2", "/src/B.java", "p", "p.B", "m", "3", "warn", "two"],
+    ["1", "3", "/src/A.java", "p", "p.A", "m", "4", "debug", "three {x}"],
+    ["-1", "0", "/src/A.java", "p", "p.A", "m", "1", "info", "zero {a} {b}"],
+    ["0", "1", "/src/A.java", "p", "p.A", "m", "2", "info", "one"],
+    ["-1", "7", "/src/C.java", "p", "p.C", "n", "5", "error", "seven"],
+]
+
+
+def _ids(statements) -> list[int]:
+    return sorted(statement.event_id for statement in statements)
+
+
+def test_statements():
+    log_graph = LogGraph.from_records(_RECORDS)
+    assert len(log_graph) == 5
+    assert [statement.event_id for statement in log_graph] == [0, 1, 2, 3, 7]
+    statement = log_graph.get_statement(3)
+    assert statement.loc == ("A.java", 4)
+    assert statement.level == "DEBUG"
+    assert statement.template == "three {x}"
+    assert statement.variables == ["x"]
+    assert log_graph.get_statement(0).variables == ["a", "b"]
+    with pytest.raises(KeyError):
+        log_graph.get_statement(4)
+
+
+def test_dominator_tree():
+    log_graph = LogGraph.from_records(_RECORDS)
+    statement = log_graph.get_statement
+    assert statement(3).idom == statement(1)
+    assert statement(0).idom is None
+    assert _ids(statement(0).children) == [1, 2]
+    assert _ids(statement(3).children) == []
+    assert [d.event_id for d in statement(3).dominators] == [1, 0]
+    assert _ids(log_graph.roots) == [0, 7]
+    assert _ids(log_graph.leafs) == [2, 3, 7]
+    paths = sorted([s.event_id for s in path] for path in log_graph.paths)
+    assert paths == [[0, 1, 3], [0, 2], [7]]
+
+
+def test_unknown_dominators_are_roots():
+    records = [["9", "1", "/A.java", "p", "p.A", "m", "1", "info", "one"]]
+    log_graph = LogGraph.from_records(records)
+    assert log_graph.get_statement(1).idom is None
+    assert _ids(log_graph.roots) == [1]
+
+
+def test_pickle():
+    log_graph = pickle.loads(pickle.dumps(LogGraph.from_records(_RECORDS)))
+    assert [(s.event_id, s.loc, s.level, s.template) for s in log_graph] == [
+        (s.event_id, s.loc, s.level, s.template)
+        for s in LogGraph.from_records(_RECORDS)
+    ]
+    assert _ids(log_graph.get_statement(0).children) == [1, 2]
+
+
+def test_matches_networkx_construction():
+    """the graph `from_source` built on networkx before the arrays"""
+    nx = pytest.importorskip("networkx")
+    graph = nx.DiGraph()
+    for idom_id, event_id, path, _, _, _, line, level, template in _RECORDS:
+        graph.add_node(
+            int(event_id),
+            file_name=Path(path).name,
+            line_number=int(line),
+            level=level.upper(),
+            template=template,
+        )
+        if int(idom_id) >= 0:
+            graph.add_edge(int(event_id), int(idom_id))
+
+    log_graph = LogGraph.from_records(_RECORDS)
+    assert _ids(log_graph) == sorted(graph.nodes)
+    for statement in log_graph:
+        node = graph.nodes[statement.event_id]
+        assert statement.loc == (node["file_name"], node["line_number"])
+        assert (statement.level, statement.template) == (
+            node["level"],
+            node["template"],
+        )
+        idoms = [] if statement.idom is None else [statement.idom.event_id]
+        assert idoms == [*graph.successors(statement.event_id)]
+        assert _ids(statement.children) == sorted(
+            graph.predecessors(statement.event_id)
+        )
+    assert _ids(log_graph.roots) == sorted(
+        node for node, degree in graph.out_degree() if degree == 0
+    )
+    assert _ids(log_graph.leafs) == sorted(
+        node for node, degree in graph.in_degree() if degree == 0
+    )
+
+
+def _rows(log_graph: LogGraph) -> list[tuple]:
+    return [
+        (s.event_id, s.idom and s.idom.event_id, s.loc, s.level, s.template)
+        for s in log_graph
+    ]
+
+
+def test_save_and_load(tmp_path):
+    log_graph = LogGraph.from_records(_RECORDS)
+    log_graph.save(tmp_path / "graph.bin")
+    loaded = LogGraph.load(tmp_path / "graph.bin")
+    assert _rows(loaded) == _rows(log_graph)
+    assert _ids(loaded.get_statement(0).children) == [1, 2]
+    assert sorted(map(len, loaded.paths)) == [1, 2, 3]
+
+    LogGraph.from_records([]).save(tmp_path / "empty.bin")
+    assert len(LogGraph.load(tmp_path / "empty.bin")) == 0
+
+
+@pytest.mark.parametrize(
+    "corrupt, message",
+    [
+        (lambda data: b"NOTAGRAF" + data[8:], "not a log graph"),
+        (lambda data: data[:8] + struct.pack("<I", 99) + data[12:], "version 99"),
+        (lambda data: data[:-1], "header describes"),
+        (lambda data: data + bytes(8), "header describes"),
+        (lambda data: data[:20], "truncated"),
+        (lambda data: b"", "truncated"),
+    ],
+)
+def test_load_rejects_bad_files(tmp_path, corrupt, message):
+    path = tmp_path / "graph.bin"
+    LogGraph.from_records(_RECORDS).save(path)
+    path.write_bytes(corrupt(path.read_bytes()))
+    with pytest.raises(LogGraphFormatError, match=message):
+        LogGraph.load(path)
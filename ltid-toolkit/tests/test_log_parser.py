@@ -0,0 +1,82 @@
+import random
+import re
+from datetime import datetime
+
+import numpy as np
+import pytest
+from ltid.toolkit.log_parser import LocationIndex, parse_log, parse_log_chunks
+
+_LOG_FORMAT_HADOOP = re.compile(
+    r"^(?P<timestamp>[\d -:,]+) .*? \((?P<file_name>\w+.java):.+?\((?P<line_number>\d+)\)\) .*?$",  # noqa: E501
+    flags=re.MULTILINE,
+)
+_LOCATIONS = {("A.java", 10): 0, ("A.java", 12): 1, ("B.java", 10): 2, ("C.java", 7): 3}
+
+
+def _parse(locations, file) -> list[tuple[int, int]]:
+    """the per-line loop compare_patterns used before, in (ns, event id)"""
+    parsed = []
+    with file.open() as f:
+        for log in f:
+            if not (match := re.match(_LOG_FORMAT_HADOOP, log)):
+                continue
+            loc = (match.group("file_name"), int(match.group("line_number")))
+            if loc not in locations:
+                continue
+            try:
+                dt = datetime.strptime(match.group("timestamp"), "%Y-%m-%d %H:%M:%S,%f")
+            except ValueError:
+                continue
+            parsed.append((int(np.datetime64(dt, "ns").view(np.int64)), locations[loc]))
+    return parsed
+
+
+def _lines(seed: int, n: int = 400) -> list[str]:
+    r = random.Random(seed)
+    files = ["A.java", "B.java", "C.java", "D.java"]
+    lines = []
+    for i in range(n):
+        kind = r.random()
+        second, millis = divmod(i * 37 + r.randrange(5), 1000)
+        timestamp = f"2023-01-02 03:{second // 60 % 60:02}:{second % 60:02},{millis:03}"
+        if kind < 0.05:
+            timestamp = "2023-13-45 03:04:05,678"
+        location = f"({r.choice(files)}:method{i}({r.choice([7, 10, 12, 99])}))"
+        if kind < 0.1:
+            lines.append(f"\tat org.example.Thing.call{location}")
+        elif kind < 0.15:
+            lines.append("")
+        else:
+            lines.append(f"{timestamp} INFO  [main] org.example.A {location} - m {i}")
+    return lines
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("chunk_size", [1, 100, 1 << 26])
+def test_matches_the_line_loop(tmp_path, seed, chunk_size):
+    file = tmp_path / "A-output.txt"
+    file.write_text("\n".join(_lines(seed)))
+    expected = _parse(_LOCATIONS, file)
+    assert expected
+    index = LocationIndex(_LOCATIONS)
+    chunks = [*parse_log_chunks(file, index, chunk_size=chunk_size)]
+    timestamps = np.concatenate([timestamps for timestamps, _ in chunks])
+    event_ids = np.concatenate([event_ids for _, event_ids in chunks])
+    assert [*zip(timestamps.tolist(), event_ids.tolist())] == expected
+    timestamps, event_ids = parse_log(file, index)
+    assert [*zip(timestamps.tolist(), event_ids.tolist())] == expected
+
+
+def test_lookup():
+    index = LocationIndex(_LOCATIONS)
+    names = [b"A.java", b"B.java", b"D.java", b"A.java", b"C.java"]
+    lines = np.array([12, 10, 10, 11, 7], dtype=np.int64)
+    assert index.lookup(names, lines).tolist() == [1, 2, -1, -1, 3]
+    assert LocationIndex({}).lookup(names, lines).tolist() == [-1] * 5
+
+
+def test_no_events(tmp_path):
+    file = tmp_path / "A-output.txt"
+    file.write_text("nothing here\n")
+    timestamps, event_ids = parse_log(file, LocationIndex(_LOCATIONS))
+    assert len(timestamps) == len(event_ids) == 0
@@ -0,0 +1,66 @@
+import random
+
+import numpy as np
+import pytest
+from ltid.toolkit.log_graph import LogGraph
+
+
+def random_graph(seed: int, n: int = 300) -> LogGraph:
+    """a random dominator forest, event ids shuffled against the tree order"""
+    r = random.Random(seed)
+    event_ids = r.sample(range(4 * n), n)
+    records = []
+    for i, event_id in enumerate(event_ids):
+        idom = -1 if i == 0 or r.random() < 0.05 else event_ids[r.randrange(i)]
+        records.append([idom, event_id, "/A.java", "p", "A", "m", i, "INFO", "t"])
+    r.shuffle(records)
+    return LogGraph.from_records(records)
+
+
+def _paths(log_graph: LogGraph) -> list[list[int]]:
+    """root-to-leaf event ids, depth-first through the children"""
+
+    def walk(statement, path):
+        path = [*path, statement.event_id]
+        if not statement.children:
+            yield path
+        for child in statement.children:
+            yield from walk(child, path)
+
+    return [path for root in log_graph.roots for path in walk(root, [])]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_paths_match_recursive_walk(seed):
+    log_graph = random_graph(seed)
+    expected = _paths(log_graph)
+    paths = [*log_graph.paths]
+    assert [[s.event_id for s in path] for path in paths] == expected
+    for path, ids in zip(paths, expected):
+        assert len(path) == len(ids)
+        assert [s.event_id for s in reversed(path)] == ids[::-1]
+        assert [path[i].event_id for i in range(-len(ids), len(ids))] == ids * 2
+        assert [s.event_id for s in path[1:-1]] == ids[1:-1]
+        assert path.last.event_id == ids[-1]
+        parent = [] if path.parent is None else [s.event_id for s in path.parent]
+        assert parent == ids[:-1]
+        with pytest.raises(IndexError):
+            path[len(ids)]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_counts_match_enumeration(seed):
+    log_graph = random_graph(seed)
+    paths = _paths(log_graph)
+    lengths = [len(path) for path in paths]
+    assert log_graph.path_count() == len(paths)
+    histogram = log_graph.path_length_histogram()
+    assert histogram.tolist() == np.bincount(lengths, minlength=1).tolist()
+    for length in range(max(lengths) + 2):
+        expected = sum(1 for n in lengths if n > length)
+        assert log_graph.count_paths_longer_than(length) == expected
+    through = {s.event_id: 0 for s in log_graph}
+    for path in paths:
+        for event_id in path:
+            through[event_id] += 1
+    assert log_graph.path_counts.tolist() == [through[s.event_id] for s in log_graph]
@@ -0,0 +1,234 @@
+import random
+
+import pytest
+from ltid.toolkit.query import extract_log, is_logging_call, is_logging_statement
+from lxml import etree
+
+SRC = "http://www.srcML.org/srcML/src"
+
+
+def call(xml: str):
+    return etree.fromstring(f'<call xmlns="{SRC}">{xml}</call>')
+
+
+NAME = "<name><name>info</name></name>"
+ARGUMENTS = "<argument_list><argument><expr/></argument></argument_list>"
+
+ACCEPTED = [
+    "<name><name>info</name></name>"
+    "<argument_list>(<argument><expr/></argument>)</argument_list>",
+    "<name><name>LOG</name><operator>.</operator><name>debug</name></name>"
+    "<argument_list>(<argument><literal>a</literal></argument>,"
+    " <argument><name>b</name></argument>)</argument_list>",
+    "<name><name>myLogger</name><operator> . </operator><name>a.log</name>"
+    "<operator>.</operator><name> trace </name></name>"
+    '<argument_list><argument><expr any="x"><name/></expr></argument></argument_list>',
+    "\n<name> <name>log</name>\t<operator>.</operator><name>error</name></name>\n"
+    "<argument_list><argument> <expr/> </argument></argument_list>",
+    "<name><name>log</name><!-- c --><operator>.</operator><name>fatal</name></name>"
+    "<argument_list><argument><expr/><!-- c --></argument></argument_list>",
+    "<name><name>warning</name></name>"
+    "<argument_list>(<argument><x:e xmlns:x='urn:x'/></argument>)</argument_list>",
+]
+
+REJECTED = [
+    # the level is a name element, even without a chain
+    "<name>info</name><argument_list><argument><expr/></argument></argument_list>",
+    "<name>warn</name><argument_list><argument><expr/></argument></argument_list>",
+    "<name>Info</name><argument_list><argument><expr/></argument></argument_list>",
+    # the name chain
+    "<name><name>foo</name><operator>.</operator><name>info</name></name>"
+    "<argument_list><argument><expr/></argument></argument_list>",
+    "<name><name>lo\ng</name><operator>.</operator><name>info</name></name>"
+    "<argument_list><argument><expr/></argument></argument_list>",
+    "<name><name>log</name><operator>-&gt;</operator><name>info</name></name>"
+    "<argument_list><argument><expr/></argument></argument_list>",
+    "<name><name>log</name><name>info</name></name>"
+    "<argument_list><argument><expr/></argument></argument_list>",
+    "<name><name>log</name><operator>.</operator></name>"
+    "<argument_list><argument><expr/></argument></argument_list>",
+    "<name><name>log</name>x<operator>.</operator><name>info</name></name>"
+    "<argument_list><argument><expr/></argument></argument_list>",
+    "<name><name><name>log</name></name><operator>.</operator><name>info</name></name>"
+    "<argument_list><argument><expr/></argument></argument_list>",
+    '<name><name pos="1">log</name><operator>.</operator><name>info</name></name>'
+    "<argument_list><argument><expr/></argument></argument_list>",
+    # arguments
+    f"{NAME}<argument_list>()</argument_list>",
+    f"{NAME}<argument_list><argument/></argument_list>",
+    f"{NAME}<argument_list><argument><expr/><expr/></argument></argument_list>",
+    f"{NAME}<argument_list><argument>x<expr/></argument></argument_list>",
+    f"{NAME}<argument_list><argument><expr/></argument><name/></argument_list>",
+    f'{NAME}<argument_list type="generic"><argument><expr/></argument></argument_list>',
+    # the call
+    NAME,
+    ARGUMENTS + NAME,
+    f"{NAME}x{ARGUMENTS}",
+    f"{NAME}{ARGUMENTS}<comment/>",
+]
+
+
+@pytest.mark.parametrize("xml", ACCEPTED)
+def test_accepts(xml):
+    assert is_logging_statement(call(xml))
+    assert is_logging_call(call(xml))
+
+
+@pytest.mark.parametrize("xml", REJECTED)
+def test_rejects(xml):
+    assert not is_logging_statement(call(xml))
+    assert not is_logging_call(call(xml))
+
+
+def test_rejects_attributes_and_other_elements():
+    element = call(ACCEPTED[0])
+    element.set("pos", "1")
+    assert not is_logging_statement(element)
+    assert not is_logging_call(element)
+    element = etree.fromstring(f'<expr xmlns="{SRC}">{ACCEPTED[0]}</expr>')
+    assert not is_logging_statement(element)
+    assert not is_logging_call(element)
+
+
+def test_extract_log():
+    unit = etree.fromstring(
+        f'<unit xmlns="{SRC}"><expr><call>{ACCEPTED[1]}</call></expr>'
+        f"<expr><call>{REJECTED[0]}</call></expr></unit>"
+    )
+    assert len([*extract_log(unit)]) == 1
+    assert len([*extract_log(unit, is_logging_statement)]) == 1
+
+
+_NAMES = [
+    "LOG",
+    "log",
+    "Logger",
+    "foo",
+    "myLog",
+    "LoG",
+    "l\nog",
+    "lo g",
+    "x",
+    "info",
+    "debug",
+    " info ",
+    "warning",
+    "warn",
+    "trace",
+    "error\n",
+    "fatal",
+    "",
+]
+_OPERATORS = [".", " . ", "->", "::"]
+_SPACES = ["", " ", "\n", "\t ", "x", " . "]
+
+
+class _Trees:
+    """random call trees, most of them close to a logging call"""
+
+    def __init__(self, seed: int):
+        self._random = random.Random(seed)
+
+    def _chance(self, p: float) -> bool:
+        return self._random.random() < p
+
+    def _space(self, p: float) -> str | None:
+        return self._random.choice(_SPACES) if self._chance(p) else None
+
+    def _element(self, tag: str, namespace: str | None = SRC):
+        return etree.Element(f"{{{namespace}}}{tag}" if namespace else tag)
+
+    def _part(self, tag: str, text: str):
+        if self._chance(0.05):
+            tag = self._random.choice(["name", "operator", "expr"])
+        element = self._element(tag, SRC if self._chance(0.97) else None)
+        element.text = text
+        if self._chance(0.05):
+            element.set("pos", "1")
+        if self._chance(0.05):
+            element.append(self._element("name"))
+        if self._chance(0.05):
+            comment = etree.Comment("c")
+            comment.tail = self._random.choice(["", "x", " "])
+            element.append(comment)
+        return element
+
+    def _name(self):
+        parts = []
+        for _ in range(self._random.choice([0, 0, 1, 1, 2, 3])):
+            parts.append(self._part("name", self._random.choice(_NAMES)))
+            parts.append(self._part("operator", self._random.choice(_OPERATORS)))
+        parts.append(self._part("name", self._random.choice(_NAMES)))
+        if self._chance(0.05):
+            parts.pop(self._random.randrange(len(parts)))
+        if self._chance(0.05):
+            parts.append(self._part("name", "x"))
+        name = self._element("name")
+        name.text = self._space(0.2)
+        for part in parts:
+            part.tail = self._space(0.2)
+            name.append(part)
+        if self._chance(0.03):
+            name.set("x", "y")
+        return name
+
+    def _arguments(self):
+        arguments = self._element("argument_list")
+        if self._chance(0.03):
+            arguments.set("type", "generic")
+        arguments.text = self._random.choice(["(", "", "( "])
+        for _ in range(self._random.choice([0, 1, 1, 2, 3])):
+            argument = self._element("argument" if self._chance(0.95) else "expr")
+            if self._chance(0.03):
+                argument.set("x", "y")
+            argument.text = self._space(0.2)
+            for _ in range(self._random.choice([1, 1, 1, 0, 2])):
+                namespace = self._random.choice([SRC, SRC, None, "urn:x"])
+                inner = self._element(
+                    self._random.choice(["expr", "literal", "name"]), namespace
+                )
+                inner.text = "v"
+                if self._chance(0.2):
+                    inner.set("any", "x")
+                inner.append(self._element("name"))
+                inner.tail = self._space(0.2)
+                argument.append(inner)
+            if self._chance(0.05):
+                argument.append(etree.Comment("c"))
+            argument.tail = self._random.choice([",", ", ", None])
+            arguments.append(argument)
+        if self._chance(0.05):
+            arguments.append(self._element("name"))
+        if self._chance(0.05):
+            arguments.append(etree.Comment("x"))
+        return arguments
+
+    def __call__(self):
+        root = self._element("call" if self._chance(0.95) else "expr")
+        if self._chance(0.03):
+            root.set("a", "b")
+        root.text = self._space(0.2)
+        children = [self._name(), self._arguments()]
+        if self._chance(0.03):
+            children.reverse()
+        if self._chance(0.03):
+            children.append(self._element("comment"))
+        if self._chance(0.03):
+            children.pop()
+        for child in children:
+            child.tail = self._space(0.15)
+            root.append(child)
+        return root
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_matches_schema_on_random_trees(seed):
+    trees = _Trees(seed)
+    accepted = 0
+    for _ in range(5000):
+        tree = trees()
+        expected = bool(is_logging_statement(tree))
+        assert is_logging_call(tree) == expected, etree.tostring(tree)
+        accepted += expected
+    # both outcomes are exercised
+    assert 0 < accepted < 5000
@@ -0,0 +1,103 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from ltid.toolkit import runner
+from ltid.toolkit.runner import ExperimentRunner, Stage
+
+GIB = 2**30
+
+
+@pytest.mark.parametrize(
+    "available, admitted",
+    [(10 * GIB, 1), (17 * GIB, 2), (40 * GIB, 4), (None, 4)],
+)
+def test_admit_reserves_memory(monkeypatch, available, admitted):
+    monkeypatch.setattr(runner, "available_memory", lambda: available)
+    monkeypatch.setattr(ExperimentRunner, "_allocated", lambda self, stage: 0)
+    with ExperimentRunner(cpu_workers=4, memory={Stage.CPU: 8 * GIB}) as jobs:
+        for i in range(4):
+            jobs.submit(str, Path(f"project{i}"))
+        jobs._admit()
+        assert len(jobs._running) == admitted
+        # admitted jobs stay reserved in later passes
+        jobs._admit()
+        assert len(jobs._running) == admitted
+        assert [result.ok for result in jobs.results()] == [True] * 4
+
+
+def test_admit_reserves_memory_across_stages(monkeypatch):
+    monkeypatch.setattr(runner, "available_memory", lambda: 12 * GIB)
+    monkeypatch.setattr(ExperimentRunner, "_allocated", lambda self, stage: 0)
+    memory = {Stage.CPU: 4 * GIB, Stage.JVM: 6 * GIB}
+    with ExperimentRunner(cpu_workers=4, jvm_workers=4, memory=memory) as jobs:
+        jobs.submit(str, Path("jvm"), stage=Stage.JVM)
+        jobs.submit(str, Path("cpu0"))
+        jobs.submit(str, Path("cpu1"))
+        jobs._admit()
+        assert sorted(job.project.name for job, _ in jobs._running.values()) == [
+            "cpu0",
+            "jvm",
+        ]
+        [*jobs.results()]
+
+
+@pytest.mark.parametrize(
+    "available, allocated, admitted",
+    [(2 * GIB, 8 * GIB, 1), (10 * GIB, 8 * GIB, 2), (15 * GIB, 3 * GIB, 2)],
+)
+def test_admit_counts_allocated_memory_once(
+    monkeypatch, available, allocated, admitted
+):
+    monkeypatch.setattr(runner, "available_memory", lambda: 10 * GIB)
+    monkeypatch.setattr(ExperimentRunner, "_allocated", lambda self, stage: 0)
+    with ExperimentRunner(cpu_workers=4, memory={Stage.CPU: 8 * GIB}) as jobs:
+        for i in range(4):
+            jobs.submit(str, Path(f"project{i}"))
+        jobs._admit()
+        assert len(jobs._running) == 1
+        # the running job has allocated memory, available memory shrank
+        monkeypatch.setattr(runner, "available_memory", lambda: available)
+        monkeypatch.setattr(
+            ExperimentRunner,
+            "_allocated",
+            lambda self, stage: allocated if stage is Stage.CPU else 0,
+        )
+        jobs._admit()
+        assert len(jobs._running) == admitted
+        [*jobs.results()]
+
+
+def test_allocated_measures_workers():
+    with ExperimentRunner(cpu_workers=1) as jobs:
+        assert jobs._allocated(Stage.CPU) == 0
+        jobs.submit(str, Path("project"))
+        [*jobs.results()]
+        assert jobs._allocated(Stage.CPU) > 0
+    assert runner.process_memory(2**22 + 1) == 0
+
+
+def _sleep(project: Path, seconds: float) -> str:
+    time.sleep(seconds)
+    return project.name
+
+
+@pytest.mark.parametrize("thread", [False, True])
+def test_run_times_out(thread):
+    results = {}
+
+    def run():
+        for seconds in (0.0, 2.0):
+            job = runner._Job(_sleep, Path("p"), (seconds,), Stage.CPU, 0.2)
+            results[seconds] = runner._run(job)
+
+    if thread:
+        worker = threading.Thread(target=run)
+        worker.start()
+        worker.join()
+    else:
+        run()
+    assert results[0.0].value == "p"
+    assert results[2.0].error == "timed out after 0.2s"
+    assert results[2.0].elapsed < 1.0
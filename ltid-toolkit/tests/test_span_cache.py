@@ -0,0 +1,36 @@
+from ltid.toolkit import span_cache
+from ltid.toolkit.span_cache import SpanCache
+
+
+class _Parse:
+    def __init__(self):
+        self.parsed: list[str] = []
+
+    def __call__(self, contents):
+        self.parsed.extend(contents)
+        return [[len(content) % 2 == 0] for content in contents]
+
+
+def test_classifications_are_shared(tmp_path):
+    parse = _Parse()
+    with SpanCache(tmp_path / "spans.db") as cache:
+        assert cache.classify(["log(a)", " log(a)\n", "log(ab)"], parse) == [
+            [True],
+            [True],
+            [False],
+        ]
+    assert parse.parsed == ["log(a)", "log(ab)"]
+    with SpanCache(tmp_path / "spans.db") as cache:
+        cache.classify(["log(ab)"], parse)
+        assert cache.total_stats() == span_cache.CacheStats(hits=2, misses=2)
+    assert parse.parsed == ["log(a)", "log(ab)"]
+
+
+def test_detector_changes_invalidate(tmp_path, monkeypatch):
+    parse = _Parse()
+    with SpanCache(tmp_path / "spans.db") as cache:
+        cache.classify(["log(a)"], parse)
+    monkeypatch.setattr(span_cache, "DETECTOR_VERSION", 2)
+    with SpanCache(tmp_path / "spans.db") as cache:
+        cache.classify(["log(a)"], parse)
+    assert parse.parsed == ["log(a)", "log(a)"]
@@ -0,0 +1,55 @@
+import logging
+import random
+
+import pytest
+from ltid.toolkit import template_matcher
+from ltid.toolkit.template_matcher import TemplateMatcher
+
+_WORDS = ["Starting", "Start", "to", "block", "node", "id", "a b", "done.", "\\n"]
+
+
+def _templates(seed: int) -> dict[int, str]:
+    r = random.Random(seed)
+    templates = {}
+    for event_id in range(300):
+        pieces = [r.choice(_WORDS) for _ in range(r.randint(0, 4))]
+        for _ in range(r.randint(0, 3)):
+            pieces.insert(r.randint(0, len(pieces)), "{}")
+        templates[event_id] = r.choice([" ", ""]).join(pieces)
+    return templates
+
+
+def _messages(seed: int, templates: dict[int, str]) -> list[str]:
+    r = random.Random(seed)
+    messages = []
+    for _ in range(1000):
+        message = templates[r.randrange(len(templates))].replace("\\n", "\n")
+        message = message.replace("{}", r.choice(["", "7", " x ", "Start"]))
+        messages.append(r.choice(["", " ", "\n"]) + message + r.choice(["", " "]))
+    return messages
+
+
+def _first_match(matcher: TemplateMatcher, message: str):
+    """the match of the best ranked template, trying every one"""
+    for rank, pattern in enumerate(matcher._patterns):
+        if match := pattern.match(message):
+            return matcher._event_ids[rank], [*match.groups()]
+    return None
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_regex_index_finds_the_best_template(seed):
+    templates = _templates(seed)
+    matcher = TemplateMatcher(templates, "regex")
+    messages = _messages(seed, templates)
+    found = [matcher.match(message) for message in messages]
+    assert found == [_first_match(matcher, message) for message in messages]
+    assert found.count(None) < len(found)
+
+
+def test_regex_fallback_warns(monkeypatch, caplog):
+    monkeypatch.setattr(template_matcher, "hyperscan", None)
+    with caplog.at_level(logging.WARNING, template_matcher.__name__):
+        assert TemplateMatcher({0: "a {}"}).backend == "regex"
+        TemplateMatcher({0: "a {}"}, "regex")
+    assert len(caplog.records) == 1
@@ -0,0 +1,139 @@
+import itertools
+import json
+from pathlib import Path
+
+import pytest
+from lxml import etree
+
+pygit2 = pytest.importorskip("pygit2")
+
+try:
+    from pylibsrcml import srcml  # noqa: F401
+
+    SRCML = True
+except Exception:  # not installed, or installed without the srcML library
+    SRCML = False
+
+
+def _repository(path: Path, commits: int) -> Path:
+    """a history changing one java file without logs, one line per commit"""
+    repository = pygit2.init_repository(str(path))
+    parents = []
+    lines = []
+    for i in range(commits):
+        lines.append(f"    int x{i} = {i};")
+        (path / "A.java").write_text("class A {\n" + "\n".join(lines) + "\n}\n")
+        repository.index.add("A.java")
+        repository.index.write()
+        tree = repository.index.write_tree()
+        signature = pygit2.Signature("a", "a@example.com", 1_000_000 + i, 0)
+        commit = repository.create_commit(
+            "HEAD", signature, signature, f"commit {i}", tree, parents
+        )
+        parents = [commit]
+    return path
+
+
+def test_iter_checkpoint_cuts_a_partial_line(track, tmp_path):
+    checkpoint = tmp_path / "checkpoint.jsonl"
+    rows = [track.DiffTrack("a", 1, numnew=2), track.DiffTrack("b", 2)]
+    complete = "".join(
+        json.dumps({"commit": row.commit, "timestamp": row.timestamp}) + "\n"
+        for row in rows
+    )
+    checkpoint.write_text(complete + '{"commit": "c", "times')
+    assert [row.commit for row in track.iter_checkpoint(checkpoint)] == ["a", "b"]
+    assert checkpoint.read_text() == complete
+    assert track.read_checkpoint(tmp_path / "missing.jsonl") == []
+
+
+def test_iter_checkpoint_stops_at_a_bad_line(track, tmp_path):
+    checkpoint = tmp_path / "checkpoint.jsonl"
+    checkpoint.write_text(
+        '{"commit": "a", "timestamp": 1}\n'
+        '{"commit": "b", "unknown": 1}\n'
+        '{"commit": "c", "timestamp": 3}\n'
+    )
+    assert [row.commit for row in track.read_checkpoint(checkpoint)] == ["a"]
+    assert checkpoint.read_text() == '{"commit": "a", "timestamp": 1}\n'
+
+
+@pytest.mark.parametrize("stop", [0, 1, 3, 7])
+def test_resume_matches_an_uninterrupted_run(track, tmp_path, stop):
+    repository = _repository(tmp_path / "repository", 7)
+    expected = [*track.track_history(repository, workers=2, chunk_size=2)]
+    assert len(expected) == 7
+
+    checkpoint = tmp_path / "checkpoint.jsonl"
+    history = track.track_history(
+        repository, workers=2, checkpoint=checkpoint, chunk_size=2
+    )
+    assert [*itertools.islice(history, stop)] == expected[:stop]
+    history.close()
+    # killed while writing the next row
+    with open(checkpoint, "a") as fp:
+        fp.write('{"commit": "')
+
+    resumed = [
+        *track.track_history(repository, workers=2, checkpoint=checkpoint, chunk_size=2)
+    ]
+    assert resumed == expected
+    assert track.read_checkpoint(checkpoint) == expected
+
+
+def _call(argument: str) -> str:
+    return (
+        "<expr_stmt><expr><call><name><name>log</name><operator>.</operator>"
+        "<name>info</name></name><argument_list>(<argument><expr>"
+        f"<name>{argument}</name></expr></argument>)</argument_list></call></expr>"
+        "</expr_stmt>"
+    )
+
+
+class _ArchiveParser:
+    """the units of one srcML archive, as `SourceParser.parsestrings` returns"""
+
+    def __init__(self, units: list[str]):
+        self._units = units
+
+    def parsestrings(self, codes):
+        assert len(codes) == len(self._units)
+        root = etree.fromstring(
+            '<unit xmlns="http://www.srcML.org/srcML/src">'
+            + "".join(f"<unit>{unit}</unit>" for unit in self._units)
+            + "</unit>"
+        )
+        return root.findall("{*}unit")
+
+
+def test_ids_are_searched_in_the_unit_of_each_span(track):
+    units = [
+        _call("message"),
+        "<decl><name>userId</name></decl>",
+        _call("message") + _call("hostName"),
+        "",
+    ]
+    tracker = track.DiffTracker(None, _ArchiveParser(units))
+    assert tracker.parselogs(["a", "b", "c", "d"]) == [[False], [], [True, True], []]
+
+
+@pytest.mark.skipif(not SRCML, reason="srcML is not installed")
+def test_parsestrings_keeps_one_unit_per_snippet(track):
+    parser = track.SourceParser("Java")
+    codes = [
+        'log.info("a {}", blockId);',
+        "",
+        "int x = 1;",
+        'LOG.debug("b " + name); log.error("c");',
+        'log.warn("d");',
+    ]
+    units = parser.parsestrings(codes)
+    assert len(units) == len(codes)
+    tracker = track.DiffTracker(None, parser)
+    for code, unit, logs in zip(codes, units, tracker.parselogs(codes)):
+        alone = parser.parsestring(code)
+        assert "".join(unit.itertext()) == "".join(alone.itertext())
+        has_id = any(map(track.is_id, track._unit_names(alone)))
+        assert logs == [has_id for _ in track.extract_log(alone)]
+    assert len(parser.parsestrings(codes[:1])) == 1
+    assert parser.parsestrings([]) == []
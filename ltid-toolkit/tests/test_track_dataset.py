@@ -0,0 +1,99 @@
+import importlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def dataset(track):
+    return importlib.import_module("ltid.toolkit.track_dataset")
+
+
+def _rows(track, start: int, stop: int) -> list:
+    return [
+        track.DiffTrack(f"{i:040x}", 1_000_000 + i, 1, i, i % 2, 2 * i, 0, 3, i % 3)
+        for i in range(start, stop)
+    ]
+
+
+def _read(dataset, directory) -> list[tuple]:
+    frame = dataset.read_diff_tracks(directory)
+    epoch = pd.Timestamp(0, tz="UTC")
+    frame["timestamp"] = (frame["timestamp"] - epoch) // pd.Timedelta(seconds=1)
+    return [tuple(row) for row in frame.itertuples(index=False)]
+
+
+def _tuples(rows) -> list[tuple]:
+    return [
+        (
+            row.commit,
+            row.timestamp,
+            row.parents,
+            row.numold,
+            row.numoldid,
+            row.numnew,
+            row.numnewid,
+            row.numrev,
+            row.numrevid,
+        )
+        for row in rows
+    ]
+
+
+def test_appends_columns_over_several_flushes(track, dataset, tmp_path):
+    directory = tmp_path / "tracks"
+    rows = _rows(track, 0, 10)
+    with dataset.DiffTrackWriter(directory, batch_size=3) as writer:
+        writer.extend(rows[:7])
+        assert len(writer) == 7
+        # two batches are on disk, one row is buffered
+        assert len(dataset.read_diff_tracks(directory)) == 6
+        writer.extend(rows[7:])
+    assert _read(dataset, directory) == _tuples(rows)
+    assert (directory / "numnew.bin").stat().st_size == 10 * 4
+    assert (directory / "timestamp.bin").stat().st_size == 10 * 8
+    numnew = np.fromfile(directory / "numnew.bin", dtype="<i4")
+    assert numnew.tolist() == [row.numnew for row in rows]
+
+    with dataset.DiffTrackWriter(directory, batch_size=4, append=True) as writer:
+        writer.extend(_rows(track, 10, 19))
+    assert _read(dataset, directory) == _tuples(_rows(track, 0, 19))
+
+    with dataset.DiffTrackWriter(directory) as writer:
+        writer.extend(rows[:2])
+    assert _read(dataset, directory) == _tuples(rows[:2])
+
+
+def test_trailing_partial_record_is_ignored(track, dataset, tmp_path):
+    directory = tmp_path / "tracks"
+    with dataset.DiffTrackWriter(directory, batch_size=2) as writer:
+        writer.extend(_rows(track, 0, 4))
+    # a crash in the middle of the next flush, before the manifest
+    with open(directory / "commit.bin", "ab") as fp:
+        fp.write(f"{4:040x}".encode())
+    with open(directory / "timestamp.bin", "ab") as fp:
+        fp.write(bytes(3))
+    assert _read(dataset, directory) == _tuples(_rows(track, 0, 4))
+
+    with dataset.DiffTrackWriter(directory, batch_size=2, append=True) as writer:
+        writer.extend(_rows(track, 4, 7))
+    assert _read(dataset, directory) == _tuples(_rows(track, 0, 7))
+    assert (directory / "timestamp.bin").stat().st_size == 7 * 8
+
+
+def test_truncated_column_is_an_error(track, dataset, tmp_path):
+    directory = tmp_path / "tracks"
+    with dataset.DiffTrackWriter(directory) as writer:
+        writer.extend(_rows(track, 0, 3))
+    with open(directory / "numrev.bin", "r+b") as fp:
+        fp.truncate(2 * 4 + 1)
+    with pytest.raises(dataset.DiffTrackFormatError, match="numrev"):
+        dataset.read_diff_tracks(directory)
+
+
+def test_empty_directory(dataset, tmp_path):
+    assert len(dataset.read_diff_tracks(tmp_path)) == 0
+    with dataset.DiffTrackWriter(tmp_path / "tracks"):
+        pass
+    assert len(dataset.read_diff_tracks(tmp_path / "tracks")) == 0
@@ -0,0 +1,88 @@
+import random
+from collections import deque
+
+import pytest
+from ltid.toolkit.log_graph import LogGraph
+from ltid.toolkit.trie_matcher import TrieMatcher
+
+
+def _match(trie, path, d):
+    """compare_patterns.match, the beam matcher TrieMatcher replaces"""
+    k = 0
+    for s in path:
+        for n, trie, j in _beam(trie, d - k):
+            if n == s.event_id:
+                break
+        else:
+            return None
+        k = min(k, j)
+    return k
+
+
+def _beam(trie, d):
+    queue = deque((n, t, 0) for n, t in trie)
+    while queue:
+        n, t, k = queue.popleft()
+        yield n, t, k
+        if k >= d:
+            continue
+        for m, s in t:
+            queue.append((m, s, k + 1))
+
+
+def random_graph(r: random.Random, n: int = 80) -> LogGraph:
+    event_ids = r.sample(range(2 * n), n)
+    records = []
+    for i, event_id in enumerate(event_ids):
+        idom = -1 if i == 0 or r.random() < 0.1 else event_ids[r.randrange(i)]
+        records.append([idom, event_id, "/A.java", "p", "A", "m", i, "INFO", "t"])
+    return LogGraph.from_records(records)
+
+
+def random_trie(r: random.Random, log_graph: LogGraph, n: int = 80) -> list:
+    """a trie of noisy graph paths, as nested (event id, subtrie) lists"""
+    trie: list = []
+    paths = [[s.event_id for s in path] for path in log_graph.paths]
+    for _ in range(n):
+        sequence = []
+        for event_id in r.choice(paths)[: r.randrange(1, 8)]:
+            while r.random() < 0.3:
+                sequence.append(r.randrange(2 * len(log_graph)))
+            if r.random() < 0.9:
+                sequence.append(event_id)
+        node = trie
+        for event_id in sequence:
+            child = next((c for c in node if c[0] == event_id), None)
+            if child is None or r.random() < 0.1:
+                child = (event_id, [])
+                node.append(child)
+            node = child[1]
+    return trie
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("d", [0, 1, 2, 2.5, 10])
+def test_matches_beam_matcher(seed, d):
+    r = random.Random(seed)
+    log_graph = random_graph(r)
+    trie = random_trie(r, log_graph)
+    matcher = TrieMatcher(trie)
+    paths = [*log_graph.paths]
+    expected = [_match(trie, path, d) for path in paths]
+    assert any(k is not None for k in expected)
+    assert [matcher.match(path, d) for path in paths] == expected
+    matched = [*matcher.match_paths(log_graph, d)]
+    assert [(leaf, length) for leaf, length, _ in matched] == [
+        (path.last, len(path)) for path in paths
+    ]
+    assert [k for _, _, k in matched] == expected
+
+
+def test_len_and_empty_trie():
+    assert len(TrieMatcher([(1, [(2, []), (3, [(1, [])])]), (4, [])])) == 5
+    matcher = TrieMatcher([])
+    assert len(matcher) == 0
+    log_graph = random_graph(random.Random(0), 5)
+    assert [k for _, _, k in matcher.match_paths(log_graph, 3)] == [None] * len(
+        [*log_graph.paths]
+    )
@@ -0,0 +1,64 @@
+from datetime import timedelta
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+import pytest
+from ltid.toolkit.windows import sliding_windows
+
+
+def _rolling(timestamps, event_ids, window_ms, min_length, max_length, max_count):
+    """the `series.rolling` loop compare_patterns.dataset used before"""
+    series = pd.Series(
+        event_ids, index=pd.DatetimeIndex(timestamps.view("datetime64[ns]"))
+    )
+    sequences = series.rolling(timedelta(milliseconds=window_ms))
+    if max_count is not None:
+        sequences = islice(sequences, max_count)
+    return [
+        sequence[:max_length].to_list()
+        for sequence in sequences
+        if len(sequence) >= min_length
+    ]
+
+
+def _events(seed: int, n: int = 500) -> tuple[np.ndarray, np.ndarray]:
+    """sorted timestamps in ns with bursts of duplicates"""
+    rng = np.random.default_rng(seed)
+    gaps = rng.choice([0, 0, 1, 10**5, 10**6, 5 * 10**6], size=n)
+    timestamps = np.cumsum(gaps).astype(np.int64) + 1_700_000_000 * 10**9
+    event_ids = rng.integers(0, 50, size=n, dtype=np.int32)
+    return timestamps, event_ids
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize(
+    "window_ms,min_length,max_length,max_count",
+    [(1, 1, None, None), (5, 2, 16, None), (10, 3, 4, 100), (20, 1, 1, 1)],
+)
+def test_matches_pandas_rolling(seed, window_ms, min_length, max_length, max_count):
+    timestamps, event_ids = _events(seed)
+    windows = sliding_windows(
+        timestamps,
+        event_ids,
+        window_size=window_ms * 1_000_000,
+        min_length=min_length,
+        max_length=max_length,
+        max_count=max_count,
+    )
+    expected = _rolling(
+        timestamps, event_ids, window_ms, min_length, max_length, max_count
+    )
+    assert windows.tolist() == expected
+    assert len(windows) == len(expected)
+    assert [window.tolist() for window in windows] == expected
+    assert [windows[i].tolist() for i in range(len(windows))] == expected
+    assert windows.lengths.tolist() == [len(sequence) for sequence in expected]
+
+
+def test_empty():
+    windows = sliding_windows(
+        np.array([], dtype=np.int64), np.array([], dtype=np.int32), 10
+    )
+    assert len(windows) == 0
+    assert windows.tolist() == []